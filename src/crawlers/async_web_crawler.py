@@ -0,0 +1,301 @@
+"""
+Módulo para la navegación automatizada concurrente de sitios web.
+Utiliza la API asíncrona de Playwright para analizar varias URLs a la vez
+dentro de un único navegador.
+"""
+
+import os
+import asyncio
+from typing import List, Dict, Any, Optional, Literal, Set
+from datetime import datetime
+from urllib.parse import urlparse
+
+from playwright.async_api import async_playwright, Page
+
+from .web_crawler import (
+    DEFAULT_CONTEXT_OPTIONS, DEFAULT_BLOCKED_RESOURCES, BLOCKED_TRACKER_HOSTS,
+    EXTRACT_DOM_JS, SCROLL_TO_BOTTOM_JS, FITS_IN_VIEWPORT_JS, build_dom_tree, domain_slug,
+    page_slug, disable_playwright_stack_capture, WebCrawler, DarkPatternCrawler
+)
+
+
+class AsyncDarkPatternCrawler:
+    """
+    Crawler asíncrono especializado en patrones oscuros.
+    
+    Comparte un único navegador y crea un contexto por URL. La mayor parte del
+    tiempo de análisis se pasa esperando a la red, así que cargar varias
+    páginas a la vez solapa esas esperas.
+    """
+    
+    def __init__(self, headless: bool = True, screenshots_dir: str = None, timeout: int = 30000,
+                 max_concurrency: int = 10, block_resources: Optional[Set[str]] = None):
+        """
+        Inicializa el crawler asíncrono.
+        
+        Args:
+            headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
+            screenshots_dir: Directorio donde se guardarán las capturas de pantalla
+            timeout: Tiempo máximo de espera para las operaciones en milisegundos
+            max_concurrency: Número máximo de páginas analizadas simultáneamente
+            block_resources: Tipos de recurso a bloquear (por defecto 'media' y 'font');
+                             un conjunto vacío desactiva todo bloqueo
+        """
+        self.headless = headless
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.block_resources = DEFAULT_BLOCKED_RESOURCES if block_resources is None else frozenset(block_resources)
+        
+        # Configurar directorio para capturas de pantalla
+        if screenshots_dir:
+            self.screenshots_dir = screenshots_dir
+        else:
+            self.screenshots_dir = os.path.join(os.getcwd(), 'data', 'screenshots')
+        
+        # Crear directorio si no existe
+        WebCrawler._ensure_dir(self.screenshots_dir)
+        
+        self.playwright = None
+        self.browser = None
+        self._semaphore = None
+    
+    async def start(self) -> None:
+        """Inicia el navegador compartido."""
+        disable_playwright_stack_capture()
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=self.headless)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+    
+    async def stop(self) -> None:
+        """Cierra el navegador y libera recursos."""
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+        self.browser = None
+        self.playwright = None
+    
+    async def _handle_route(self, route) -> None:
+        """Aborta las peticiones de recursos bloqueados y de trackers conocidos."""
+        request = route.request
+        host = urlparse(request.url).hostname or ''
+        if request.resource_type in self.block_resources or host.endswith(BLOCKED_TRACKER_HOSTS):
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    async def take_screenshot(self, page: Page, url: str, name: str = None,
+                              full_page: bool = True, fmt: Literal["png", "jpeg"] = "jpeg",
+                              quality: int = 70, lossless: bool = False) -> str:
+        """
+        Toma una captura de pantalla de una página.
+        
+        Args:
+            page: Página de la que tomar la captura
+            url: URL de la página
+            name: Nombre para la captura de pantalla (sin extensión)
+            full_page: Si True, captura toda la página, no solo la parte visible
+            fmt: Formato de la imagen ("png" o "jpeg")
+            quality: Calidad JPEG (0-100); se ignora para PNG
+            lossless: Si True, fuerza PNG sin pérdida
+        
+        Returns:
+            str: Ruta a la captura de pantalla guardada
+        """
+        if lossless:
+            fmt = "png"
+        if not name:
+            # Generar nombre basado en la URL y timestamp
+            domain = domain_slug(url)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            name = f"{domain}_{timestamp}"
+        
+        # Asegurar que el nombre no contiene caracteres inválidos
+        name = WebCrawler._SANITIZE_RE.sub('_', name)
+        
+        extension = "jpg" if fmt == "jpeg" else "png"
+        screenshot_path = os.path.join(self.screenshots_dir, f"{name}.{extension}")
+        if fmt == "jpeg":
+            await page.screenshot(path=screenshot_path, full_page=full_page, type="jpeg", quality=quality)
+        else:
+            await page.screenshot(path=screenshot_path, full_page=full_page, type="png")
+        
+        return screenshot_path
+    
+    async def scroll_to_bottom(self, page: Page, step: Optional[int] = None, delay: float = 0.1,
+                               max_scrolls: int = 200, step_delay: float = 0.05) -> None:
+        """
+        Desplaza la página hasta el final de forma gradual.
+        
+        Args:
+            page: Página a desplazar
+            step: Píxeles a desplazar en cada paso (por defecto, la altura de la ventana)
+            delay: Tiempo de espera tras llegar al final, en segundos
+            max_scrolls: Número máximo de pasos (limita páginas con scroll infinito)
+            step_delay: Tiempo de espera entre pasos, en segundos
+        """
+        await page.evaluate(SCROLL_TO_BOTTOM_JS, {
+            'step': step,
+            'interval': int(step_delay * 1000),
+            'settle': int(delay * 1000),
+            'maxScrolls': max_scrolls
+        })
+    
+    async def analyze_page(self, url: str) -> Dict[str, Any]:
+        """
+        Analiza una página en busca de patrones oscuros.
+        
+        A diferencia de DarkPatternCrawler, la página se cierra al terminar, por
+        lo que el resultado incluye también el HTML ('page_content') para que
+        los detectores puedan trabajar sin el navegador.
+        
+        Args:
+            url: URL de la página a analizar
+        
+        Returns:
+            Dict[str, Any]: Resultados del análisis
+        """
+        async with self._semaphore:
+            context = await self.browser.new_context(**DEFAULT_CONTEXT_OPTIONS)
+            if self.block_resources:
+                await context.route("**/*", self._handle_route)
+            try:
+                page = await context.new_page()
+                page.set_default_timeout(self.timeout)
+                
+                # Navegar a la URL
+                try:
+                    response = await page.goto(url, wait_until='domcontentloaded', timeout=self.timeout)
+                    success = response.ok
+                except Exception as e:
+                    print(f"Error al navegar a {url}: {e}")
+                    success = False
+                
+                if not success:
+                    return {
+                        'url': url,
+                        'success': False,
+                        'error': 'No se pudo navegar a la página'
+                    }
+                
+                # Breve espera acotada a que termine la carga (si no llega, se sigue igual)
+                try:
+                    await page.wait_for_load_state('load', timeout=DarkPatternCrawler.LOAD_SETTLE_TIMEOUT)
+                except Exception:
+                    pass
+                
+                slug = page_slug(url)
+                
+                # Tomar captura de pantalla inicial
+                screenshot_path = await self.take_screenshot(page, url, name=f"initial_{slug}", full_page=False)
+                
+                # Recopilar información básica
+                title = await page.title()
+                content = await page.content()
+                
+                # Desplazarse por la página para cargar contenido dinámico
+                await self.scroll_to_bottom(page)
+                
+                # Tomar captura de pantalla después del desplazamiento, salvo que la
+                # página quepa en la ventana y sea igual que la inicial
+                if await page.evaluate(FITS_IN_VIEWPORT_JS):
+                    full_screenshot_path = screenshot_path
+                else:
+                    full_screenshot_path = await self.take_screenshot(page, url, name=f"full_{slug}")
+                
+                # Recopilar estructura DOM y cookies
+                dom_structure = build_dom_tree(await page.evaluate(EXTRACT_DOM_JS))
+                cookies = await context.cookies()
+                
+                return {
+                    'url': url,
+                    'success': True,
+                    'title': title,
+                    'screenshots': {
+                        'initial': screenshot_path,
+                        'full': full_screenshot_path
+                    },
+                    'dom_structure': dom_structure,
+                    'cookies': cookies,
+                    'html_length': len(content),
+                    'page_content': content
+                }
+            finally:
+                await context.close()
+    
+    async def analyze_pages(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analiza varias páginas de forma concurrente.
+        
+        Un error en una página no interrumpe el resto: su resultado indica el
+        error, igual que en DarkPatternCrawler.analyze_urls.
+        
+        Args:
+            urls: URLs a analizar
+        
+        Returns:
+            List[Dict[str, Any]]: Resultados del análisis, en el mismo orden que las URLs
+        """
+        outcomes = await asyncio.gather(*(self.analyze_page(url) for url in urls), return_exceptions=True)
+        
+        results = []
+        for url, outcome in zip(urls, outcomes):
+            if isinstance(outcome, Exception):
+                outcome = {
+                    'url': url,
+                    'success': False,
+                    'error': str(outcome)
+                }
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            results.append(outcome)
+        return results
+    
+    async def __aenter__(self):
+        """Permite usar el crawler con el contexto 'async with'."""
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Cierra el navegador al salir del contexto 'async with'."""
+        await self.stop()
+
+
+async def analyze_urls_async(urls: List[str], headless: bool = True, screenshots_dir: str = None,
+                             timeout: int = 30000, max_concurrency: int = 10) -> List[Dict[str, Any]]:
+    """
+    Analiza varias URLs de forma concurrente desde código asíncrono.
+    
+    Args:
+        urls: URLs a analizar
+        headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
+        screenshots_dir: Directorio donde se guardarán las capturas de pantalla
+        timeout: Tiempo máximo de espera para las operaciones en milisegundos
+        max_concurrency: Número máximo de páginas analizadas simultáneamente
+    
+    Returns:
+        List[Dict[str, Any]]: Resultados del análisis, en el mismo orden que las URLs
+    """
+    async with AsyncDarkPatternCrawler(headless, screenshots_dir, timeout, max_concurrency) as crawler:
+        return await crawler.analyze_pages(urls)
+
+
+def analyze_urls(urls: List[str], headless: bool = True, screenshots_dir: str = None,
+                 timeout: int = 30000, max_concurrency: int = 10) -> List[Dict[str, Any]]:
+    """
+    Punto de entrada síncrono para analizar varias URLs de forma concurrente.
+    
+    No se puede llamar desde un bucle de eventos en marcha; en ese caso hay
+    que usar analyze_urls_async.
+    
+    Args:
+        urls: URLs a analizar
+        headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
+        screenshots_dir: Directorio donde se guardarán las capturas de pantalla
+        timeout: Tiempo máximo de espera para las operaciones en milisegundos
+        max_concurrency: Número máximo de páginas analizadas simultáneamente
+    
+    Returns:
+        List[Dict[str, Any]]: Resultados del análisis, en el mismo orden que las URLs
+    """
+    return asyncio.run(analyze_urls_async(urls, headless, screenshots_dir, timeout, max_concurrency))
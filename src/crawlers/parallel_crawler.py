@@ -0,0 +1,104 @@
+"""
+Módulo para analizar muchas URLs en paralelo usando varios procesos.
+Cada proceso mantiene su propio DarkPatternCrawler sobre un pool de navegador;
+opcionalmente todos se conectan a un mismo servidor de navegador ya arrancado.
+"""
+
+import os
+import multiprocessing
+from multiprocessing.util import Finalize
+from typing import List, Dict, Any, Optional
+
+from .web_crawler import BrowserPool, DarkPatternCrawler
+
+
+# Estado de cada proceso trabajador
+_worker_pool = None
+_worker_options = {}
+
+
+def _init_worker(headless: bool, screenshots_dir: Optional[str], timeout: int,
+                 connect_url: Optional[str]) -> None:
+    """
+    Prepara el pool de navegador de un proceso trabajador.
+    
+    Args:
+        headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
+        screenshots_dir: Directorio donde se guardarán las capturas de pantalla
+        timeout: Tiempo máximo de espera para las operaciones en milisegundos
+        connect_url: Endpoint WebSocket de un servidor de navegador compartido
+    """
+    global _worker_pool, _worker_options
+    _worker_pool = BrowserPool(headless=headless, max_workers=1, connect_url=connect_url)
+    _worker_options = {
+        'headless': headless,
+        'screenshots_dir': screenshots_dir,
+        'timeout': timeout
+    }
+    # Cerrar el navegador cuando el proceso termine normalmente
+    Finalize(_worker_pool, _worker_pool.shutdown, exitpriority=10)
+
+
+def _analyze_one(url: str) -> Dict[str, Any]:
+    """
+    Analiza una URL dentro de un proceso trabajador.
+    
+    Args:
+        url: URL a analizar
+    
+    Returns:
+        Dict[str, Any]: Resultados del análisis, incluyendo el HTML en 'page_content'
+    """
+    try:
+        with DarkPatternCrawler(pool=_worker_pool, **_worker_options) as crawler:
+            result = crawler.analyze_page(url)
+            cached_page = crawler.get_cached_page(url)
+            if cached_page:
+                result['page_content'] = cached_page['page_content']
+            return result
+    except Exception as e:
+        return {
+            'url': url,
+            'success': False,
+            'error': str(e)
+        }
+
+
+def analyze_urls_in_processes(urls: List[str], processes: Optional[int] = None,
+                              connect_url: Optional[str] = None, headless: bool = True,
+                              screenshots_dir: str = None, timeout: int = 30000) -> List[Dict[str, Any]]:
+    """
+    Analiza varias URLs repartiéndolas entre varios procesos.
+    
+    La API de Playwright para Python no puede arrancar un servidor de navegador
+    (launch_server solo existe en Node). Si se indica connect_url, todos los
+    procesos se conectan a ese servidor; si no, cada proceso lanza un único
+    Chromium y lo reutiliza para todas las URLs que procesa.
+    
+    Args:
+        urls: URLs a analizar
+        processes: Número de procesos (por defecto, el número de CPUs)
+        connect_url: Endpoint WebSocket de un servidor de navegador de Playwright
+        headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
+        screenshots_dir: Directorio donde se guardarán las capturas de pantalla
+        timeout: Tiempo máximo de espera para las operaciones en milisegundos
+    
+    Returns:
+        List[Dict[str, Any]]: Resultados del análisis en orden de finalización;
+        cada resultado incluye su 'url'
+    """
+    if not urls:
+        return []
+    
+    processes = min(processes or os.cpu_count() or 1, len(urls))
+    pool = multiprocessing.Pool(
+        processes,
+        initializer=_init_worker,
+        initargs=(headless, screenshots_dir, timeout, connect_url)
+    )
+    try:
+        return list(pool.imap_unordered(_analyze_one, urls))
+    finally:
+        # close + join para que los trabajadores terminen y cierren su navegador
+        pool.close()
+        pool.join()
@@ -4,19 +4,520 @@ Utiliza Playwright para controlar un navegador headless.
 """
 
 import os
-import time
+import re
+import json
+import queue
+import hashlib
+import shutil
+import subprocess
+import inspect
+import traceback
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Literal, Set
 from datetime import datetime
+from urllib.parse import urlparse
 
 from playwright.sync_api import sync_playwright, Page, Browser, BrowserContext, ElementHandle
-from PIL import Image
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; se usa json de la biblioteca estándar
+    orjson = None
+
+
+# Codificadores JSON reutilizados cuando orjson no está disponible (json.dumps
+# con opciones crea un codificador nuevo en cada llamada)
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_JSON_PRETTY_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+# Opciones comunes para todos los contextos de navegación
+DEFAULT_CONTEXT_OPTIONS = {
+    'viewport': {'width': 1280, 'height': 800},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Tipos de recurso que se bloquean por defecto: no aportan nada al análisis
+# del DOM ni del texto. Las imágenes se mantienen porque se toman capturas.
+DEFAULT_BLOCKED_RESOURCES = frozenset({'media', 'font'})
+
+# Servicios de analítica cuyas peticiones nunca afectan al contenido visible
+BLOCKED_TRACKER_HOSTS = (
+    'google-analytics.com', 'hotjar.com', 'scorecardresearch.com',
+    'segment.io', 'mixpanel.com', 'nr-data.net', 'clarity.ms'
+)
+
+
+def install_resource_blocking(context: BrowserContext, block_resources: Set[str]) -> None:
+    """
+    Aborta en el contexto las peticiones de los tipos indicados y de trackers conocidos.
+    
+    Args:
+        context: Contexto de navegación
+        block_resources: Tipos de recurso de Playwright a bloquear
+                         (p. ej. 'image', 'media', 'font')
+    """
+    def handle_route(route):
+        request = route.request
+        if request.resource_type in block_resources:
+            return route.abort()
+        host = urlparse(request.url).hostname or ''
+        if host.endswith(BLOCKED_TRACKER_HOSTS):
+            return route.abort()
+        return route.continue_()
+    
+    context.route("**/*", handle_route)
+
+
+# Script que extrae una representación simplificada del DOM (hasta 3 niveles
+# bajo <body>). Recorre los elementos con un TreeWalker de forma iterativa y
+# devuelve una estructura plana de arrays paralelos, uno por campo, con todas
+# las cadenas internadas en 'strings'; así viaja mucho menos JSON por CDP.
+# El árbol anidado se reconstruye en Python con build_dom_tree().
+EXTRACT_DOM_JS = """() => {
+    const maxDepth = 3;
+    const root = document.body;
+    if (!root) return null;
+    
+    const strings = [];
+    const stringIndex = new Map();
+    const intern = (value) => {
+        let index = stringIndex.get(value);
+        if (index === undefined) {
+            index = strings.length;
+            strings.push(value);
+            stringIndex.set(value, index);
+        }
+        return index;
+    };
+    
+    const dom = {
+        strings: strings,
+        tag: [],
+        parent: [],
+        truncated: [],
+        idIdx: [],
+        classIdx: [],
+        textIdx: [],
+        attrOffset: [0],
+        attrs: []
+    };
+    
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT);
+    const parents = [-1];
+    let node = root;
+    let depth = 0;
+    
+    while (true) {
+        const index = dom.tag.length;
+        const truncated = depth > maxDepth;
+        dom.tag.push(intern(node.nodeName));
+        dom.parent.push(parents[parents.length - 1]);
+        dom.truncated.push(truncated ? 1 : 0);
+        
+        if (truncated) {
+            dom.idIdx.push(-1);
+            dom.classIdx.push(-1);
+            dom.textIdx.push(-1);
+        } else {
+            dom.idIdx.push(node.id ? intern(node.id) : -1);
+            const className = node.getAttribute('class');
+            dom.classIdx.push(className ? intern(className) : -1);
+            const text = node.textContent ? node.textContent.trim().substring(0, 100) : '';
+            dom.textIdx.push(text ? intern(text) : -1);
+            for (const attr of node.attributes) {
+                if (attr.name !== 'id' && attr.name !== 'class') {
+                    dom.attrs.push(intern(attr.name), intern(attr.value));
+                }
+            }
+        }
+        dom.attrOffset.push(dom.attrs.length);
+        
+        // Bajar al primer hijo, o avanzar al siguiente hermano subiendo lo necesario
+        if (!truncated && walker.firstChild()) {
+            parents.push(index);
+            depth += 1;
+        } else {
+            while (!walker.nextSibling()) {
+                if (depth === 0) return dom;
+                walker.parentNode();
+                parents.pop();
+                depth -= 1;
+            }
+        }
+        node = walker.currentNode;
+    }
+}"""
+
+
+def build_dom_tree(flat_dom: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Reconstruye el árbol DOM anidado a partir de la estructura plana de EXTRACT_DOM_JS.
+    
+    Cada nodo tiene la forma {'type', 'id', 'classes', 'text', 'attributes',
+    'children'} (solo con las claves que tengan valor); los nodos por debajo de
+    la profundidad máxima se representan como {'type', 'truncated': True}.
+    
+    Args:
+        flat_dom: Estructura plana devuelta por EXTRACT_DOM_JS
+        
+    Returns:
+        Dict[str, Any]: Nodo raíz (<body>), o un diccionario vacío si no hay DOM
+    """
+    if not flat_dom or not flat_dom.get('tag'):
+        return {}
+    
+    strings = flat_dom['strings']
+    parents = flat_dom['parent']
+    truncated = flat_dom['truncated']
+    id_idx = flat_dom['idIdx']
+    class_idx = flat_dom['classIdx']
+    text_idx = flat_dom['textIdx']
+    attr_offset = flat_dom['attrOffset']
+    attrs = flat_dom['attrs']
+    
+    nodes = []
+    for i, tag in enumerate(flat_dom['tag']):
+        node = {'type': strings[tag]}
+        if truncated[i]:
+            node['truncated'] = True
+        else:
+            if id_idx[i] >= 0:
+                node['id'] = strings[id_idx[i]]
+            if class_idx[i] >= 0:
+                node['classes'] = [c for c in strings[class_idx[i]].split(' ') if c]
+            if text_idx[i] >= 0:
+                node['text'] = strings[text_idx[i]]
+            start, end = attr_offset[i], attr_offset[i + 1]
+            if end > start:
+                node['attributes'] = {
+                    strings[attrs[j]]: strings[attrs[j + 1]] for j in range(start, end, 2)
+                }
+        nodes.append(node)
+        
+        parent = parents[i]
+        if parent >= 0:
+            nodes[parent].setdefault('children', []).append(node)
+    
+    return nodes[0]
+
+# Script que desplaza la página hasta el final dentro del propio navegador, en
+# un único viaje de ida y vuelta. Los pasos se encadenan con setTimeout (no con
+# requestAnimationFrame, que se detiene en páginas ocultas o en segundo plano)
+# y dejan 'interval' ms entre sí para que arranque la carga diferida. El bucle
+# compite con un plazo máximo derivado de maxScrolls, de modo que la evaluación
+# termina aunque el navegador ralentice los temporizadores. Sin 'step', cada
+# paso avanza una pantalla completa
+SCROLL_TO_BOTTOM_JS = """async ({ step, interval, settle, maxScrolls }) => {
+    const stride = step || window.innerHeight || 800;
+    const budget = maxScrolls * (interval + 50) + settle + 1000;
+    const deadline = Date.now() + budget;
+    await Promise.race([
+        new Promise(resolve => {
+            let position = 0;
+            let scrolls = 0;
+            const tick = () => {
+                position += stride;
+                scrolls += 1;
+                window.scrollTo(0, position);
+                if (position < document.body.scrollHeight && scrolls < maxScrolls
+                        && Date.now() < deadline) {
+                    setTimeout(tick, interval);
+                } else {
+                    setTimeout(resolve, settle);
+                }
+            };
+            tick();
+        }),
+        new Promise(resolve => setTimeout(resolve, budget))
+    ]);
+}"""
+
+# Indica si toda la página cabe en la ventana (la captura completa sería igual
+# que la de la parte visible)
+FITS_IN_VIEWPORT_JS = "() => document.documentElement.scrollHeight <= window.innerHeight"
+
+# Script que obtiene varios campos de varios elementos en una sola evaluación
+GET_MANY_JS = """({ selectors, fields }) => {
+    const result = {};
+    for (const selector of selectors) {
+        let element = null;
+        try {
+            element = document.querySelector(selector);
+        } catch (e) {
+            element = null;
+        }
+        if (!element) {
+            result[selector] = null;
+            continue;
+        }
+        const values = {};
+        for (const field of fields) {
+            values[field] = field === 'text' ? element.textContent : element.getAttribute(field);
+        }
+        result[selector] = values;
+    }
+    return result;
+}"""
+
+
+# Script de inicialización que instala los scripts anteriores como funciones de
+# la página. Se registra una vez por contexto con add_init_script, de modo que
+# cada llamada posterior solo envía por CDP una invocación corta y V8 no tiene
+# que volver a analizar y compilar el código
+PAGE_HELPERS_JS = f"""window.__darkPatternHelpers = {{
+    extractDom: {EXTRACT_DOM_JS},
+    scrollToBottom: {SCROLL_TO_BOTTOM_JS},
+    getMany: {GET_MANY_JS}
+}};"""
+
+# Invoca una de las funciones instaladas por PAGE_HELPERS_JS; indica si no
+# está disponible (p. ej. la página se cargó antes de registrar el script)
+CALL_PAGE_HELPER_JS = """([name, arg]) => {
+    const helpers = window.__darkPatternHelpers;
+    if (!helpers || !helpers[name]) return { missing: true };
+    return Promise.resolve(helpers[name](arg)).then(value => ({ value }));
+}"""
+
+
+class _NoStackInspect:
+    """Sustituto del módulo inspect para Playwright cuyo stack() no recorre la pila."""
+    
+    def __getattr__(self, name):
+        return getattr(inspect, name)
+    
+    @staticmethod
+    def stack(*args, **kwargs):
+        return []
+
+
+class _NoStackTraceback:
+    """Sustituto del módulo traceback para Playwright cuyo extract_stack() no recorre la pila."""
+    
+    def __getattr__(self, name):
+        return getattr(traceback, name)
+    
+    @staticmethod
+    def extract_stack(*args, **kwargs):
+        return traceback.StackSummary()
+
+
+def disable_playwright_stack_capture() -> None:
+    """
+    Evita que Playwright recorra la pila de Python en cada llamada a su API.
+    
+    SyncBase._sync guarda en cada tarea inspect.stack() y
+    traceback.extract_stack(), y el módulo _connection vuelve a llamar a
+    inspect.stack() como valor por defecto; todo ello solo para adjuntar la
+    ubicación a los errores y a las trazas. En análisis con muchas llamadas al
+    navegador es una parte importante del tiempo de CPU, así que se sustituyen
+    los módulos inspect y traceback de ambos. Se puede desactivar este cambio
+    con PW_INSPECT_STACK=1.
+    """
+    if os.getenv("PW_INSPECT_STACK", "0") != "0":
+        return
+    try:
+        from playwright._impl import _connection, _sync_base
+    except ImportError:
+        return
+    for module in (_connection, _sync_base):
+        if getattr(module, "inspect", None) is inspect:
+            module.inspect = _NoStackInspect()
+    if getattr(_sync_base, "traceback", None) is traceback:
+        _sync_base.traceback = _NoStackTraceback()
+
+
+def launch_or_connect(playwright, headless: bool = True, connect_url: Optional[str] = None) -> Browser:
+    """
+    Lanza Chromium o se conecta a un servidor de navegador existente.
+    
+    Conectarse permite que varios procesos compartan un único Chromium ya
+    arrancado en lugar de lanzar uno cada uno.
+    
+    Args:
+        playwright: Instancia de Playwright iniciada
+        headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
+        connect_url: Endpoint WebSocket del servidor de navegador, o None para lanzar uno
+        
+    Returns:
+        Browser: Navegador listo para crear contextos
+    """
+    if connect_url:
+        return playwright.chromium.connect(connect_url)
+    return playwright.chromium.launch(headless=headless)
+
+
+@lru_cache(maxsize=1024)
+def domain_slug(url: str) -> str:
+    """
+    Obtiene el dominio de una URL en un formato apto para nombres de archivo.
+    
+    Args:
+        url: URL de la página
+        
+    Returns:
+        str: Dominio con los puntos sustituidos por guiones bajos
+        (cadena vacía si la URL no tiene dominio)
+    """
+    return urlparse(url).netloc.replace('.', '_')
+
+
+def page_slug(url: str) -> str:
+    """
+    Obtiene un identificador de la URL completa apto para nombres de archivo.
+    
+    Dos páginas del mismo dominio comparten domain_slug, así que se añade un
+    hash corto de la URL para que sus capturas no se sobrescriban cuando se
+    analizan a la vez.
+    
+    Args:
+        url: URL de la página
+        
+    Returns:
+        str: Dominio (como en domain_slug) seguido de un hash de la URL
+    """
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]
+    return f"{domain_slug(url)}_{digest}"
+
+
+def _optimize_png(path: str) -> None:
+    """
+    Recomprime un PNG sin pérdida con PIL.
+    
+    PIL se importa aquí y no a nivel de módulo porque solo se necesita para
+    esta optimización opcional y su carga es costosa.
+    
+    Args:
+        path: Ruta al archivo PNG
+    """
+    from PIL import Image
+    
+    try:
+        with Image.open(path) as image:
+            image.load()
+            image.save(path, optimize=True, compress_level=9)
+    except Exception as e:
+        print(f"Error al optimizar la captura {path}: {e}")
+
+
+class BrowserPool:
+    """
+    Mantiene un único proceso de Chromium y reparte contextos nuevos por tarea.
+    
+    Lanzar el navegador es la operación más costosa del análisis; crear un
+    contexto es mucho más barato. El pool lanza Chromium una sola vez y entre
+    URLs solo cierra el contexto usado, reponiéndolo en la cola.
+    
+    Los objetos de la API síncrona de Playwright están ligados al hilo que los
+    creó, por lo que un pool solo debe usarse desde un mismo hilo. Quien crea
+    el pool es quien debe cerrarlo, con shutdown() o usándolo con 'with'.
+    """
+    
+    def __init__(self, headless: bool = True, max_workers: int = 4,
+                 context_options: Dict[str, Any] = None, connect_url: Optional[str] = None):
+        """
+        Inicializa el pool de navegador.
+        
+        Args:
+            headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
+            max_workers: Número de contextos precalentados que se mantienen disponibles
+            context_options: Opciones para crear cada contexto de navegación
+            connect_url: Endpoint WebSocket de un servidor de navegador de Playwright
+                         ya en marcha; si se indica, se conecta a él en vez de lanzar Chromium
+        """
+        self.headless = headless
+        self.max_workers = max_workers
+        self.context_options = context_options or DEFAULT_CONTEXT_OPTIONS
+        self.connect_url = connect_url
+        self.playwright = None
+        self.browser = None
+        self._contexts = queue.Queue(maxsize=max_workers)
+    
+    def _ensure_browser(self) -> None:
+        """Lanza el navegador y precalienta los contextos si aún no se ha hecho."""
+        if self.browser is not None:
+            return
+        disable_playwright_stack_capture()
+        self.playwright = sync_playwright().start()
+        self.browser = launch_or_connect(self.playwright, self.headless, self.connect_url)
+        for _ in range(self.max_workers):
+            self._contexts.put(self._new_context())
+    
+    def _new_context(self) -> BrowserContext:
+        """Crea un nuevo contexto de navegación."""
+        return self.browser.new_context(**self.context_options)
+    
+    def acquire(self) -> BrowserContext:
+        """
+        Obtiene un contexto limpio del pool.
+        
+        Returns:
+            BrowserContext: Contexto listo para abrir páginas
+        """
+        self._ensure_browser()
+        try:
+            return self._contexts.get_nowait()
+        except queue.Empty:
+            return self._new_context()
+    
+    def release(self, context: BrowserContext) -> None:
+        """
+        Devuelve un contexto al pool.
+        
+        El contexto se cierra (descartando cookies y almacenamiento) y se repone
+        con uno nuevo para que el siguiente análisis empiece limpio.
+        
+        Args:
+            context: Contexto obtenido previamente con acquire()
+        """
+        try:
+            context.clear_cookies()
+            context.close()
+        except Exception as e:
+            print(f"Error al cerrar el contexto: {e}")
+        
+        if self.browser is not None and self.browser.is_connected() and not self._contexts.full():
+            self._contexts.put(self._new_context())
+    
+    def shutdown(self) -> None:
+        """Cierra todos los contextos, el navegador y Playwright."""
+        while True:
+            try:
+                self._contexts.get_nowait().close()
+            except queue.Empty:
+                break
+            except Exception:
+                pass
+        if self.browser:
+            self.browser.close()
+            self.browser = None
+        if self.playwright:
+            self.playwright.stop()
+            self.playwright = None
+    
+    def __enter__(self):
+        """Permite usar el pool con el contexto 'with'."""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Cierra el navegador al salir del contexto 'with'."""
+        self.shutdown()
 
 
 class WebCrawler:
     """Clase base para la navegación automatizada de sitios web."""
     
-    def __init__(self, headless: bool = True, screenshots_dir: str = None, timeout: int = 30000):
+    # Caracteres no permitidos en nombres de archivo
+    _SANITIZE_RE = re.compile(r'[^\w\-]')
+    
+    # Directorios ya creados en este proceso (evita repetir makedirs por instancia)
+    _ENSURED_DIRS: Set[str] = set()
+    
+    def __init__(self, headless: bool = True, screenshots_dir: str = None, timeout: int = 30000,
+                 pool: Optional[BrowserPool] = None, block_resources: Optional[Set[str]] = None,
+                 connect_url: Optional[str] = None):
         """
         Inicializa el navegador automatizado.
         
@@ -24,9 +525,19 @@ class WebCrawler:
             headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
             screenshots_dir: Directorio donde se guardarán las capturas de pantalla
             timeout: Tiempo máximo de espera para las operaciones en milisegundos
+            pool: Pool de navegador compartido; si se indica, se reutiliza su Chromium
+                  y solo se crea un contexto nuevo por tarea
+            block_resources: Tipos de recurso a bloquear (por defecto 'media' y 'font').
+                             Un conjunto vacío desactiva todo bloqueo; añadir 'image'
+                             solo tiene sentido si no se van a tomar capturas
+            connect_url: Endpoint WebSocket de un servidor de navegador de Playwright
+                         al que conectarse en vez de lanzar Chromium (sin pool)
         """
         self.headless = headless
         self.timeout = timeout
+        self.pool = pool
+        self.connect_url = connect_url
+        self.block_resources = DEFAULT_BLOCKED_RESOURCES if block_resources is None else frozenset(block_resources)
         
         # Configurar directorio para capturas de pantalla
         if screenshots_dir:
@@ -35,7 +546,7 @@ class WebCrawler:
             self.screenshots_dir = os.path.join(os.getcwd(), 'data', 'screenshots')
         
         # Crear directorio si no existe
-        os.makedirs(self.screenshots_dir, exist_ok=True)
+        self._ensure_dir(self.screenshots_dir)
         
         # Inicializar atributos que se configurarán más tarde
         self.playwright = None
@@ -43,73 +554,178 @@ class WebCrawler:
         self.context = None
         self.page = None
         self.current_url = None
+        self._domain_slug = None
+        
+        # Rutas de todas las capturas guardadas por este crawler
+        self.saved_screenshots = []
+        
+        # Escrituras de capturas en segundo plano
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._io_futures: List[Future] = []
+    
+    @classmethod
+    def _ensure_dir(cls, path: str) -> None:
+        """
+        Crea un directorio si no existe, solo la primera vez que se pide en el proceso.
+        
+        Args:
+            path: Ruta del directorio
+        """
+        if path not in cls._ENSURED_DIRS:
+            os.makedirs(path, exist_ok=True)
+            cls._ENSURED_DIRS.add(path)
     
     def start(self) -> None:
-        """Inicia el navegador y crea un nuevo contexto."""
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=self.headless)
-        self.context = self.browser.new_context(
-            viewport={'width': 1280, 'height': 800},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        )
+        """Inicia el navegador (o toma un contexto del pool) y crea una página."""
+        if not self.pool and self.browser is None:
+            disable_playwright_stack_capture()
+            self.playwright = sync_playwright().start()
+            self.browser = launch_or_connect(self.playwright, self.headless, self.connect_url)
+        if self.context is None:
+            self._open_context()
+    
+    def _open_context(self) -> None:
+        """Crea un contexto de navegación limpio (o lo toma del pool) y abre una página."""
+        if self.pool:
+            self.context = self.pool.acquire()
+        else:
+            self.context = self.browser.new_context(**DEFAULT_CONTEXT_OPTIONS)
+        if self.block_resources:
+            install_resource_blocking(self.context, self.block_resources)
+        self.context.add_init_script(script=PAGE_HELPERS_JS)
         self.page = self.context.new_page()
         self.page.set_default_timeout(self.timeout)
     
-    def stop(self) -> None:
-        """Cierra el navegador y libera recursos."""
+    def _close_context(self) -> None:
+        """Cierra el contexto actual (o lo devuelve al pool) sin cerrar el navegador."""
         if self.context:
-            self.context.close()
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+            if self.pool:
+                self.pool.release(self.context)
+            else:
+                self.context.close()
+        self.context = None
+        self.page = None
+    
+    def new_context(self) -> None:
+        """
+        Sustituye el contexto actual por uno nuevo en el mismo navegador.
+        
+        Descarta cookies y almacenamiento de la página anterior sin el coste de
+        relanzar Chromium.
+        """
+        self._close_context()
+        self._open_context()
+    
+    def stop(self) -> None:
+        """Cierra el navegador, espera a que terminen de escribirse las capturas y libera recursos."""
+        self.wait_for_writes()
+        if self._io_pool:
+            self._io_pool.shutdown()
+            self._io_pool = None
+        # Con pool solo se libera el contexto; el navegador sigue vivo
+        self._close_context()
+        if not self.pool:
+            if self.browser:
+                self.browser.close()
+            if self.playwright:
+                self.playwright.stop()
+        self.playwright = None
+        self.browser = None
     
-    def navigate(self, url: str) -> bool:
+    def navigate(self, url: str, wait_until: str = 'domcontentloaded',
+                 wait_for: Optional[str] = None) -> bool:
         """
         Navega a la URL especificada.
         
+        Por defecto se espera solo a 'domcontentloaded': en sitios con mucha
+        publicidad 'networkidle' rara vez se alcanza y se acaba agotando el
+        timeout completo aunque el DOM ya esté listo.
+        
         Args:
             url: URL a la que navegar
+            wait_until: Evento de carga que marca el fin de la navegación
+            wait_for: Selector CSS opcional que debe existir en el DOM antes de
+                      dar la navegación por terminada (contenido cargado por XHR)
             
         Returns:
             bool: True si la navegación fue exitosa, False en caso contrario
         """
         try:
             self.current_url = url
-            response = self.page.goto(url, wait_until='networkidle', timeout=self.timeout)
+            self._domain_slug = domain_slug(url)
+            response = self.page.goto(url, wait_until=wait_until, timeout=self.timeout)
+            if wait_for:
+                self.page.wait_for_selector(wait_for, state='attached', timeout=self.timeout)
             return response.ok
         except Exception as e:
             print(f"Error al navegar a {url}: {e}")
             return False
     
-    def take_screenshot(self, name: str = None, full_page: bool = True) -> str:
+    def take_screenshot(self, name: str = None, full_page: bool = True,
+                        fmt: Literal["png", "jpeg"] = "jpeg", quality: int = 70,
+                        lossless: bool = False) -> str:
         """
         Toma una captura de pantalla de la página actual.
         
+        Por defecto se guarda en JPEG: codificar un PNG de página completa es
+        varias veces más lento y el resultado ocupa mucho más.
+        
         Args:
             name: Nombre para la captura de pantalla (sin extensión)
             full_page: Si True, captura toda la página, no solo la parte visible
+            fmt: Formato de la imagen ("png" o "jpeg")
+            quality: Calidad JPEG (0-100); se ignora para PNG
+            lossless: Si True, fuerza PNG sin pérdida (p. ej. para evidencias archivadas)
             
         Returns:
             str: Ruta a la captura de pantalla guardada
         """
+        if lossless:
+            fmt = "png"
         if not name:
             # Generar nombre basado en la URL y timestamp
-            domain = self.current_url.split('//')[1].split('/')[0].replace('.', '_')
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            name = f"{domain}_{timestamp}"
+            name = f"{self._domain_slug}_{timestamp}"
         
         # Asegurar que el nombre no contiene caracteres inválidos
-        name = ''.join(c if c.isalnum() or c in '_-' else '_' for c in name)
+        name = self._SANITIZE_RE.sub('_', name)
         
         # Crear ruta completa
-        screenshot_path = os.path.join(self.screenshots_dir, f"{name}.png")
+        extension = "jpg" if fmt == "jpeg" else "png"
+        screenshot_path = os.path.join(self.screenshots_dir, f"{name}.{extension}")
         
-        # Tomar captura de pantalla
-        self.page.screenshot(path=screenshot_path, full_page=full_page)
+        # Tomar captura de pantalla en memoria; el archivo se escribe en segundo plano
+        if fmt == "jpeg":
+            buffer = self.page.screenshot(full_page=full_page, type="jpeg", quality=quality)
+        else:
+            buffer = self.page.screenshot(full_page=full_page, type="png")
+        self._write_in_background(screenshot_path, buffer)
         
+        self.saved_screenshots.append(screenshot_path)
         return screenshot_path
     
+    def _write_in_background(self, path: str, data: bytes) -> None:
+        """
+        Escribe un archivo en un hilo aparte para no bloquear la navegación.
+        
+        Args:
+            path: Ruta del archivo
+            data: Contenido a escribir
+        """
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=2)
+        self._io_futures.append(self._io_pool.submit(Path(path).write_bytes, data))
+    
+    def wait_for_writes(self) -> None:
+        """Espera a que terminen todas las escrituras de capturas pendientes."""
+        futures, self._io_futures = self._io_futures, []
+        if not futures:
+            return
+        wait(futures)
+        for future in futures:
+            if future.exception():
+                print(f"Error al guardar captura de pantalla: {future.exception()}")
+    
     def take_element_screenshot(self, selector: str, name: str = None) -> Optional[str]:
         """
         Toma una captura de pantalla de un elemento específico.
@@ -129,20 +745,20 @@ class WebCrawler:
             
             if not name:
                 # Generar nombre basado en la URL, selector y timestamp
-                domain = self.current_url.split('//')[1].split('/')[0].replace('.', '_')
                 selector_short = selector.replace(' ', '_').replace('>', '_').replace(':', '_')[:20]
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                name = f"{domain}_{selector_short}_{timestamp}"
+                name = f"{self._domain_slug}_{selector_short}_{timestamp}"
             
             # Asegurar que el nombre no contiene caracteres inválidos
-            name = ''.join(c if c.isalnum() or c in '_-' else '_' for c in name)
+            name = self._SANITIZE_RE.sub('_', name)
             
             # Crear ruta completa
             screenshot_path = os.path.join(self.screenshots_dir, f"{name}.png")
             
             # Tomar captura de pantalla del elemento
-            element.screenshot(path=screenshot_path)
+            self._write_in_background(screenshot_path, element.screenshot())
             
+            self.saved_screenshots.append(screenshot_path)
             return screenshot_path
         except Exception as e:
             print(f"Error al tomar captura del elemento {selector}: {e}")
@@ -157,67 +773,55 @@ class WebCrawler:
         """
         return self.page.content()
     
-    def get_dom_structure(self) -> Dict[str, Any]:
+    def get_visible_text(self) -> str:
         """
-        Obtiene la estructura DOM de la página actual en formato JSON.
+        Obtiene el texto visible de la página actual sin serializar el HTML.
         
         Returns:
-            Dict[str, Any]: Estructura DOM simplificada
+            str: Texto visible (innerText) del cuerpo de la página
         """
-        # Ejecutar JavaScript para obtener una representación simplificada del DOM
-        dom_json = self.page.evaluate("""() => {
-            function extractDomNode(node, maxDepth = 3, currentDepth = 0) {
-                if (currentDepth > maxDepth) return { type: node.nodeName, truncated: true };
-                
-                const result = {
-                    type: node.nodeName,
-                    id: node.id || undefined,
-                    classes: node.className ? node.className.split(' ').filter(c => c.length > 0) : undefined,
-                    text: node.textContent ? (node.textContent.trim().substring(0, 100) || undefined) : undefined,
-                    attributes: {},
-                    children: []
-                };
-                
-                // Extract attributes
-                if (node.attributes) {
-                    for (let i = 0; i < node.attributes.length; i++) {
-                        const attr = node.attributes[i];
-                        if (attr.name !== 'id' && attr.name !== 'class') {
-                            result.attributes[attr.name] = attr.value;
-                        }
-                    }
-                }
-                
-                // If no attributes, remove the empty object
-                if (Object.keys(result.attributes).length === 0) {
-                    delete result.attributes;
-                }
-                
-                // Process children
-                if (node.childNodes) {
-                    for (let i = 0; i < node.childNodes.length; i++) {
-                        const child = node.childNodes[i];
-                        // Skip text nodes with only whitespace
-                        if (child.nodeType === 3 && !child.textContent.trim()) continue;
-                        
-                        if (child.nodeType === 1) { // Element node
-                            result.children.push(extractDomNode(child, maxDepth, currentDepth + 1));
-                        }
-                    }
-                }
-                
-                // If no children, remove the empty array
-                if (result.children.length === 0) {
-                    delete result.children;
+        return self.page.evaluate("() => document.body ? document.body.innerText : ''")
+    
+    def get_selector_html(self, selectors: List[str]) -> Dict[str, List[str]]:
+        """
+        Obtiene el HTML solo de los fragmentos que coinciden con los selectores.
+        
+        Args:
+            selectors: Selectores CSS de los fragmentos a extraer
+            
+        Returns:
+            Dict[str, List[str]]: outerHTML de cada elemento encontrado, por selector
+        """
+        return self.page.evaluate("""(selectors) => {
+            const result = {};
+            for (const selector of selectors) {
+                try {
+                    result[selector] = Array.from(document.querySelectorAll(selector), el => el.outerHTML);
+                } catch (e) {
+                    result[selector] = [];
                 }
-                
-                return result;
             }
-            
-            return extractDomNode(document.body);
-        }""")
+            return result;
+        }""", selectors)
+    
+    def get_flat_dom(self) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la estructura DOM de la página actual en formato plano.
         
-        return dom_json
+        Returns:
+            Optional[Dict[str, Any]]: Arrays paralelos por nodo más la tabla de
+            cadenas internadas (ver EXTRACT_DOM_JS)
+        """
+        return self._call_page_helper('extractDom', EXTRACT_DOM_JS)
+    
+    def get_dom_structure(self) -> Dict[str, Any]:
+        """
+        Obtiene la estructura DOM de la página actual en formato JSON.
+        
+        Returns:
+            Dict[str, Any]: Estructura DOM simplificada
+        """
+        return build_dom_tree(self.get_flat_dom())
     
     def click(self, selector: str, timeout: int = None) -> bool:
         """
@@ -295,12 +899,13 @@ class WebCrawler:
             print(f"Tiempo de espera agotado para {selector}: {e}")
             return False
     
-    def wait_for_navigation(self, timeout: int = None) -> bool:
+    def wait_for_navigation(self, timeout: int = None, state: str = 'networkidle') -> bool:
         """
         Espera a que se complete una navegación.
         
         Args:
             timeout: Tiempo máximo de espera en milisegundos
+            state: Estado de carga a esperar ('load', 'domcontentloaded' o 'networkidle')
             
         Returns:
             bool: True si la navegación se completó, False si se agotó el tiempo de espera
@@ -308,29 +913,34 @@ class WebCrawler:
         try:
             if timeout is None:
                 timeout = self.timeout
-            self.page.wait_for_load_state('networkidle', timeout=timeout)
+            self.page.wait_for_load_state(state, timeout=timeout)
             return True
         except Exception as e:
             print(f"Tiempo de espera agotado para navegación: {e}")
             return False
     
-    def scroll_to_bottom(self, step: int = 250, delay: float = 0.1) -> None:
+    def scroll_to_bottom(self, step: Optional[int] = None, delay: float = 0.1, max_scrolls: int = 200,
+                         step_delay: float = 0.05) -> None:
         """
         Desplaza la página hasta el final de forma gradual.
         
+        El bucle se ejecuta dentro de la página en lugar de enviar una orden al
+        navegador por cada paso, y tiene un plazo máximo para no bloquear el
+        análisis si la página está en segundo plano.
+        
         Args:
-            step: Píxeles a desplazar en cada paso
-            delay: Tiempo de espera entre pasos en segundos
+            step: Píxeles a desplazar en cada paso (por defecto, la altura de la ventana)
+            delay: Tiempo de espera tras llegar al final, en segundos, para que
+                   termine de cargar el contenido dinámico
+            max_scrolls: Número máximo de pasos (limita páginas con scroll infinito)
+            step_delay: Tiempo de espera entre pasos, en segundos
         """
-        # Obtener altura de la página
-        height = self.page.evaluate("() => document.body.scrollHeight")
-        
-        # Desplazar gradualmente
-        current_position = 0
-        while current_position < height:
-            current_position += step
-            self.page.evaluate(f"window.scrollTo(0, {current_position})")
-            time.sleep(delay)
+        self._call_page_helper('scrollToBottom', SCROLL_TO_BOTTOM_JS, {
+            'step': step,
+            'interval': int(step_delay * 1000),
+            'settle': int(delay * 1000),
+            'maxScrolls': max_scrolls
+        })
     
     def find_elements(self, selector: str) -> List[ElementHandle]:
         """
@@ -383,6 +993,80 @@ class WebCrawler:
             print(f"Error al obtener atributo {attribute} de {selector}: {e}")
             return None
     
+    def get_many(self, selectors: List[str],
+                 fields: Tuple[str, ...] = ('text', 'href', 'aria-label')) -> Dict[str, Optional[Dict[str, Optional[str]]]]:
+        """
+        Obtiene texto y atributos de varios elementos en una sola llamada al navegador.
+        
+        Los selectores se resuelven con document.querySelector, por lo que solo
+        se admiten selectores CSS: los propios de Playwright (text=, xpath=,
+        :has-text(), cadenas con >>) se tratan como no encontrados. Para ellos
+        hay que usar get_element_text() o get_element_attribute().
+        
+        Args:
+            selectors: Selectores CSS de los elementos (se usa el primero que coincida)
+            fields: Campos a extraer: 'text' para el texto del elemento o el nombre
+                    de cualquier atributo
+            
+        Returns:
+            Dict[str, Optional[Dict[str, Optional[str]]]]: Para cada selector, un
+            diccionario campo -> valor, o None si el elemento no se encuentra
+        """
+        return self._call_page_helper('getMany', GET_MANY_JS, {'selectors': list(selectors), 'fields': list(fields)})
+    
+    def get_texts(self, selectors: List[str]) -> List[Optional[str]]:
+        """
+        Obtiene el texto de varios elementos en una sola llamada al navegador.
+        
+        Solo admite selectores CSS (ver get_many).
+        
+        Args:
+            selectors: Selectores CSS de los elementos
+            
+        Returns:
+            List[Optional[str]]: Texto de cada elemento, en el mismo orden que los
+            selectores (None si el elemento no se encuentra)
+        """
+        values = self.get_many(list(dict.fromkeys(selectors)), ('text',))
+        return [values[selector]['text'] if values[selector] else None for selector in selectors]
+    
+    def get_attributes(self, pairs: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """
+        Obtiene varios atributos de varios elementos en una sola llamada al navegador.
+        
+        Solo admite selectores CSS (ver get_many).
+        
+        Args:
+            pairs: Pares (selector CSS, nombre del atributo)
+            
+        Returns:
+            List[Optional[str]]: Valor de cada atributo, en el mismo orden que los
+            pares (None si el elemento o el atributo no existen)
+        """
+        selectors = list(dict.fromkeys(selector for selector, _ in pairs))
+        fields = tuple(dict.fromkeys(attribute for _, attribute in pairs))
+        values = self.get_many(selectors, fields)
+        return [values[selector][attribute] if values[selector] else None for selector, attribute in pairs]
+    
+    def _call_page_helper(self, name: str, script: str, arg: Any = None) -> Any:
+        """
+        Ejecuta una de las funciones instaladas en la página por PAGE_HELPERS_JS.
+        
+        Si la función no está disponible, se evalúa el script completo.
+        
+        Args:
+            name: Nombre de la función en window.__darkPatternHelpers
+            script: Script equivalente a evaluar si la función no está instalada
+            arg: Argumento para la función
+            
+        Returns:
+            Any: Valor devuelto por la función
+        """
+        result = self.page.evaluate(CALL_PAGE_HELPER_JS, [name, arg])
+        if result.get('missing'):
+            return self.page.evaluate(script, arg)
+        return result.get('value')
+    
     def get_cookies(self) -> List[Dict[str, Any]]:
         """
         Obtiene todas las cookies de la página actual.
@@ -421,7 +1105,22 @@ class WebCrawler:
 class DarkPatternCrawler(WebCrawler):
     """Clase especializada para la detección de patrones oscuros."""
     
-    def __init__(self, headless: bool = True, screenshots_dir: str = None, timeout: int = 30000):
+    # Espera máxima (ms) al evento 'load' tras navegar. navigate() ya ha esperado
+    # a 'domcontentloaded'; esto solo deja unos instantes a las imágenes antes
+    # de la primera captura, sin volver a pagar el timeout completo
+    LOAD_SETTLE_TIMEOUT = 2000
+    
+    # Número de evidencias pendientes a partir del cual se escriben en disco
+    EVIDENCE_FLUSH_EVERY = 50
+    
+    # Número máximo de páginas (DOM y HTML) que recuerda get_cached_page; las
+    # menos usadas recientemente se descartan para no acumular todo el rastreo
+    PAGE_CACHE_SIZE = 8
+    
+    def __init__(self, headless: bool = True, screenshots_dir: str = None, timeout: int = 30000,
+                 pool: Optional[BrowserPool] = None, optimize_screenshots: bool = False,
+                 block_resources: Optional[Set[str]] = None, connect_url: Optional[str] = None,
+                 evidence_format: Literal["json", "ndjson"] = "json", pretty_evidence: bool = False):
         """
         Inicializa el crawler especializado en patrones oscuros.
         
@@ -429,24 +1128,89 @@ class DarkPatternCrawler(WebCrawler):
             headless: Si True, el navegador se ejecuta en modo headless (sin interfaz gráfica)
             screenshots_dir: Directorio donde se guardarán las capturas de pantalla
             timeout: Tiempo máximo de espera para las operaciones en milisegundos
+            pool: Pool de navegador compartido entre varios análisis
+            optimize_screenshots: Si True, al cerrar el crawler se recomprimen sin
+                                  pérdida todas las capturas PNG guardadas
+            block_resources: Tipos de recurso a bloquear durante la carga
+            connect_url: Endpoint WebSocket de un servidor de navegador al que conectarse
+            evidence_format: "json" para un archivo por evidencia, o "ndjson" para
+                             añadir cada evidencia como una línea de evidence.ndjson
+            pretty_evidence: Si True, los archivos JSON de evidencia se guardan
+                             indentados para leerlos a mano (más lento y más grandes)
         """
-        super().__init__(headless, screenshots_dir, timeout)
+        super().__init__(headless, screenshots_dir, timeout, pool, block_resources, connect_url)
+        self.optimize_screenshots = optimize_screenshots
+        self.evidence_format = evidence_format
+        self.pretty_evidence = pretty_evidence
         
         # Configurar directorio para evidencias
         self.evidence_dir = os.path.join(os.path.dirname(self.screenshots_dir), 'evidence')
-        os.makedirs(self.evidence_dir, exist_ok=True)
+        self._ensure_dir(self.evidence_dir)
+        
+        # Evidencias serializadas pendientes de escribir en disco (ruta, bytes)
+        self._pending_writes: List[Tuple[str, bytes]] = []
+        # Líneas pendientes de añadir a evidence.ndjson
+        self.evidence_log_path = os.path.join(self.evidence_dir, 'evidence.ndjson')
+        self._pending_lines: List[bytes] = []
+        
+        # Caché con la última versión analizada de cada URL (LRU, ver PAGE_CACHE_SIZE)
+        self._dom_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # URL analizada que sigue abierta en la página (para pedir su HTML bajo demanda)
+        self._current_analysis: Optional[str] = None
+    
+    def stop(self) -> None:
+        """Cierra el navegador, escribe las evidencias pendientes y, si está activado, optimiza las capturas guardadas."""
+        super().stop()
+        self.flush_evidence()
+        if self.optimize_screenshots:
+            self.optimize_saved_screenshots()
     
-    def analyze_page(self, url: str) -> Dict[str, Any]:
+    def _close_context(self) -> None:
+        """Cierra el contexto actual; el HTML de la última página ya no se puede pedir."""
+        super()._close_context()
+        self._current_analysis = None
+    
+    def optimize_saved_screenshots(self) -> None:
+        """
+        Recomprime sin pérdida todas las capturas PNG guardadas hasta ahora.
+        
+        Se lanza un único proceso de oxipng para todo el lote; si oxipng no está
+        instalado se recurre a PIL imagen por imagen.
+        """
+        self.wait_for_writes()
+        paths = [path for path in self.saved_screenshots if path.endswith('.png') and os.path.exists(path)]
+        self.saved_screenshots = []
+        if not paths:
+            return
+        
+        if shutil.which('oxipng'):
+            try:
+                subprocess.run(
+                    ['oxipng', '-o', '4', '--strip', 'safe', '-t', str(os.cpu_count() or 1), *paths],
+                    check=True, capture_output=True
+                )
+                return
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"Error al optimizar capturas con oxipng: {e}")
+        
+        for path in paths:
+            _optimize_png(path)
+    
+    def analyze_page(self, url: str, extract_dom: bool = True) -> Dict[str, Any]:
         """
         Analiza una página en busca de patrones oscuros.
         
         Args:
             url: URL de la página a analizar
+            extract_dom: Si False, no se extrae la estructura DOM en el navegador
+                         ('dom_structure' será None) y los detectores que lo
+                         admiten trabajan directamente sobre el HTML
             
         Returns:
             Dict[str, Any]: Resultados del análisis
         """
         # Navegar a la URL
+        self._current_analysis = None
         success = self.navigate(url)
         if not success:
             return {
@@ -455,24 +1219,45 @@ class DarkPatternCrawler(WebCrawler):
                 'error': 'No se pudo navegar a la página'
             }
         
-        # Esperar a que la página cargue completamente
-        self.wait_for_navigation()
+        # Breve espera acotada a que termine la carga (si no llega, se sigue igual)
+        try:
+            self.page.wait_for_load_state('load', timeout=self.LOAD_SETTLE_TIMEOUT)
+        except Exception:
+            pass
         
         # Tomar captura de pantalla inicial
-        screenshot_path = self.take_screenshot(name=f"initial_{url.split('//')[1].split('/')[0]}")
+        screenshot_path = self.take_screenshot(name=f"initial_{page_slug(url)}", full_page=False)
         
         # Recopilar información básica
         title = self.page.title()
-        content = self.get_page_content()
         
         # Desplazarse por la página para cargar contenido dinámico
         self.scroll_to_bottom()
         
-        # Tomar captura de pantalla después del desplazamiento
-        full_screenshot_path = self.take_screenshot(name=f"full_{url.split('//')[1].split('/')[0]}")
+        # Tomar captura de pantalla después del desplazamiento, salvo que la
+        # página quepa en la ventana y sea igual que la inicial
+        if self.page.evaluate(FITS_IN_VIEWPORT_JS):
+            full_screenshot_path = screenshot_path
+        else:
+            full_screenshot_path = self.take_screenshot(name=f"full_{page_slug(url)}")
         
-        # Recopilar estructura DOM
-        dom_structure = self.get_dom_structure()
+        # Recopilar texto visible y estructura DOM una sola vez y guardarlos en caché.
+        # Se extraen en cada navegación, aunque la URL ya se hubiera analizado: el
+        # marcado puede cambiar sin que cambien el texto ni la longitud del HTML.
+        # El HTML completo no se serializa aquí: solo se pide si alguien lo necesita
+        text = self.get_visible_text()
+        html_length = self.page.evaluate("() => document.documentElement.outerHTML.length")
+        dom_structure = self.get_dom_structure() if extract_dom else None
+        self._dom_cache[url] = {
+            'title': title,
+            'visible_text': text,
+            'html_length': html_length,
+            'dom_structure': dom_structure
+        }
+        self._dom_cache.move_to_end(url)
+        if len(self._dom_cache) > self.PAGE_CACHE_SIZE:
+            self._dom_cache.popitem(last=False)
+        self._current_analysis = url
         
         # Recopilar cookies
         cookies = self.get_cookies()
@@ -487,41 +1272,165 @@ class DarkPatternCrawler(WebCrawler):
             },
             'dom_structure': dom_structure,
             'cookies': cookies,
-            'html_length': len(content)
+            'html_length': html_length
         }
     
+    def analyze_urls(self, urls: List[str], include_content: bool = True) -> List[Dict[str, Any]]:
+        """
+        Analiza varias URLs reutilizando el mismo navegador.
+        
+        Cada URL se analiza en un contexto nuevo (sin cookies ni almacenamiento
+        de las anteriores), pero sin relanzar Chromium. Como el contexto se cierra
+        al pasar a la siguiente URL, el HTML se añade al resultado si se pide.
+        
+        Args:
+            urls: URLs a analizar
+            include_content: Si True, cada resultado incluye el HTML en 'page_content'
+            
+        Returns:
+            List[Dict[str, Any]]: Resultados del análisis, en el mismo orden que las URLs
+        """
+        results = []
+        for i, url in enumerate(urls):
+            try:
+                if i > 0:
+                    self.new_context()
+                result = self.analyze_page(url)
+                if include_content and result['success']:
+                    result['page_content'] = self.get_cached_page(url)['page_content']
+            except Exception as e:
+                result = {
+                    'url': url,
+                    'success': False,
+                    'error': str(e)
+                }
+            results.append(result)
+        return results
+    
+    def get_cached_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve los datos de la última versión analizada de una URL.
+        
+        Permite a los detectores trabajar sobre el texto y el DOM ya extraídos
+        por analyze_page en lugar de volver a pedirlos al navegador. El HTML
+        completo ('page_content') se obtiene la primera vez que se solicita,
+        siempre que la página siga abierta en esa URL, y queda en caché.
+        
+        Args:
+            url: URL analizada previamente con analyze_page
+            
+        Returns:
+            Optional[Dict[str, Any]]: Diccionario con 'title', 'visible_text',
+            'html_length', 'page_content' y 'dom_structure', o None si la URL no
+            se ha analizado (o ya salió de la caché, ver PAGE_CACHE_SIZE)
+        """
+        cached = self._dom_cache.get(url)
+        if cached is not None:
+            self._dom_cache.move_to_end(url)
+        if cached is not None and 'page_content' not in cached and self.page and self._current_analysis == url:
+            cached['page_content'] = self.get_page_content()
+        return cached
+    
     def save_evidence(self, evidence_type: str, data: Dict[str, Any], description: str = None) -> str:
         """
         Guarda evidencia de un patrón oscuro.
         
+        La evidencia se serializa en el momento pero se escribe en disco junto
+        con el resto al llamar a flush_evidence() (o al cerrar el crawler), así
+        que el archivo devuelto puede no existir todavía. Si una misma ruta se
+        guarda varias veces antes de escribirse, queda la última evidencia.
+        
         Args:
             evidence_type: Tipo de patrón oscuro
             data: Datos de la evidencia
             description: Descripción de la evidencia
             
         Returns:
-            str: Ruta al archivo de evidencia
+            str: Ruta donde se escribirá la evidencia (con "ndjson", la de
+            evidence.ndjson); llamar a flush_evidence() antes de leerla
         """
-        # Generar nombre de archivo
-        domain = self.current_url.split('//')[1].split('/')[0].replace('.', '_')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{domain}_{evidence_type}_{timestamp}.json"
-        
-        # Crear ruta completa
-        evidence_path = os.path.join(self.evidence_dir, filename)
+        now = datetime.now()
         
         # Preparar datos
         evidence_data = {
             'url': self.current_url,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'type': evidence_type,
             'description': description,
             'data': data
         }
         
-        # Guardar en formato JSON
-        import json
-        with open(evidence_path, 'w', encoding='utf-8') as f:
-            json.dump(evidence_data, f, indent=2, ensure_ascii=False)
+        # Serializar en formato JSON y encolar la escritura
+        if self.evidence_format == "ndjson":
+            evidence_path = self.evidence_log_path
+            self._pending_lines.append(self._serialize_evidence(evidence_data, indent=False) + b"\n")
+        else:
+            # Generar nombre de archivo
+            filename = f"{self._domain_slug}_{evidence_type}_{now.strftime('%Y%m%d_%H%M%S')}.json"
+            evidence_path = os.path.join(self.evidence_dir, filename)
+            self._pending_writes.append((evidence_path, self._serialize_evidence(evidence_data, indent=self.pretty_evidence)))
+        
+        # Limitar la memoria ocupada por evidencias pendientes en análisis largos
+        if len(self._pending_writes) + len(self._pending_lines) >= self.EVIDENCE_FLUSH_EVERY:
+            self.flush_evidence()
         
         return evidence_path
+    
+    @staticmethod
+    def _serialize_evidence(evidence_data: Dict[str, Any], indent: bool = True) -> bytes:
+        """
+        Serializa una evidencia a JSON en UTF-8.
+        
+        Args:
+            evidence_data: Datos de la evidencia
+            indent: Si True, JSON indentado; si False, en una sola línea
+            
+        Returns:
+            bytes: JSON codificado
+        """
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(evidence_data, option=option)
+            except TypeError:
+                pass
+        encoder = _JSON_PRETTY_ENCODER if indent else _JSON_ENCODER
+        return encoder.encode(evidence_data).encode('utf-8')
+    
+    def flush_evidence(self) -> List[str]:
+        """
+        Escribe en disco todas las evidencias pendientes.
+        
+        Returns:
+            List[str]: Rutas de los archivos escritos
+        """
+        written = []
+        
+        # Las evidencias NDJSON se añaden al registro con una sola escritura
+        if self._pending_lines:
+            lines, self._pending_lines = self._pending_lines, []
+            with open(self.evidence_log_path, 'ab') as f:
+                f.write(b"".join(lines))
+            written.append(self.evidence_log_path)
+        
+        # Si una ruta se repite, la última evidencia sobrescribe a las anteriores
+        pending = list(dict(self._pending_writes).items())
+        self._pending_writes = []
+        if not pending:
+            return written
+        
+        def write(item):
+            path, payload = item
+            with open(path, 'wb') as f:
+                f.write(payload)
+            return path
+        
+        if len(pending) == 1:
+            written.append(write(pending[0]))
+            return written
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(pending))) as executor:
+            written.extend(executor.map(write, pending))
+        return written
@@ -4,16 +4,397 @@ Define la interfaz y funcionalidades comunes para todos los detectores.
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Union, Iterator, Set, Callable
 import re
+import copy
 import json
 import os
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import xxhash
+except ImportError:  # xxhash es opcional; se usa blake2b de hashlib
+    xxhash = None
+
+try:
+    import hyperscan
+except ImportError:  # python-hyperscan es opcional; sin él cada patrón se busca con re
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick es opcional; sin él se comprueba palabra por palabra
+    ahocorasick = None
+
+try:
+    from re import _parser as _regex_parser  # Python 3.11+
+except ImportError:  # versiones anteriores
+    import sre_parse as _regex_parser
+
+# Confianza base máxima de calculate_confidence
+_CONFIDENCE_CAP = 0.9
+
+# Sintaxis de grupos con nombre ("(?P<nombre>" y "(?P=nombre)"), cuya P
+# mayúscula no cambia lo que coincide el patrón
+_NAMED_GROUP_SYNTAX_RE = re.compile(r"(?<!\\)\(\?P(?=[<=])")
+
+
+@lru_cache(maxsize=None)
+def _lowercase_variant(pattern: re.Pattern) -> Optional[re.Pattern]:
+    """
+    Obtiene la versión sin IGNORECASE de un patrón para buscar sobre texto en minúsculas.
+    
+    Solo es equivalente si el patrón está escrito en minúsculas (sin clases
+    como \\S o \\W ni rangos en mayúsculas), salvo la sintaxis de los grupos
+    con nombre.
+    
+    Args:
+        pattern: Patrón compilado con IGNORECASE
+        
+    Returns:
+        Optional[re.Pattern]: Patrón sin IGNORECASE, o None si no se puede usar
+    """
+    if not pattern.flags & re.IGNORECASE or not isinstance(pattern.pattern, str):
+        return None
+    source = _NAMED_GROUP_SYNTAX_RE.sub("(?", pattern.pattern)
+    if source != source.lower():
+        return None
+    return re.compile(pattern.pattern, pattern.flags & ~re.IGNORECASE)
+
+@lru_cache(maxsize=None)
+def _hyperscan_database(expressions: Tuple[str, ...]) -> Optional[Tuple[Any, threading.Lock]]:
+    """
+    Compila un conjunto de patrones en una base de datos de Hyperscan.
+    
+    Args:
+        expressions: Patrones en minúsculas (ver _lowercase_variant), que se
+                     buscarán sobre texto en minúsculas
+        
+    Returns:
+        Optional[Tuple[Any, threading.Lock]]: Base de datos y bloqueo para
+        usarla desde varios hilos (comparte su memoria de trabajo), o None si
+        Hyperscan no está disponible o no admite alguno de los patrones
+    """
+    if hyperscan is None:
+        return None
+    flags = hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP | hyperscan.HS_FLAG_SINGLEMATCH
+    database = hyperscan.Database()
+    try:
+        database.compile(
+            expressions=[expression.encode("utf-8") for expression in expressions],
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=[flags] * len(expressions)
+        )
+    except hyperscan.error:
+        # Construcciones de re sin equivalente en Hyperscan (p. ej. referencias hacia atrás)
+        return None
+    return database, threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _compile_pattern_list(patterns: Tuple[str, ...]) -> Tuple[Tuple[re.Pattern, ...], re.Pattern]:
+    """
+    Compila una lista de patrones y su alternancia (ver DarkPatternDetector.compile_patterns).
+    
+    Args:
+        patterns: Patrones regex
+        
+    Returns:
+        Tuple[Tuple[re.Pattern, ...], re.Pattern]: Patrones compilados sin
+        distinguir mayúsculas y alternancia de todos ellos
+    """
+    compiled = tuple(re.compile(pattern, re.IGNORECASE) for pattern in patterns)
+    return compiled, DarkPatternDetector.combine_patterns(list(patterns))
+
+
+@lru_cache(maxsize=None)
+def _min_match_length(patterns: Tuple[str, ...]) -> int:
+    """
+    Calcula la longitud de la coincidencia más corta posible (ver DarkPatternDetector.min_match_length).
+    
+    Args:
+        patterns: Patrones regex
+        
+    Returns:
+        int: Longitud mínima que puede tener una coincidencia de alguno de los patrones
+    """
+    return min(_regex_parser.parse(pattern, re.IGNORECASE).getwidth()[0] for pattern in patterns)
+
+
+@lru_cache(maxsize=None)
+def _keyword_automaton(keywords: Tuple[str, ...]) -> Optional[Any]:
+    """
+    Construye un autómata Aho-Corasick (ver DarkPatternDetector.keyword_automaton).
+    
+    Args:
+        keywords: Palabras clave en minúsculas
+        
+    Returns:
+        Optional[Any]: Autómata cuyo valor para cada palabra es la propia palabra,
+        o None si pyahocorasick no está disponible
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+def _matching_pattern_indexes(patterns: List[re.Pattern], lowered: str) -> Optional[Set[int]]:
+    """
+    Obtiene con una sola pasada de Hyperscan qué patrones aparecen en un texto.
+    
+    Args:
+        patterns: Patrones compilados con IGNORECASE
+        lowered: Texto ya en minúsculas
+        
+    Returns:
+        Optional[Set[int]]: Índices de los patrones que coinciden en algún punto,
+        o None si no se puede usar Hyperscan con estos patrones
+    """
+    if hyperscan is None:
+        return None
+    try:
+        data = lowered.encode("utf-8")
+    except UnicodeEncodeError:
+        # Con surrogates sueltos no hay UTF-8 válido para HS_FLAG_UTF8; se
+        # omite el prefiltro y se usa solo re
+        return None
+    variants = [_lowercase_variant(pattern) for pattern in patterns]
+    if any(variant is None for variant in variants):
+        return None
+    compiled = _hyperscan_database(tuple(variant.pattern for variant in variants))
+    if compiled is None:
+        return None
+    
+    database, lock = compiled
+    indexes = set()
+    
+    def on_match(pattern_id, start, end, flags, context):
+        indexes.add(pattern_id)
+    
+    with lock:
+        database.scan(data, match_event_handler=on_match)
+    return indexes
+
+
+# Analizadores HTML opcionales para trabajar directamente sobre el HTML cuando
+# no se dispone de la estructura DOM extraída del navegador
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+
+def _html_element_node(tag: str, attributes: Dict[str, Optional[str]], text: str) -> Dict[str, Any]:
+    """
+    Construye un nodo con el mismo formato que la estructura DOM del crawler.
+    
+    Args:
+        tag: Nombre de la etiqueta
+        attributes: Atributos del elemento
+        text: Texto del elemento
+        
+    Returns:
+        Dict[str, Any]: Nodo con 'type', 'id', 'classes', 'text' y 'attributes'
+    """
+    text = (text or "").strip()[:100]
+    node = {
+        "type": tag.upper(),
+        "id": attributes.get("id") or "",
+        "classes": (attributes.get("class") or "").split()
+    }
+    if text:
+        node["text"] = text
+    node["attributes"] = {
+        name: value or ""
+        for name, value in attributes.items()
+        if name not in ("id", "class")
+    }
+    return node
+
+
+def find_elements_in_html(page_content: str, types: Set[str]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Busca elementos de varios tipos analizando el HTML directamente.
+    
+    Usa selectolax si está instalado y, si no, lxml. Sirve cuando el análisis
+    se ha hecho sin extraer la estructura DOM en el navegador.
+    
+    Args:
+        page_content: Contenido HTML de la página
+        types: Tipos de elemento a buscar, en mayúsculas (p. ej. {"BUTTON", "A"})
+        
+    Returns:
+        Optional[Dict[str, List[Dict[str, Any]]]]: Para cada tipo, lista de
+        elementos ({"node", "path"}) en orden del documento, o None si no hay
+        ningún analizador HTML disponible
+    """
+    elements_by_type = {element_type: [] for element_type in types}
+    if not page_content or not page_content.strip():
+        return elements_by_type
+    
+    if HTMLParser is not None:
+        tree = HTMLParser(page_content)
+        elements = (
+            (element.tag, element.attributes, element.text(deep=True))
+            for element in tree.css(", ".join(sorted(t.lower() for t in types)))
+        )
+    elif lxml_html is not None:
+        document = lxml_html.fromstring(page_content)
+        elements = (
+            (element.tag, dict(element.attrib), element.text_content())
+            for element in document.xpath(" | ".join(f"//{t.lower()}" for t in sorted(types)))
+        )
+    else:
+        return None
+    
+    for tag, attributes, text in elements:
+        bucket = elements_by_type.get(tag.upper())
+        if bucket is not None:
+            bucket.append({
+                "node": _html_element_node(tag, attributes, text),
+                "path": f"html >> {tag.upper()}[{len(bucket)}]"
+            })
+    return elements_by_type
+
+
+def flatten_dom(dom_structure: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Aplana la estructura DOM en listas paralelas, en orden del documento.
+    
+    Es el recorrido común a todos los detectores (ver _get_flat_dom). Como
+    las listas están en preorden, el subárbol del nodo i es el tramo
+    nodes[i:ends[i]]. Los hijos que no son diccionarios se ignoran.
+    
+    Las rutas de los nodos no se construyen aquí: la mayoría de los nodos
+    nunca acaba en una detección, así que cada ruta se forma con dom_path
+    solo cuando se necesita.
+    
+    Args:
+        dom_structure: Estructura DOM de la página (puede ser None si no se extrajo)
+        
+    Returns:
+        Dict[str, List[Any]]: 'nodes' (los nodos), 'types' (su tipo en mayúsculas),
+        'depths' (su profundidad; 0 para la raíz), 'parents' (índice del padre;
+        -1 para la raíz), 'positions' (su posición entre los hijos del padre)
+        y 'ends' (índice siguiente al último nodo de su subárbol), más la
+        caché 'path_cache' de dom_path
+    """
+    nodes = []
+    types = []
+    depths = []
+    parents = []
+    positions = []
+    
+    stack = [(dom_structure, 0, -1, 0)] if dom_structure is not None else []
+    while stack:
+        node, depth, parent, position = stack.pop()
+        index = len(nodes)
+        nodes.append(node)
+        types.append(node.get("type", "").upper())
+        depths.append(depth)
+        parents.append(parent)
+        positions.append(position)
+        
+        children = node.get("children")
+        if children and isinstance(children, list):
+            # Se apilan en orden inverso para visitar primero el primer hijo
+            for i in range(len(children) - 1, -1, -1):
+                child = children[i]
+                if isinstance(child, dict):
+                    stack.append((child, depth + 1, index, i))
+    
+    # Recorriendo de atrás hacia delante, cada nodo ya conoce el final de su
+    # subárbol cuando se propaga a su padre
+    ends = list(range(1, len(nodes) + 1))
+    for i in range(len(nodes) - 1, 0, -1):
+        parent = parents[i]
+        if ends[i] > ends[parent]:
+            ends[parent] = ends[i]
+    
+    return {
+        "nodes": nodes,
+        "types": types,
+        "depths": depths,
+        "parents": parents,
+        "positions": positions,
+        "ends": ends,
+        "path_cache": {}
+    }
+
+
+def dom_path(flat_dom: Dict[str, List[Any]], index: int) -> str:
+    """
+    Obtiene la ruta de un nodo del DOM aplanado ("body > DIV[0] > A[2]").
+    
+    La ruta se forma a partir de los índices de los padres y se guarda en
+    'path_cache' junto con las de sus antecesores, que la siguiente ruta de
+    la misma rama reutiliza.
+    
+    Args:
+        flat_dom: Resultado de flatten_dom
+        index: Índice del nodo
+        
+    Returns:
+        str: Ruta del nodo, con el mismo formato que find_elements_by_attributes
+    """
+    cache = flat_dom["path_cache"]
+    path = cache.get(index)
+    if path is not None:
+        return path
+    
+    # Subir hasta la raíz o hasta el primer antecesor con la ruta ya formada
+    parents = flat_dom["parents"]
+    pending = []
+    while index >= 0 and index not in cache:
+        pending.append(index)
+        index = parents[index]
+    path = cache[index] if index >= 0 else None
+    
+    nodes = flat_dom["nodes"]
+    positions = flat_dom["positions"]
+    for i in reversed(pending):
+        if path is None:
+            path = "body"
+        else:
+            path = f"{path} > {nodes[i].get('type', 'unknown')}[{positions[i]}]"
+        cache[i] = path
+    return path
+
 
 class DarkPatternDetector(ABC):
     """Clase base abstracta para todos los detectores de patrones oscuros."""
     
+    # DOM aplanados de las últimas estructuras analizadas, por id de la
+    # estructura: (estructura original, resultado de flatten_dom, análisis
+    # propios de cada detector). Es común a todos los detectores, que
+    # analizan la misma página uno tras otro
+    _dom_cache: "OrderedDict[int, Tuple[Any, Dict[str, List[Any]], Dict[Any, Any]]]" = OrderedDict()
+    _dom_cache_lock = threading.Lock()
+    
+    # Número máximo de estructuras DOM que recuerda _dom_cache
+    DOM_CACHE_SIZE = 4
+    
+    # Número máximo de páginas cuyos resultados recuerda detect_cached()
+    RESULT_CACHE_SIZE = 1024
+    
+    # Número de evidencias a partir del cual calculate_confidence ya no crece
+    # (0.5 + 4 * 0.1 alcanza _CONFIDENCE_CAP); contar más no cambia la confianza
+    CONFIDENCE_SATURATION_COUNT = 4
+    
     def __init__(self, name: str, description: str):
         """
         Inicializa el detector base.
@@ -25,6 +406,12 @@ class DarkPatternDetector(ABC):
         self.name = name
         self.description = description
         self.confidence_threshold = 0.7  # Umbral de confianza predeterminado
+        
+        # Listas de trabajo reutilizadas de una página a otra (ver find_elements_by_types)
+        self._scratch_by_type: Dict[str, List[Dict[str, Any]]] = {}
+        
+        # Resultados de detect() por hash del contenido (LRU, ver detect_cached)
+        self._result_cache: "OrderedDict[Tuple[str, bool, float], List[Dict[str, Any]]]" = OrderedDict()
     
     @abstractmethod
     def detect(self, page_content: str, dom_structure: Dict[str, Any], 
@@ -43,6 +430,59 @@ class DarkPatternDetector(ABC):
         """
         pass
     
+    @staticmethod
+    def _content_hash(page_content: str) -> str:
+        """
+        Calcula un hash rápido del contenido HTML.
+        
+        Args:
+            page_content: Contenido HTML de la página
+            
+        Returns:
+            str: Hash hexadecimal del contenido
+        """
+        data = page_content.encode('utf-8', 'surrogatepass')
+        if xxhash is not None:
+            return xxhash.xxh3_64_hexdigest(data)
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
+    
+    def detect_cached(self, page_content: str, dom_structure: Dict[str, Any],
+                      screenshot_path: str, url: str) -> List[Dict[str, Any]]:
+        """
+        Igual que detect(), pero reutiliza el resultado si ya se analizó el mismo HTML.
+        
+        Las páginas de un mismo sitio suelen repetir banners y ventanas
+        emergentes idénticos; si el HTML coincide, no se vuelve a ejecutar el
+        detector. La estructura DOM se obtiene del mismo HTML, así que solo se
+        tiene en cuenta si está presente o no.
+        
+        Args:
+            page_content: Contenido HTML de la página
+            dom_structure: Estructura DOM de la página
+            screenshot_path: Ruta a la captura de pantalla de la página
+            url: URL de la página
+            
+        Returns:
+            List[Dict[str, Any]]: Lista de patrones oscuros detectados
+        """
+        cache_key = (self._content_hash(page_content), dom_structure is None, self.confidence_threshold)
+        detections = self._result_cache.get(cache_key)
+        if detections is None:
+            detections = self.detect(page_content, dom_structure, screenshot_path, url)
+            self._result_cache[cache_key] = detections
+            if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        else:
+            self._result_cache.move_to_end(cache_key)
+        
+        # Copias completas (la evidencia anidada incluida, para que quien las
+        # modifique no altere la caché) que apuntan a la captura de esta página
+        copies = copy.deepcopy(detections)
+        for detection in copies:
+            if "screenshot" in detection:
+                detection["screenshot"] = screenshot_path
+        return copies
+    
     def get_improvement_suggestion(self, pattern_type: str) -> str:
         """
         Genera una sugerencia de mejora para un patrón oscuro detectado.
@@ -94,106 +534,388 @@ class DarkPatternDetector(ABC):
             "detections": detections
         }
     
-    def search_text_patterns(self, text: str, patterns: List[str], 
-                             context_chars: int = 50) -> List[Dict[str, Any]]:
+    @staticmethod
+    def combine_patterns(patterns: List[str]) -> re.Pattern:
+        """
+        Une varios patrones regex en una única alternancia.
+        
+        Cada patrón queda en un grupo con nombre p<i> (su posición en la lista),
+        así que match.lastgroup indica cuál de ellos produjo una coincidencia.
+        
+        Args:
+            patterns: Lista de patrones regex (sin grupos con nombre propios)
+            
+        Returns:
+            re.Pattern: Patrón compilado (sin distinguir mayúsculas) que coincide
+            donde coincida cualquiera de los patrones
+        """
+        return re.compile("|".join(f"(?P<p{index}>{pattern})" for index, pattern in enumerate(patterns)), re.IGNORECASE)
+    
+    @staticmethod
+    def compile_patterns(patterns: List[str]) -> Tuple[Tuple[re.Pattern, ...], re.Pattern]:
+        """
+        Compila una lista de patrones para search_text_patterns.
+        
+        El resultado se guarda por lista de patrones: todas las instancias de un
+        detector comparten la misma compilación, en lugar de repetirla en cada
+        __init__. No debe modificarse.
+        
+        Args:
+            patterns: Lista de patrones regex
+            
+        Returns:
+            Tuple[Tuple[re.Pattern, ...], re.Pattern]: Patrones compilados sin
+            distinguir mayúsculas y su alternancia (ver combine_patterns)
+        """
+        return _compile_pattern_list(tuple(patterns))
+    
+    @staticmethod
+    def min_match_length(patterns: List[str]) -> int:
+        """
+        Obtiene la longitud de la coincidencia más corta posible de unos patrones.
+        
+        Un texto más corto no puede coincidir con ninguno de ellos, así que los
+        detectores pueden descartarlo sin buscar. Se calcula con el analizador
+        de re, de modo que sigue siendo correcta al añadir o cambiar patrones.
+        
+        Args:
+            patterns: Lista de patrones regex
+            
+        Returns:
+            int: Longitud mínima de una coincidencia (0 si algún patrón puede
+            coincidir con la cadena vacía)
+        """
+        return _min_match_length(tuple(patterns))
+    
+    @staticmethod
+    def keyword_automaton(keywords: List[str]) -> Optional[Any]:
+        """
+        Obtiene un autómata Aho-Corasick con unas palabras clave.
+        
+        Una sola pasada del autómata por un texto encuentra todas las palabras
+        que aparecen en él. Como compile_patterns, se construye una sola vez por
+        lista de palabras y lo comparten todas las instancias; solo se lee.
+        
+        Args:
+            keywords: Palabras clave en minúsculas
+            
+        Returns:
+            Optional[Any]: Autómata cuyo valor para cada palabra es la propia
+            palabra, o None si pyahocorasick no está disponible
+        """
+        return _keyword_automaton(tuple(keywords))
+    
+    @staticmethod
+    def combine_keywords(keywords: List[str]) -> re.Pattern:
+        """
+        Une varias palabras clave literales en una única alternancia.
+        
+        Args:
+            keywords: Lista de palabras clave
+            
+        Returns:
+            re.Pattern: Patrón compilado que coincide donde aparezca cualquiera de
+            las palabras clave en minúsculas (se busca sobre texto ya en minúsculas)
+        """
+        return re.compile("|".join(re.escape(keyword.lower()) for keyword in keywords))
+    
+    def search_text_patterns(self, text: str, patterns: List[Union[str, re.Pattern]], 
+                             context_chars: int = 50,
+                             combined_pattern: Optional[re.Pattern] = None,
+                             text_lower: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Busca patrones de texto en el contenido.
         
         Args:
             text: Texto donde buscar
-            patterns: Lista de patrones regex a buscar
+            patterns: Lista de patrones regex a buscar. Los patrones en texto se
+                      buscan sin distinguir mayúsculas; los ya compilados se usan
+                      tal cual (con sus propias opciones)
             context_chars: Número de caracteres de contexto a incluir
+            combined_pattern: Alternancia de todos los patrones, en el mismo orden
+                              (ver combine_patterns). Si se indica, una sola pasada
+                              sobre el texto descarta las páginas sin ninguna
+                              coincidencia, y los patrones empiezan a buscar desde
+                              la primera
+            text_lower: El texto ya pasado a minúsculas, si quien llama lo tiene
+                        (así no se vuelve a convertir en cada búsqueda)
             
         Returns:
             List[Dict[str, Any]]: Lista de coincidencias con contexto
         """
         results = []
         
-        for pattern in patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
-                start_pos = max(0, match.start() - context_chars)
-                end_pos = min(len(text), match.end() + context_chars)
-                
-                # Obtener contexto antes y después
-                context = text[start_pos:end_pos]
+        # Los patrones en minúsculas se buscan sin IGNORECASE sobre el texto
+        # pasado a minúsculas una sola vez, que es bastante más rápido. Solo se
+        # hace si la conversión no cambia la longitud, para que las posiciones
+        # sigan siendo válidas en el texto original
+        lowered = text_lower if text_lower is not None else text.lower()
+        if len(lowered) != len(text):
+            lowered = None
+        
+        patterns = [
+            pattern if isinstance(pattern, re.Pattern) else re.compile(pattern, re.IGNORECASE)
+            for pattern in patterns
+        ]
+        
+        # Con Hyperscan, una sola pasada indica qué patrones aparecen; los demás no
+        # se buscan, y si no aparece ninguno ni siquiera se prueba la alternancia.
+        # Las posiciones y el contexto se siguen obteniendo con re
+        candidates = _matching_pattern_indexes(patterns, lowered) if lowered is not None else None
+        if candidates is not None and not candidates:
+            return results
+        
+        start = 0
+        first_index = 0
+        if combined_pattern is not None:
+            variant = _lowercase_variant(combined_pattern) if lowered is not None else None
+            if variant is not None:
+                first_match = variant.search(lowered)
+            else:
+                first_match = combined_pattern.search(text)
+            if not first_match:
+                return results
+            # Ningún patrón puede coincidir antes de la primera coincidencia de la
+            # alternancia, y los anteriores al que la produjo tampoco en esa posición
+            start = first_match.start()
+            if first_match.lastgroup is not None:
+                first_index = int(first_match.lastgroup[1:])
+        
+        for index, pattern in enumerate(patterns):
+            if candidates is not None and index not in candidates:
+                continue
+            haystack = text
+            if lowered is not None:
+                variant = _lowercase_variant(pattern)
+                if variant is not None:
+                    pattern, haystack = variant, lowered
+            for match in pattern.finditer(haystack, start + 1 if index < first_index else start):
+                match_start, match_end = match.span()
+                matched_text = text[match_start:match_end]
+                start_pos = max(0, match_start - context_chars)
+                end_pos = min(len(text), match_end + context_chars)
                 
-                # Resaltar la coincidencia en el contexto
-                match_in_context = context.replace(
-                    match.group(0), 
-                    f"**{match.group(0)}**"
-                )
+                # Obtener contexto antes y después, resaltando la coincidencia
+                # (solo esta, aunque el mismo texto aparezca más veces en el contexto)
+                match_in_context = f"{text[start_pos:match_start]}**{matched_text}**{text[match_end:end_pos]}"
                 
                 results.append({
-                    "match": match.group(0),
+                    "match": matched_text,
                     "context": match_in_context,
                     "position": {
-                        "start": match.start(),
-                        "end": match.end()
+                        "start": match_start,
+                        "end": match_end
                     }
                 })
         
         return results
     
     def find_elements_by_attributes(self, dom_structure: Dict[str, Any], 
-                                   attribute_filters: Dict[str, str]) -> List[Dict[str, Any]]:
+                                   attribute_filters: Dict[str, str],
+                                   out: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """
         Busca elementos en el DOM que coincidan con los filtros de atributos.
         
         Args:
             dom_structure: Estructura DOM de la página
             attribute_filters: Diccionario de atributos y valores a buscar
+            out: Lista a reutilizar para los resultados; se vacía antes de llenarla
             
         Returns:
             List[Dict[str, Any]]: Lista de elementos que coinciden
         """
-        matches = []
+        if out is None:
+            return list(self.iter_elements_by_attributes(dom_structure, attribute_filters))
+        out.clear()
+        out.extend(self.iter_elements_by_attributes(dom_structure, attribute_filters))
+        return out
+    
+    def iter_elements_by_attributes(self, dom_structure: Dict[str, Any],
+                                    attribute_filters: Dict[str, str]) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre el DOM y va devolviendo los elementos que coinciden con los filtros.
         
-        def search_node(node, path="body"):
-            # Verificar si el nodo actual coincide con los filtros
-            node_matches = True
+        Permite dejar de buscar en cuanto se tiene lo necesario (p. ej. la
+        primera coincidencia).
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            attribute_filters: Diccionario de atributos y valores a buscar
             
+        Returns:
+            Iterator[Dict[str, Any]]: Elementos ({"node", "path"}) en orden del documento
+        """
+        # Preparar los filtros una sola vez (valores en minúsculas donde se comparan así)
+        type_filter = attribute_filters["type"].lower() if "type" in attribute_filters else None
+        has_id_filter = "id" in attribute_filters
+        id_filter = attribute_filters.get("id")
+        class_filter = attribute_filters["class"].lower() if "class" in attribute_filters else None
+        text_filter = attribute_filters["text"].lower() if "text" in attribute_filters else None
+        custom_filters = {key: value for key, value in attribute_filters.items()
+                          if key not in ("type", "id", "class", "text")}
+        
+        flat_dom = self._get_flat_dom(dom_structure)
+        for index, node in enumerate(flat_dom["nodes"]):
             # Verificar tipo de nodo
-            if "type" in attribute_filters and node.get("type", "").lower() != attribute_filters["type"].lower():
-                node_matches = False
+            if type_filter is not None and node.get("type", "").lower() != type_filter:
+                continue
             
             # Verificar ID
-            if "id" in attribute_filters and node.get("id", "") != attribute_filters["id"]:
-                node_matches = False
+            if has_id_filter and node.get("id", "") != id_filter:
+                continue
             
-            # Verificar clases
-            if "class" in attribute_filters and node.get("classes"):
-                if not any(c.lower() == attribute_filters["class"].lower() for c in node.get("classes", [])):
-                    node_matches = False
+            # Verificar clases (solo si el nodo tiene alguna)
+            if class_filter is not None:
+                classes = node.get("classes")
+                if classes and not any(c.lower() == class_filter for c in classes):
+                    continue
             
-            # Verificar texto
-            if "text" in attribute_filters and node.get("text"):
-                if attribute_filters["text"].lower() not in node.get("text", "").lower():
-                    node_matches = False
+            # Verificar texto (solo si el nodo tiene texto)
+            if text_filter is not None:
+                text = node.get("text")
+                if text and text_filter not in text.lower():
+                    continue
             
             # Verificar atributos personalizados
-            for attr_key, attr_value in attribute_filters.items():
-                if attr_key not in ["type", "id", "class", "text"]:
-                    if not node.get("attributes") or attr_key not in node.get("attributes") or node["attributes"][attr_key] != attr_value:
-                        node_matches = False
-            
-            # Si coincide, añadir a los resultados
-            if node_matches:
-                matches.append({
-                    "node": node,
-                    "path": path
-                })
+            if custom_filters:
+                attributes = node.get("attributes")
+                if not attributes or any(attr_key not in attributes or attributes[attr_key] != attr_value
+                                         for attr_key, attr_value in custom_filters.items()):
+                    continue
+            
+            yield {
+                "node": node,
+                "path": dom_path(flat_dom, index)
+            }
+    
+    def _get_dom_entry(self, dom_structure: Dict[str, Any]) -> Tuple[Any, Dict[str, List[Any]], Dict[Any, Any]]:
+        """
+        Obtiene la entrada de _dom_cache de una estructura DOM, aplanándola si no está.
+        
+        La estructura DOM no debe modificarse entre análisis: la caché se
+        identifica por el objeto, no por su contenido. La entrada guarda una
+        referencia a la estructura, así que su id no puede reutilizarse
+        mientras siga en la caché.
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            
+        Returns:
+            Tuple: (estructura, resultado de flatten_dom, análisis por detector)
+        """
+        cache = DarkPatternDetector._dom_cache
+        key = id(dom_structure)
+        # Se aplana dentro del bloqueo: los detectores de una misma página pueden
+        # ejecutarse en varios hilos y así la estructura se aplana una sola vez
+        with DarkPatternDetector._dom_cache_lock:
+            entry = cache.get(key)
+            if entry is not None and entry[0] is dom_structure:
+                cache.move_to_end(key)
+                return entry
+            
+            entry = (dom_structure, flatten_dom(dom_structure), {})
+            cache[key] = entry
+            cache.move_to_end(key)
+            if len(cache) > self.DOM_CACHE_SIZE:
+                cache.popitem(last=False)
+        return entry
+    
+    def _get_flat_dom(self, dom_structure: Dict[str, Any]) -> Dict[str, List[Any]]:
+        """
+        Obtiene el DOM aplanado, reutilizándolo si ya se aplanó esta misma estructura.
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            
+        Returns:
+            Dict[str, List[Any]]: Resultado de flatten_dom
+        """
+        return self._get_dom_entry(dom_structure)[1]
+    
+    def _get_lowered_texts(self, dom_structure: Dict[str, Any]) -> List[str]:
+        """
+        Obtiene el texto en minúsculas de cada nodo del DOM aplanado.
+        
+        Se calcula la primera vez que un detector lo pide y se guarda junto al
+        DOM aplanado, así que el texto de cada nodo se pasa a minúsculas una
+        sola vez por página, no una vez por detector.
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            
+        Returns:
+            List[str]: Texto de cada nodo en minúsculas ("" si no tiene), en el
+            mismo orden que flatten_dom
+        """
+        flat_dom = self._get_flat_dom(dom_structure)
+        texts_lower = flat_dom.get("texts_lower")
+        if texts_lower is None:
+            texts_lower = flat_dom["texts_lower"] = [
+                node["text"].lower() if node.get("text") else ""
+                for node in flat_dom["nodes"]
+            ]
+        return texts_lower
+    
+    def _get_dom_analysis(self, dom_structure: Dict[str, Any],
+                          compute: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Obtiene un análisis del DOM propio de este detector, calculándolo una sola vez por estructura.
+        
+        Sirve para los recorridos que no dependen del umbral de confianza:
+        si el mismo detector vuelve a analizar la misma estructura, se
+        reutiliza el resultado. Quien lo use no debe modificarlo.
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            compute: Función que calcula el análisis a partir de la estructura
             
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_node(child, child_path)
+        Returns:
+            Any: Resultado de compute para esta estructura y este detector
+        """
+        analyses = self._get_dom_entry(dom_structure)[2]
+        result = analyses.get(self)
+        if result is None:
+            result = analyses[self] = compute(dom_structure)
+        return result
+    
+    def find_elements_by_types(self, dom_structure: Dict[str, Any], types: Set[str],
+                               out: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Busca en una sola pasada todos los elementos de varios tipos.
         
-        # Iniciar búsqueda desde la raíz
-        search_node(dom_structure)
-        return matches
+        Args:
+            dom_structure: Estructura DOM de la página
+            types: Tipos de elemento a buscar, en mayúsculas (p. ej. {"BUTTON", "A"})
+            out: Diccionario de listas a reutilizar (p. ej. self._scratch_by_type);
+                 se vacían antes de llenarlas, así que el resultado solo es válido
+                 hasta la siguiente llamada con el mismo diccionario
+            
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Para cada tipo, lista de elementos
+            ({"node", "path"}) en orden del documento
+        """
+        if out is None:
+            elements_by_type = {element_type: [] for element_type in types}
+        else:
+            elements_by_type = out
+            for element_type in types:
+                bucket = elements_by_type.get(element_type)
+                if bucket is None:
+                    elements_by_type[element_type] = []
+                else:
+                    bucket.clear()
+        flat_dom = self._get_flat_dom(dom_structure)
+        for index, node_type in enumerate(flat_dom["types"]):
+            bucket = elements_by_type.get(node_type) if node_type in types else None
+            if bucket is not None:
+                bucket.append({
+                    "node": flat_dom["nodes"][index],
+                    "path": dom_path(flat_dom, index)
+                })
+        return elements_by_type
     
-    def calculate_confidence(self, evidence_count: int, evidence_strength: float) -> float:
+    @staticmethod
+    def calculate_confidence(evidence_count: int, evidence_strength: float) -> float:
         """
         Calcula el nivel de confianza de una detección.
         
@@ -205,5 +927,23 @@ class DarkPatternDetector(ABC):
             float: Nivel de confianza (0.0-1.0)
         """
         # Fórmula simple: más evidencias y más fuertes = mayor confianza
-        base_confidence = min(0.5 + (evidence_count * 0.1), 0.9)
+        base_confidence = 0.5 + evidence_count * 0.1
+        if base_confidence > _CONFIDENCE_CAP:
+            base_confidence = _CONFIDENCE_CAP
         return base_confidence * evidence_strength
+    
+    @staticmethod
+    def max_confidence(evidence_strength: float) -> float:
+        """
+        Calcula la confianza más alta que puede dar calculate_confidence con una fuerza dada.
+        
+        Permite saltarse un análisis cuando ninguna de sus detecciones podría
+        superar el umbral de confianza.
+        
+        Args:
+            evidence_strength: Fuerza de las evidencias (0.0-1.0)
+            
+        Returns:
+            float: Confianza máxima alcanzable, con cualquier número de evidencias
+        """
+        return _CONFIDENCE_CAP * evidence_strength
@@ -3,12 +3,12 @@ Detector de patrones oscuros de tipo confirmshaming.
 Identifica textos y elementos que hacen sentir mal al usuario por rechazar una opción.
 """
 
-import re
+from itertools import chain
 from typing import Dict, Any, List, Optional
 import os
 from pathlib import Path
 
-from .base_detector import DarkPatternDetector
+from .base_detector import DarkPatternDetector, find_elements_in_html
 
 
 class ConfirmshamingDetector(DarkPatternDetector):
@@ -81,6 +81,37 @@ class ConfirmshamingDetector(DarkPatternDetector):
             "unprotected", "vulnerable", "exposed",
             "unsafe", "insecure", "risky"
         ]
+        
+        # Patrones precompilados (se usan en cada página y en cada elemento)
+        self._compiled_text_patterns, self._combined_pattern = self.compile_patterns(self.text_patterns)
+        
+        # Longitud de la coincidencia más corta posible de text_patterns: un
+        # texto más corto no puede coincidir con ninguno
+        self._min_pattern_length = self.min_match_length(self.text_patterns)
+        
+        # Palabras negativas ya en minúsculas (las del autómata y la comprobación simple)
+        self._negative_words_lower = [word.lower() for word in self.negative_words]
+        
+        # Autómata Aho-Corasick con las palabras negativas: una sola pasada por
+        # texto encuentra todas las que aparecen
+        self._negative_automaton = self.keyword_automaton(self._negative_words_lower)
+    
+    def _find_negative_words(self, text: str) -> List[str]:
+        """
+        Obtiene las palabras negativas contenidas en un texto.
+        
+        Args:
+            text: Texto donde buscar
+            
+        Returns:
+            List[str]: Palabras negativas encontradas, en el orden de negative_words
+            (las palabras repetidas en la lista aparecen repetidas)
+        """
+        text_lower = text.lower()
+        if self._negative_automaton is not None:
+            hits = {word for _, word in self._negative_automaton.iter(text_lower)}
+            return [word for word, word_lower in zip(self.negative_words, self._negative_words_lower) if word_lower in hits]
+        return [word for word, word_lower in zip(self.negative_words, self._negative_words_lower) if word_lower in text_lower]
     
     def detect(self, page_content: str, dom_structure: Dict[str, Any], 
                screenshot_path: str, url: str) -> List[Dict[str, Any]]:
@@ -99,11 +130,12 @@ class ConfirmshamingDetector(DarkPatternDetector):
         detections = []
         
         # 1. Buscar patrones de texto en el contenido HTML
-        text_matches = self.search_text_patterns(page_content, self.text_patterns)
+        text_matches = self.search_text_patterns(page_content, self._compiled_text_patterns,
+                                                 combined_pattern=self._combined_pattern)
         
         for match in text_matches:
             # Calcular confianza basada en la presencia de palabras negativas
-            negative_word_count = sum(1 for word in self.negative_words if word.lower() in match["context"].lower())
+            negative_word_count = len(self._find_negative_words(match["context"]))
             confidence = self.calculate_confidence(negative_word_count + 1, 0.8)
             
             if confidence >= self.confidence_threshold:
@@ -116,15 +148,18 @@ class ConfirmshamingDetector(DarkPatternDetector):
                     "screenshot": screenshot_path
                 })
         
+        # Recorrer el DOM una sola vez para todos los tipos de elemento que interesan.
+        # Si el análisis se hizo sin extraer el DOM, se buscan en el HTML
+        element_types = {"BUTTON", "A", "INPUT", "LABEL"}
+        elements_by_type = None
+        if not dom_structure:
+            elements_by_type = find_elements_in_html(page_content, element_types)
+        if elements_by_type is None:
+            elements_by_type = self.find_elements_by_types(dom_structure, element_types, out=self._scratch_by_type)
+        
         # 2. Buscar botones o enlaces de rechazo con texto negativo
         # Buscar elementos que parezcan botones o enlaces de rechazo
-        decline_buttons = self.find_elements_by_attributes(
-            dom_structure, 
-            {"type": "BUTTON"}
-        ) + self.find_elements_by_attributes(
-            dom_structure, 
-            {"type": "A"}
-        )
+        decline_buttons = chain(elements_by_type["BUTTON"], elements_by_type["A"])
         
         for button in decline_buttons:
             node = button["node"]
@@ -134,10 +169,15 @@ class ConfirmshamingDetector(DarkPatternDetector):
                 continue
                 
             # Verificar si el texto contiene patrones de confirmshaming
-            negative_word_count = sum(1 for word in self.negative_words if word.lower() in text.lower())
+            negative_words = self._find_negative_words(text)
+            negative_word_count = len(negative_words)
+            
+            # Un texto corto sin palabras negativas no puede dar una detección
+            if not negative_words and len(text) < self._min_pattern_length:
+                continue
             
             # Buscar patrones específicos en el texto del botón
-            pattern_matches = any(re.search(pattern, text, re.IGNORECASE) for pattern in self.text_patterns)
+            pattern_matches = self._combined_pattern.search(text) is not None
             
             if negative_word_count > 0 or pattern_matches:
                 confidence = self.calculate_confidence(negative_word_count + (1 if pattern_matches else 0), 0.9)
@@ -149,7 +189,7 @@ class ConfirmshamingDetector(DarkPatternDetector):
                         "evidence": {
                             "text": text,
                             "path": button["path"],
-                            "negative_words": [word for word in self.negative_words if word.lower() in text.lower()]
+                            "negative_words": negative_words
                         },
                         "confidence": confidence,
                         "location": f"Botón o enlace en {button['path']}",
@@ -158,13 +198,7 @@ class ConfirmshamingDetector(DarkPatternDetector):
         
         # 3. Buscar formularios con opciones de rechazo negativas
         # Buscar elementos de formulario como checkboxes o radios
-        form_elements = self.find_elements_by_attributes(
-            dom_structure, 
-            {"type": "INPUT"}
-        ) + self.find_elements_by_attributes(
-            dom_structure, 
-            {"type": "LABEL"}
-        )
+        form_elements = chain(elements_by_type["INPUT"], elements_by_type["LABEL"])
         
         for element in form_elements:
             node = element["node"]
@@ -174,10 +208,15 @@ class ConfirmshamingDetector(DarkPatternDetector):
                 continue
                 
             # Verificar si el texto contiene patrones de confirmshaming
-            negative_word_count = sum(1 for word in self.negative_words if word.lower() in text.lower())
+            negative_words = self._find_negative_words(text)
+            negative_word_count = len(negative_words)
+            
+            # Un texto corto sin palabras negativas no puede dar una detección
+            if not negative_words and len(text) < self._min_pattern_length:
+                continue
             
             # Buscar patrones específicos en el texto del elemento
-            pattern_matches = any(re.search(pattern, text, re.IGNORECASE) for pattern in self.text_patterns)
+            pattern_matches = self._combined_pattern.search(text) is not None
             
             if negative_word_count > 0 or pattern_matches:
                 confidence = self.calculate_confidence(negative_word_count + (1 if pattern_matches else 0), 0.85)
@@ -189,7 +228,7 @@ class ConfirmshamingDetector(DarkPatternDetector):
                         "evidence": {
                             "text": text,
                             "path": element["path"],
-                            "negative_words": [word for word in self.negative_words if word.lower() in text.lower()]
+                            "negative_words": negative_words
                         },
                         "confidence": confidence,
                         "location": f"Elemento de formulario en {element['path']}",
@@ -4,16 +4,119 @@ Identifica interfaces que confunden al usuario o botones diseñados para engaña
 """
 
 import re
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from itertools import chain
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterable
 import os
 from pathlib import Path
 
-from .base_detector import DarkPatternDetector
+from .base_detector import DarkPatternDetector, dom_path, find_elements_in_html
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick es opcional; sin él se usan comparadores generados
+    ahocorasick = None
+
+
+# Atributos de los nodos que no tienen; compartido y de solo lectura para no
+# crear un diccionario vacío por nodo
+_NO_ATTRIBUTES = MappingProxyType({})
+
+
+@lru_cache(maxsize=1024)
+def _lower_token(token: str) -> str:
+    """
+    Pasa a minúsculas una clase CSS, recordando las ya vistas.
+    
+    Las mismas clases ("btn", "primary"...) se repiten en casi todos los botones
+    de una página, así que cada una solo se convierte una vez.
+    
+    Args:
+        token: Clase CSS
+        
+    Returns:
+        str: Clase en minúsculas
+    """
+    return token.lower()
+
+
+def _build_substring_matcher(keywords: Iterable[str]) -> Callable[[str], bool]:
+    """
+    Genera una función que indica si un texto contiene alguna de las palabras clave.
+    
+    La función se compila a partir de una cadena de comprobaciones "in" unidas
+    con "or", que para textos cortos como los de los botones es bastante más
+    rápida que una alternancia de expresiones regulares o un any() sobre la lista.
+    
+    Args:
+        keywords: Palabras clave, ya en minúsculas
+        
+    Returns:
+        Callable[[str], bool]: Función que recibe el texto en minúsculas
+    """
+    checks = " or ".join(f"{keyword!r} in text" for keyword in sorted(keywords)) or "False"
+    namespace = {}
+    exec(f"def matcher(text):\n    return {checks}\n", namespace)
+    return namespace["matcher"]
 
 
 class ConfusingInterfaceDetector(DarkPatternDetector):
     """Detector de patrones de interfaces confusas o botones engañosos."""
     
+    # Clases que hacen que un DIV se trate como botón o enlace
+    _BUTTON_LIKE_CLASSES = frozenset(["button", "btn", "link", "boton", "enlace"])
+    
+    # Papel de cada tipo de nodo en el análisis, como bits combinables; los
+    # tipos que no aparecen no se analizan (solo se recorren sus hijos)
+    _KIND_BUTTON = 1      # botón o enlace
+    _KIND_UI = 2          # elemento de interfaz
+    _KIND_FORM = 4        # formulario (agrupa botones)
+    _KIND_DIV = 8         # botón solo si tiene una clase de _BUTTON_LIKE_CLASSES
+    
+    # Clasificación de cada botón como bits, para combinar los de un grupo con un OR
+    _FLAG_PRIMARY_TEXT = 1
+    _FLAG_SECONDARY_TEXT = 2
+    _FLAG_PRIMARY_CLASS = 4
+    _FLAG_SECONDARY_CLASS = 8
+    _FLAGS_PRIMARY = _FLAG_PRIMARY_TEXT | _FLAG_PRIMARY_CLASS        # actúa como primario
+    _FLAGS_SECONDARY = _FLAG_SECONDARY_TEXT | _FLAG_SECONDARY_CLASS  # actúa como secundario
+    # Tipos cuyo subárbol no puede contener botones ni controles de formulario y
+    # no se recorren. Los elementos SVG conservan el nombre en minúsculas
+    _SKIP_TYPES = frozenset([
+        "SCRIPT", "STYLE", "SVG", "svg", "HEAD", "META", "LINK", "NOSCRIPT", "IFRAME"
+    ])
+    
+    _NODE_KINDS = {
+        "BUTTON": _KIND_BUTTON,
+        "A": _KIND_BUTTON,
+        "INPUT": _KIND_BUTTON | _KIND_UI,
+        "SELECT": _KIND_UI,
+        "TEXTAREA": _KIND_UI,
+        "LABEL": _KIND_UI,
+        "FORM": _KIND_UI | _KIND_FORM,
+        "DIV": _KIND_DIV
+    }
+    
+    # Mensajes de inconsistencia según (texto primario con clase secundaria,
+    # texto secundario con clase primaria), en el orden en que se informan
+    _INCONSISTENCY_MESSAGES = {
+        (True, False): (
+            "Texto de acción primaria con clase de botón secundario",
+            "Botón de aceptar/confirmar con estilo visual poco prominente"
+        ),
+        (False, True): (
+            "Texto de acción secundaria con clase de botón primario",
+            "Botón de cancelar/rechazar con estilo visual prominente"
+        ),
+        (True, True): (
+            "Texto de acción primaria con clase de botón secundario",
+            "Texto de acción secundaria con clase de botón primario",
+            "Botón de cancelar/rechazar con estilo visual prominente",
+            "Botón de aceptar/confirmar con estilo visual poco prominente"
+        )
+    }
+    
     def __init__(self):
         """Inicializa el detector de interfaces confusas o botones engañosos."""
         super().__init__(
@@ -50,65 +153,248 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
             "secondary", "cancel", "back", "return", "close", "reject", "skip",
             "secundario", "cancelar", "volver", "cerrar", "rechazar", "omitir"
         ]
+        
+        # Versiones en minúsculas precalculadas para no repetir lower() por nodo
+        self._primary_keywords_lower = frozenset(k.lower() for k in self.primary_action_keywords)
+        self._secondary_keywords_lower = frozenset(k.lower() for k in self.secondary_action_keywords)
+        self._primary_class_set = frozenset(c.lower() for c in self.primary_button_classes)
+        self._secondary_class_set = frozenset(c.lower() for c in self.secondary_button_classes)
+        
+        # Un bit por cada clase relevante: la pertenencia a cada grupo de clases
+        # se resuelve con un AND sobre la máscara de las clases del nodo
+        relevant_classes = sorted(self._primary_class_set | self._secondary_class_set | self._BUTTON_LIKE_CLASSES)
+        self._class_bits = {name: 1 << i for i, name in enumerate(relevant_classes)}
+        self._primary_class_mask = self._classes_mask(self._primary_class_set)
+        self._secondary_class_mask = self._classes_mask(self._secondary_class_set)
+        self._button_like_mask = self._classes_mask(self._BUTTON_LIKE_CLASSES)
+        
+        # Un comparador generado por grupo; las palabras clave se buscan como
+        # subcadenas del texto ya en minúsculas
+        self._primary_keywords_match = _build_substring_matcher(self._primary_keywords_lower)
+        self._secondary_keywords_match = _build_substring_matcher(self._secondary_keywords_lower)
+        
+        # Un texto más corto que la palabra clave más corta ("no") no puede contener ninguna
+        self._min_keyword_length = min(map(len, self._primary_keywords_lower | self._secondary_keywords_lower))
+        
+        # Autómata con todas las palabras clave para clasificar el texto en una sola pasada
+        self._keyword_automaton = None
+        if ahocorasick is not None:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword in self._primary_keywords_lower:
+                self._keyword_automaton.add_word(keyword, (True, False))
+            for keyword in self._secondary_keywords_lower:
+                self._keyword_automaton.add_word(keyword, (False, True))
+            self._keyword_automaton.make_automaton()
     
-    def detect(self, page_content: str, dom_structure: Dict[str, Any], 
-               screenshot_path: str, url: str) -> List[Dict[str, Any]]:
+    def _classes_mask(self, classes) -> int:
         """
-        Detecta patrones de interfaces confusas o botones engañosos en una página.
+        Calcula la máscara de bits de una colección de clases CSS.
+        
+        Args:
+            classes: Clases del nodo (se comparan en minúsculas)
+            
+        Returns:
+            int: OR de los bits de las clases relevantes; 0 si no hay ninguna
+        """
+        class_bits = self._class_bits
+        mask = 0
+        for cls in classes:
+            mask |= class_bits.get(_lower_token(cls), 0)
+        return mask
+    
+    def _classify_text(self, text_lower: str) -> Tuple[bool, bool]:
+        """
+        Determina si un texto contiene palabras clave de acción primaria o secundaria.
+        
+        Args:
+            text_lower: Texto del botón en minúsculas
+            
+        Returns:
+            Tuple[bool, bool]: (es_primario, es_secundario)
+        """
+        if self._keyword_automaton is not None:
+            is_primary = is_secondary = False
+            for _, (primary, secondary) in self._keyword_automaton.iter(text_lower):
+                is_primary = is_primary or primary
+                is_secondary = is_secondary or secondary
+                if is_primary and is_secondary:
+                    break
+            return is_primary, is_secondary
+        return self._primary_keywords_match(text_lower), self._secondary_keywords_match(text_lower)
+    
+    @staticmethod
+    def _button_evidence(button: Dict[str, Any], flat_dom: Dict[str, List[Any]]) -> Dict[str, Any]:
+        """
+        Obtiene la evidencia resumida de un botón para las detecciones de grupo.
+        
+        Se crea un diccionario nuevo en cada llamada: el botón vive en el
+        análisis del DOM que se reutiliza entre llamadas a detect(), así que la
+        evidencia devuelta no debe compartirse con él ni con otras detecciones.
+        La ruta sí se reutiliza, porque dom_path la guarda en el DOM aplanado.
+        
+        Args:
+            button: Botón recogido por _collect_elements
+            flat_dom: DOM aplanado del que se recogió el botón
+            
+        Returns:
+            Dict[str, Any]: Ruta, texto y clases del botón
+        """
+        return {
+            "path": dom_path(flat_dom, button["index"]),
+            "text": button["text"],
+            "classes": list(button["classes"])
+        }
+    
+    def _misleading_buttons_from_html(self, page_content: str) -> Optional[List[Tuple[Dict[str, Any], Tuple[str, ...]]]]:
+        """
+        Busca botones y enlaces con inconsistencias entre texto y clase analizando el HTML.
+        
+        Se usa cuando no se extrajo la estructura DOM: el analizador HTML
+        (selectolax o lxml) selecciona los elementos en C. Sin la jerarquía
+        del DOM solo se pueden comprobar los botones uno a uno, no los grupos
+        ni los formularios.
         
         Args:
             page_content: Contenido HTML de la página
-            dom_structure: Estructura DOM de la página
-            screenshot_path: Ruta a la captura de pantalla de la página
-            url: URL de la página
             
         Returns:
-            List[Dict[str, Any]]: Lista de patrones de interfaces confusas o botones engañosos detectados
+            Optional[List[Tuple[Dict[str, Any], Tuple[str, ...]]]]: Pares (botón,
+            inconsistencias) como en _collect_elements, o None si no hay ningún
+            analizador HTML disponible
         """
-        # Verificar si la estructura DOM es válida
-        if not dom_structure:
-            print(f"Advertencia: Estructura DOM vacía o inválida para {url}")
-            return []
+        elements_by_type = find_elements_in_html(page_content, {"BUTTON", "A"})
+        if elements_by_type is None:
+            return None
+        
+        misleading_buttons = []
+        for element in chain(elements_by_type["BUTTON"], elements_by_type["A"]):
+            node = element["node"]
+            text = node.get("text", "")
+            if not text or len(text) < self._min_keyword_length:
+                continue
+            is_primary, is_secondary = self._classify_text(text.lower())
             
-        detections = []
+            mask = self._classes_mask(node["classes"])
+            primary_mismatch = is_primary and bool(mask & self._secondary_class_mask)
+            secondary_mismatch = is_secondary and bool(mask & self._primary_class_mask)
+            if primary_mismatch or secondary_mismatch:
+                button = {
+                    "node": node,
+                    "path": element["path"],
+                    "text": text,
+                    "classes": node["classes"]
+                }
+                misleading_buttons.append((button, self._INCONSISTENCY_MESSAGES[(primary_mismatch, secondary_mismatch)]))
+        return misleading_buttons
+    
+    def _collect_elements(self, dom_structure: Dict[str, Any]) -> Tuple[List[Tuple[Dict[str, Any], Tuple[str, ...]]], List[Dict[str, Any]], Dict[int, List[Dict[str, Any]]], Dict[int, List[Dict[str, Any]]], Dict[int, int]]:
+        """
+        Recorre el DOM una vez y recoge los botones/enlaces y los elementos de interfaz.
         
-        # 1. Buscar botones o enlaces con estilos engañosos
-        # Buscar elementos que parezcan botones o enlaces
-        buttons_and_links = []
+        Los botones se clasifican durante el propio recorrido: solo se devuelven
+        aparte los que tienen inconsistencias entre texto y clase, junto con
+        sus mensajes, y el resto solo queda en los índices por formulario y por padre.
         
-        def search_buttons_and_links(node, path="body"):
-            # Verificar que el nodo es un diccionario válido
-            if not isinstance(node, dict):
-                return
-                
-            # Verificar si el nodo es un botón o enlace
+        Recorre el DOM aplanado que comparten todos los detectores (ver
+        _get_flat_dom), en preorden, así que el orden de las listas es el mismo
+        que daría un recorrido recursivo. Los subárboles que no se analizan se
+        saltan de una vez gracias al final de subárbol de cada nodo. Botones,
+        elementos y formularios se identifican por su índice en el DOM
+        aplanado; las rutas solo se forman (con dom_path) para las detecciones.
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            
+        Returns:
+            Tuple: (botones engañosos como pares (botón, inconsistencias),
+            elementos de interfaz, botones de cada
+            formulario indexados por el índice del formulario, botones agrupados
+            por el índice de su padre (-1 es la clave del padre de la raíz) y OR
+            de los bits _FLAG_* de los botones de cada grupo)
+        """
+        misleading_buttons = []
+        ui_elements = []
+        buttons_by_form = {}
+        button_groups = {}
+        group_flags = {}
+        
+        # Referencias locales para el bucle principal
+        node_kinds = self._NODE_KINDS
+        skip_types = self._SKIP_TYPES
+        classes_mask = self._classes_mask
+        button_like_mask = self._button_like_mask
+        primary_class_mask = self._primary_class_mask
+        secondary_class_mask = self._secondary_class_mask
+        classify_text = self._classify_text
+        min_keyword_length = self._min_keyword_length
+        
+        # Verificar que la raíz es un diccionario válido; flatten_dom ya descarta
+        # los hijos que no lo son
+        if not isinstance(dom_structure, dict):
+            return misleading_buttons, ui_elements, buttons_by_form, button_groups, group_flags
+        
+        flat_dom = self._get_flat_dom(dom_structure)
+        nodes = flat_dom["nodes"]
+        parents = flat_dom["parents"]
+        ends = flat_dom["ends"]
+        texts_lower = self._get_lowered_texts(dom_structure)
+        
+        # Formularios que contienen al nodo actual, como pares (final del
+        # subárbol, índice), del más externo al más interno
+        open_forms = []
+        
+        index = 0
+        node_count = len(nodes)
+        while index < node_count:
+            node = nodes[index]
+            
+            # Un nodo sin tipo o de un tipo sin controles no se analiza ni se recorren sus hijos
             node_type = node.get("type")
-            if not node_type:
-                return
-                
-            is_button_or_link = node_type in ["BUTTON", "A", "INPUT"] or (
-                node_type == "DIV" and 
-                node.get("classes") and 
-                any(cls.lower() in ["button", "btn", "link", "boton", "enlace"] for cls in node.get("classes", []))
-            )
+            if not node_type or node_type in skip_types:
+                index = ends[index]
+                continue
             
-            if is_button_or_link:
+            # Cerrar los formularios cuyo subárbol ya terminó
+            while open_forms and open_forms[-1][0] <= index:
+                open_forms.pop()
+            
+            # Un único acceso a la tabla indica qué comprobaciones aplican al nodo
+            kind = node_kinds.get(node_type, 0)
+            
+            # Verificar si el nodo es un botón o enlace
+            mask = None
+            if kind & self._KIND_DIV:
+                div_classes = node.get("classes")
+                if div_classes:
+                    mask = classes_mask(div_classes)
+                    if mask & button_like_mask:
+                        kind = self._KIND_BUTTON
+            
+            if kind & self._KIND_BUTTON:
                 # Extraer texto y atributos
                 text = node.get("text", "")
-                attributes = node.get("attributes", {})
+                attributes = node.get("attributes", _NO_ATTRIBUTES)
                 classes = node.get("classes", [])
                 
                 # Asegurar que classes es una lista
                 if not isinstance(classes, list):
                     classes = []
+                    mask = 0
                 
-                # Determinar si es un botón primario o secundario basado en el texto
-                is_primary = any(keyword.lower() in text.lower() for keyword in self.primary_action_keywords) if text else False
-                is_secondary = any(keyword.lower() in text.lower() for keyword in self.secondary_action_keywords) if text else False
+                # Determinar si es un botón primario o secundario basado en el texto.
+                # Sin texto suficiente (p. ej. los INPUT, que no tienen textContent)
+                # ninguna palabra clave puede aparecer y se omite la búsqueda
+                if text and len(text) >= min_keyword_length:
+                    is_primary, is_secondary = classify_text(texts_lower[index])
+                else:
+                    is_primary = is_secondary = False
                 
                 # Determinar si es un botón primario o secundario basado en las clases
-                has_primary_class = any(cls.lower() in [c.lower() for c in classes] for cls in self.primary_button_classes) if classes else False
-                has_secondary_class = any(cls.lower() in [c.lower() for c in classes] for cls in self.secondary_button_classes) if classes else False
+                if mask is None:
+                    mask = classes_mask(classes)
+                has_primary_class = bool(mask & primary_class_mask)
+                has_secondary_class = bool(mask & secondary_class_mask)
+                flags = is_primary | is_secondary << 1 | has_primary_class << 2 | has_secondary_class << 3
                 
                 # Determinar tipo basado en atributos
                 button_type = None
@@ -116,9 +402,9 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                     if attributes["type"] in ["submit", "button"]:
                         button_type = attributes["type"]
                 
-                buttons_and_links.append({
+                button = {
                     "node": node,
-                    "path": path,
+                    "index": index,
                     "text": text,
                     "classes": classes,
                     "attributes": attributes,
@@ -126,83 +412,128 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                     "is_secondary_text": is_secondary,
                     "has_primary_class": has_primary_class,
                     "has_secondary_class": has_secondary_class,
-                    "button_type": button_type
-                })
-            
-            # Buscar en nodos hijos
-            children = node.get("children", [])
-            if children and isinstance(children, list):
-                for i, child in enumerate(children):
-                    if isinstance(child, dict):
-                        child_type = child.get("type", "unknown")
-                        child_path = f"{path} > {child_type}[{i}]"
-                        search_buttons_and_links(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz con manejo de errores
-        try:
-            search_buttons_and_links(dom_structure)
-        except Exception as e:
-            print(f"Error al buscar botones y enlaces: {e}")
-            return []
-        
-        # Analizar botones y enlaces para detectar inconsistencias
-        for button in buttons_and_links:
-            inconsistencies = []
-            
-            # Verificar inconsistencia entre texto y clase
-            if button["is_primary_text"] and button["has_secondary_class"]:
-                inconsistencies.append("Texto de acción primaria con clase de botón secundario")
-            
-            if button["is_secondary_text"] and button["has_primary_class"]:
-                inconsistencies.append("Texto de acción secundaria con clase de botón primario")
+                    "button_type": button_type,
+                    # Bits _FLAG_* que consultan el análisis de grupos y de formularios
+                    "flags": flags,
+                    "acts_as_submit": is_primary or has_primary_class or button_type == "submit"
+                }
+                
+                # Verificar inconsistencia entre texto y clase (cada caso aporta sus dos mensajes)
+                primary_mismatch = is_primary and has_secondary_class
+                secondary_mismatch = is_secondary and has_primary_class
+                if primary_mismatch or secondary_mismatch:
+                    misleading_buttons.append((button, self._INCONSISTENCY_MESSAGES[(primary_mismatch, secondary_mismatch)]))
+                
+                # Agrupar con los botones del mismo padre (-1 para la raíz)
+                parent_key = parents[index]
+                group = button_groups.get(parent_key)
+                if group is None:
+                    button_groups[parent_key] = [button]
+                    group_flags[parent_key] = flags
+                else:
+                    group.append(button)
+                    group_flags[parent_key] |= flags
+                
+                for _, form_index in open_forms:
+                    buttons_by_form[form_index].append(button)
             
-            # Verificar si el botón de cancelar o rechazar tiene estilo visual prominente
-            if button["is_secondary_text"] and button["has_primary_class"]:
-                inconsistencies.append("Botón de cancelar/rechazar con estilo visual prominente")
+            # Verificar si el nodo es un elemento de interfaz
+            if kind & self._KIND_UI:
+                ui_elements.append({
+                    "node": node,
+                    "index": index,
+                    "type": node_type,
+                    "attributes": node.get("attributes", _NO_ATTRIBUTES),
+                    "classes": node.get("classes", []),
+                    "text": node.get("text", "")
+                })
             
-            # Verificar si el botón de aceptar o confirmar tiene estilo visual poco prominente
-            if button["is_primary_text"] and button["has_secondary_class"]:
-                inconsistencies.append("Botón de aceptar/confirmar con estilo visual poco prominente")
+            if kind & self._KIND_FORM:
+                buttons_by_form[index] = []
+                open_forms.append((ends[index], index))
             
-            if inconsistencies:
-                confidence = self.calculate_confidence(len(inconsistencies), 0.85)
-                
-                if confidence >= self.confidence_threshold:
-                    detections.append({
-                        "pattern_type": "confusing_interface",
-                        "evidence_type": "misleading_button",
-                        "evidence": {
-                            "path": button["path"],
-                            "text": button["text"],
-                            "classes": button["classes"],
-                            "inconsistencies": inconsistencies
-                        },
-                        "confidence": confidence,
-                        "location": f"Botón engañoso en {button['path']}",
-                        "screenshot": screenshot_path
-                    })
+            index += 1
         
-        # 2. Buscar grupos de botones con jerarquía visual confusa
-        # Agrupar botones que están cerca en el DOM
-        button_groups = {}
+        return misleading_buttons, ui_elements, buttons_by_form, button_groups, group_flags
+    
+    def detect(self, page_content: str, dom_structure: Dict[str, Any], 
+               screenshot_path: str, url: str) -> List[Dict[str, Any]]:
+        """
+        Detecta patrones de interfaces confusas o botones engañosos en una página.
         
-        for i, button in enumerate(buttons_and_links):
-            # Extraer el path del padre
-            parent_path = " > ".join(button["path"].split(" > ")[:-1])
+        Args:
+            page_content: Contenido HTML de la página
+            dom_structure: Estructura DOM de la página
+            screenshot_path: Ruta a la captura de pantalla de la página
+            url: URL de la página
             
-            if parent_path not in button_groups:
-                button_groups[parent_path] = []
+        Returns:
+            List[Dict[str, Any]]: Lista de patrones de interfaces confusas o botones engañosos detectados
+        """
+        # Cada (evidence_type, ruta) se informa como mucho una vez sin necesidad de
+        # filtrar duplicados: las rutas de nodo son únicas, cada botón o elemento se
+        # analiza una sola vez y cada grupo de botones es un padre distinto
+        detections = []
+        flat_dom = None
+        
+        # 1. Buscar botones o enlaces con estilos engañosos
+        if not dom_structure:
+            # Sin estructura DOM solo se pueden analizar los botones, buscándolos en el HTML
+            misleading_buttons = self._misleading_buttons_from_html(page_content)
+            if misleading_buttons is None:
+                print(f"Advertencia: Estructura DOM vacía o inválida para {url}")
+                return []
+            ui_elements, buttons_by_form, button_groups, group_flags = [], {}, {}, {}
+        else:
+            flat_dom = self._get_flat_dom(dom_structure)
+            # Recorrer el DOM una sola vez recogiendo botones/enlaces y elementos de interfaz
+            # (se reutiliza si esta estructura ya se analizó)
+            try:
+                misleading_buttons, ui_elements, buttons_by_form, button_groups, group_flags = self._get_dom_analysis(
+                    dom_structure, self._collect_elements)
+            except Exception as e:
+                print(f"Error al buscar botones y enlaces: {e}")
+                return []
+        
+        # Analizar los botones con inconsistencias entre texto y clase
+        for button, inconsistencies in misleading_buttons:
+            confidence = self.calculate_confidence(len(inconsistencies), 0.85)
             
-            button_groups[parent_path].append(button)
+            if confidence >= self.confidence_threshold:
+                # Los botones buscados en el HTML ya traen su ruta; los del DOM, su índice
+                path = button["path"] if flat_dom is None else dom_path(flat_dom, button["index"])
+                detections.append({
+                    "pattern_type": "confusing_interface",
+                    "evidence_type": "misleading_button",
+                    "evidence": {
+                        "path": path,
+                        "text": button["text"],
+                        "classes": list(button["classes"]),
+                        "inconsistencies": list(inconsistencies)
+                    },
+                    "confidence": confidence,
+                    "location": f"Botón engañoso en {path}",
+                    "screenshot": screenshot_path
+                })
+        
+        # 2. Buscar grupos de botones con jerarquía visual confusa
+        # (los botones ya se agruparon por padre durante el recorrido del DOM)
+        # Si ninguna detección de grupo puede llegar al umbral, no se analizan los grupos
+        check_multiple_primary = self.max_confidence(0.75) >= self.confidence_threshold
+        check_similar_styles = self.max_confidence(0.8) >= self.confidence_threshold
         
         # Analizar cada grupo de botones
-        for parent_path, group in button_groups.items():
-            if len(group) >= 2:  # Al menos dos botones en el grupo
-                primary_buttons = [b for b in group if b["is_primary_text"] or b["has_primary_class"]]
-                secondary_buttons = [b for b in group if b["is_secondary_text"] or b["has_secondary_class"]]
+        for parent_key, group in button_groups.items():
+            # Bits de todo el grupo: sin ningún botón primario no puede darse ninguna
+            # de las dos detecciones y el grupo se descarta sin revisar sus botones
+            group_mask = group_flags[parent_key]
+            if len(group) >= 2 and group_mask & self._FLAGS_PRIMARY and (check_multiple_primary or check_similar_styles):  # Al menos dos botones en el grupo
+                parent_path = dom_path(flat_dom, parent_key) if parent_key >= 0 else ""
+                primary_buttons = [b for b in group if b["flags"] & self._FLAGS_PRIMARY]
+                secondary_buttons = [b for b in group if b["flags"] & self._FLAGS_SECONDARY] if group_mask & self._FLAGS_SECONDARY else []
                 
                 # Verificar si hay múltiples botones primarios
-                if len(primary_buttons) > 1:
+                if check_multiple_primary and len(primary_buttons) > 1:
                     confidence = self.calculate_confidence(len(primary_buttons), 0.75)
                     
                     if confidence >= self.confidence_threshold:
@@ -212,12 +543,7 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                             "evidence": {
                                 "parent_path": parent_path,
                                 "buttons": [
-                                    {
-                                        "path": b["path"],
-                                        "text": b["text"],
-                                        "classes": b["classes"]
-                                    } 
-                                    for b in primary_buttons
+                                    self._button_evidence(b, flat_dom) for b in primary_buttons
                                 ]
                             },
                             "confidence": confidence,
@@ -226,13 +552,15 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                         })
                 
                 # Verificar si hay botones primarios y secundarios con estilos similares
-                if primary_buttons and secondary_buttons:
+                if check_similar_styles and primary_buttons and secondary_buttons:
                     # Comparar clases para ver si son visualmente similares
                     similar_styles = False
                     
-                    # Simplificación: si no hay clases distintivas, asumimos que son visualmente similares
-                    primary_distinctive = any(b["has_primary_class"] for b in primary_buttons)
-                    secondary_distinctive = any(b["has_secondary_class"] for b in secondary_buttons)
+                    # Simplificación: si no hay clases distintivas, asumimos que son visualmente similares.
+                    # Todo botón con clase primaria (secundaria) actúa como primario (secundario),
+                    # así que basta con los bits del grupo
+                    primary_distinctive = bool(group_mask & self._FLAG_PRIMARY_CLASS)
+                    secondary_distinctive = bool(group_mask & self._FLAG_SECONDARY_CLASS)
                     
                     if not (primary_distinctive and secondary_distinctive):
                         similar_styles = True
@@ -247,20 +575,10 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                                 "evidence": {
                                     "parent_path": parent_path,
                                     "primary_buttons": [
-                                        {
-                                            "path": b["path"],
-                                            "text": b["text"],
-                                            "classes": b["classes"]
-                                        } 
-                                        for b in primary_buttons
+                                        self._button_evidence(b, flat_dom) for b in primary_buttons
                                     ],
                                     "secondary_buttons": [
-                                        {
-                                            "path": b["path"],
-                                            "text": b["text"],
-                                            "classes": b["classes"]
-                                        } 
-                                        for b in secondary_buttons
+                                        self._button_evidence(b, flat_dom) for b in secondary_buttons
                                     ]
                                 },
                                 "confidence": confidence,
@@ -269,46 +587,14 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                             })
         
         # 3. Buscar elementos de interfaz que puedan ser confusos
-        # Buscar elementos que parezcan controles de interfaz
-        ui_elements = []
+        # Si ni la confianza máxima llega al umbral, ningún elemento se informaría
+        if self.max_confidence(0.7) < self.confidence_threshold:
+            return detections
         
-        def search_ui_elements(node, path="body"):
-            # Verificar que el nodo es un diccionario válido
-            if not isinstance(node, dict):
-                return
-                
-            # Verificar si el nodo es un elemento de interfaz
-            node_type = node.get("type")
-            if not node_type:
-                return
-                
-            is_ui_element = node_type in ["INPUT", "SELECT", "TEXTAREA", "LABEL", "FORM"]
-            
-            if is_ui_element:
-                ui_elements.append({
-                    "node": node,
-                    "path": path,
-                    "type": node_type,
-                    "attributes": node.get("attributes", {}),
-                    "classes": node.get("classes", []),
-                    "text": node.get("text", "")
-                })
-            
-            # Buscar en nodos hijos
-            children = node.get("children", [])
-            if children and isinstance(children, list):
-                for i, child in enumerate(children):
-                    if isinstance(child, dict):
-                        child_type = child.get("type", "unknown")
-                        child_path = f"{path} > {child_type}[{i}]"
-                        search_ui_elements(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz con manejo de errores
-        try:
-            search_ui_elements(dom_structure)
-        except Exception as e:
-            print(f"Error al buscar elementos de interfaz: {e}")
-            return detections  # Devolver las detecciones que ya tenemos
+        # (ui_elements ya se recogió en el mismo recorrido que los botones)
+        
+        # Valores del atributo "for" de los labels, para buscar el label de un input en O(1)
+        label_targets = {ui["attributes"].get("for") for ui in ui_elements if ui["type"] == "LABEL"}
         
         # Analizar elementos de interfaz para detectar confusiones
         for element in ui_elements:
@@ -319,15 +605,9 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                 # Buscar label asociado
                 has_label = False
                 
-                # Verificar si tiene ID
+                # Verificar si tiene ID y algún label con atributo "for" que coincida
                 if "id" in element["attributes"]:
-                    element_id = element["attributes"]["id"]
-                    
-                    # Buscar label con atributo "for" que coincida con el ID
-                    for ui_el in ui_elements:
-                        if ui_el["type"] == "LABEL" and ui_el["attributes"].get("for") == element_id:
-                            has_label = True
-                            break
+                    has_label = element["attributes"]["id"] in label_targets
                 
                 if not has_label:
                     confusing_aspects.append("Checkbox o radio sin label claro")
@@ -337,15 +617,9 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                 # Buscar label asociado
                 has_label = False
                 
-                # Verificar si tiene ID
+                # Verificar si tiene ID y algún label con atributo "for" que coincida
                 if "id" in element["attributes"]:
-                    element_id = element["attributes"]["id"]
-                    
-                    # Buscar label con atributo "for" que coincida con el ID
-                    for ui_el in ui_elements:
-                        if ui_el["type"] == "LABEL" and ui_el["attributes"].get("for") == element_id:
-                            has_label = True
-                            break
+                    has_label = element["attributes"]["id"] in label_targets
                 
                 if not has_label:
                     confusing_aspects.append("Input con placeholder pero sin label")
@@ -355,16 +629,15 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                 has_submit = False
                 has_cancel = False
                 
-                # Buscar botones dentro del formulario
-                form_path = element["path"]
-                
-                for button in buttons_and_links:
-                    if button["path"].startswith(form_path):
-                        if button["is_primary_text"] or button["has_primary_class"] or button["button_type"] == "submit":
-                            has_submit = True
-                        
-                        if button["is_secondary_text"] or button["has_secondary_class"]:
-                            has_cancel = True
+                # Revisar los botones que hay dentro del formulario; en cuanto hay
+                # uno de cancelar, el formulario ya no se marca
+                for button in buttons_by_form[element["index"]]:
+                    if button["flags"] & self._FLAGS_SECONDARY:
+                        has_cancel = True
+                        break
+                    
+                    if button["acts_as_submit"]:
+                        has_submit = True
                 
                 if has_submit and not has_cancel:
                     confusing_aspects.append("Formulario sin botón de cancelar claro")
@@ -373,16 +646,17 @@ class ConfusingInterfaceDetector(DarkPatternDetector):
                 confidence = self.calculate_confidence(len(confusing_aspects), 0.7)
                 
                 if confidence >= self.confidence_threshold:
+                    path = dom_path(flat_dom, element["index"])
                     detections.append({
                         "pattern_type": "confusing_interface",
                         "evidence_type": "confusing_ui_element",
                         "evidence": {
-                            "path": element["path"],
+                            "path": path,
                             "type": element["type"],
                             "confusing_aspects": confusing_aspects
                         },
                         "confidence": confidence,
-                        "location": f"Elemento de interfaz confuso en {element['path']}",
+                        "location": f"Elemento de interfaz confuso en {path}",
                         "screenshot": screenshot_path
                     })
         
@@ -46,14 +46,16 @@
         # Agrupar botones que están cerca en el DOM
         button_groups = {}
         
-        for i, button in enumerate(buttons_and_links):
-            # Extraer el path del padre
-            parent_path = " > ".join(button["path"].split(" > ")[:-1])
-            
-            if parent_path not in button_groups:
-                button_groups[parent_path] = []
+        for button in buttons_and_links:
+            # Extraer el path del padre (todo lo anterior al último separador,
+            # sin partir la ruta entera en segmentos)
+            parent_path = button["path"].rpartition(" > ")[0]
             
-            button_groups[parent_path].append(button)
+            group = button_groups.get(parent_path)
+            if group is None:
+                button_groups[parent_path] = [button]
+            else:
+                group.append(button)
         
         # Analizar cada grupo de botones
         for parent_path, group in button_groups.items():
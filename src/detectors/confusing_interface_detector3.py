@@ -2,15 +2,16 @@
         # Buscar elementos que parezcan controles de interfaz
         ui_elements = []
         
-        def search_ui_elements(node, path="body"):
-            # Verificar que el nodo es un diccionario válido
-            if not isinstance(node, dict):
-                return
-                
+        # Recorrido iterativo en preorden: sin recursión, un DOM muy profundo no
+        # agota la pila de Python. Los hijos que no son diccionarios no se apilan
+        stack = [(dom_structure, "body")] if isinstance(dom_structure, dict) else []
+        while stack:
+            node, path = stack.pop()
+            
             # Verificar si el nodo es un elemento de interfaz
             node_type = node.get("type")
             if not node_type:
-                return
+                continue
                 
             is_ui_element = node_type in ["INPUT", "SELECT", "TEXTAREA", "LABEL", "FORM"]
             
@@ -24,21 +25,16 @@
                     "text": node.get("text", "")
                 })
             
-            # Buscar en nodos hijos
+            # Apilar los hijos en orden inverso para visitarlos en su orden original
             children = node.get("children", [])
             if children and isinstance(children, list):
-                for i, child in enumerate(children):
+                for i in range(len(children) - 1, -1, -1):
+                    child = children[i]
                     if isinstance(child, dict):
-                        child_type = child.get("type", "unknown")
-                        child_path = f"{path} > {child_type}[{i}]"
-                        search_ui_elements(child, child_path)
+                        stack.append((child, f"{path} > {child.get('type', 'unknown')}[{i}]"))
         
-        # Iniciar búsqueda desde la raíz con manejo de errores
-        try:
-            search_ui_elements(dom_structure)
-        except Exception as e:
-            print(f"Error al buscar elementos de interfaz: {e}")
-            return detections  # Devolver las detecciones que ya tenemos
+        # Valores del atributo "for" de los labels, para buscar el label de un input en O(1)
+        label_targets = {ui["attributes"].get("for") for ui in ui_elements if ui["type"] == "LABEL"}
         
         # Analizar elementos de interfaz para detectar confusiones
         for element in ui_elements:
@@ -49,15 +45,9 @@
                 # Buscar label asociado
                 has_label = False
                 
-                # Verificar si tiene ID
+                # Verificar si tiene ID y algún label con atributo "for" que coincida
                 if "id" in element["attributes"]:
-                    element_id = element["attributes"]["id"]
-                    
-                    # Buscar label con atributo "for" que coincida con el ID
-                    for ui_el in ui_elements:
-                        if ui_el["type"] == "LABEL" and ui_el["attributes"].get("for") == element_id:
-                            has_label = True
-                            break
+                    has_label = element["attributes"]["id"] in label_targets
                 
                 if not has_label:
                     confusing_aspects.append("Checkbox o radio sin label claro")
@@ -67,15 +57,9 @@
                 # Buscar label asociado
                 has_label = False
                 
-                # Verificar si tiene ID
+                # Verificar si tiene ID y algún label con atributo "for" que coincida
                 if "id" in element["attributes"]:
-                    element_id = element["attributes"]["id"]
-                    
-                    # Buscar label con atributo "for" que coincida con el ID
-                    for ui_el in ui_elements:
-                        if ui_el["type"] == "LABEL" and ui_el["attributes"].get("for") == element_id:
-                            has_label = True
-                            break
+                    has_label = element["attributes"]["id"] in label_targets
                 
                 if not has_label:
                     confusing_aspects.append("Input con placeholder pero sin label")
@@ -85,15 +69,9 @@
                 # Buscar label asociado
                 has_label = False
                 
-                # Verificar si tiene ID
+                # Verificar si tiene ID y algún label con atributo "for" que coincida
                 if "id" in element["attributes"]:
-                    element_id = element["attributes"]["id"]
-                    
-                    # Buscar label con atributo "for" que coincida con el ID
-                    for ui_el in ui_elements:
-                        if ui_el["type"] == "LABEL" and ui_el["attributes"].get("for") == element_id:
-                            has_label = True
-                            break
+                    has_label = element["attributes"]["id"] in label_targets
                 
                 if not has_label:
                     confusing_aspects.append("Select sin label claro")
@@ -119,15 +97,16 @@
         # 4. Buscar formularios con diseño confuso
         forms = []
         
-        def search_forms(node, path="body"):
-            # Verificar que el nodo es un diccionario válido
-            if not isinstance(node, dict):
-                return
-                
+        # Recorrido iterativo en preorden: sin recursión, un DOM muy profundo no
+        # agota la pila de Python. Los hijos que no son diccionarios no se apilan
+        stack = [(dom_structure, "body")] if isinstance(dom_structure, dict) else []
+        while stack:
+            node, path = stack.pop()
+            
             # Verificar si el nodo es un formulario
             node_type = node.get("type")
             if not node_type:
-                return
+                continue
                 
             if node_type == "FORM":
                 forms.append({
@@ -137,36 +116,33 @@
                     "classes": node.get("classes", [])
                 })
             
-            # Buscar en nodos hijos
+            # Apilar los hijos en orden inverso para visitarlos en su orden original
             children = node.get("children", [])
             if children and isinstance(children, list):
-                for i, child in enumerate(children):
+                for i in range(len(children) - 1, -1, -1):
+                    child = children[i]
                     if isinstance(child, dict):
-                        child_type = child.get("type", "unknown")
-                        child_path = f"{path} > {child_type}[{i}]"
-                        search_forms(child, child_path)
+                        stack.append((child, f"{path} > {child.get('type', 'unknown')}[{i}]"))
         
-        # Iniciar búsqueda desde la raíz con manejo de errores
-        try:
-            search_forms(dom_structure)
-        except Exception as e:
-            print(f"Error al buscar formularios: {e}")
-            return detections  # Devolver las detecciones que ya tenemos
+        # Índice de rutas antecesoras (incluida la propia) de los botones que
+        # sirven como envío: un formulario tiene botón de envío si su ruta está
+        # en el índice. Se compara por segmentos completos, así FORM[1] no
+        # abarca a los botones de FORM[10]
+        submit_ancestor_paths = set()
+        for button in buttons_and_links:
+            if (button["button_type"] == "submit" or 
+                button["is_primary_text"] or 
+                button["has_primary_class"]):
+                segments = button["path"].split(" > ")
+                for end in range(1, len(segments) + 1):
+                    submit_ancestor_paths.add(" > ".join(segments[:end]))
         
         # Analizar formularios para detectar confusiones
         for form in forms:
             confusing_aspects = []
             
             # Verificar si el formulario tiene un botón de envío claro
-            has_submit_button = False
-            
-            for button in buttons_and_links:
-                if button["path"].startswith(form["path"]):
-                    if (button["button_type"] == "submit" or 
-                        button["is_primary_text"] or 
-                        button["has_primary_class"]):
-                        has_submit_button = True
-                        break
+            has_submit_button = form["path"] in submit_ancestor_paths
             
             if not has_submit_button:
                 confusing_aspects.append("Formulario sin botón de envío claro")
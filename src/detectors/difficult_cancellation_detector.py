@@ -4,11 +4,12 @@ Identifica interfaces que dificultan la cancelación de suscripciones o servicio
 """
 
 import re
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 import os
 from pathlib import Path
 
-from .base_detector import DarkPatternDetector
+from .base_detector import DarkPatternDetector, dom_path
 
 
 class DifficultCancellationDetector(DarkPatternDetector):
@@ -56,101 +57,228 @@ class DifficultCancellationDetector(DarkPatternDetector):
             r"not\s+possible\s+to\s+(cancel|unsubscribe)\s+online",
             r"(cancellation|unsubscription)\s+subject\s+to\s+approval"
         ]
+        
+        # Frases precompiladas y su alternancia: una sola pasada descarta las
+        # páginas sin ninguna frase (ver search_text_patterns)
+        self._compiled_phrases, self._combined_phrases = self.compile_patterns(self.difficult_cancellation_phrases)
+        
+        # Palabras clave de cancelación ya en minúsculas y, si está disponible, un
+        # autómata que las busca todas en una sola pasada por el texto
+        self._cancellation_keywords_lower = tuple(keyword.lower() for keyword in self.cancellation_keywords)
+        self._cancellation_keyword_set = frozenset(self._cancellation_keywords_lower)
+        self._cancellation_automaton = self.keyword_automaton(self._cancellation_keywords_lower)
+        
+        # Confianza de una frase según las palabras clave de su contexto: la
+        # frase cuenta como una evidencia más, así que a partir de
+        # CONFIDENCE_SATURATION_COUNT - 1 palabras clave la confianza ya no cambia
+        self._text_keyword_limit = self.CONFIDENCE_SATURATION_COUNT - 1
+        self._text_confidences = tuple(
+            self.calculate_confidence(keyword_count + 1, 0.85)
+            for keyword_count in range(self._text_keyword_limit + 1)
+        )
+        
+        # Los id y las clases se repiten mucho entre nodos y entre páginas: el
+        # resultado de cada uno se recuerda (ver _token_has_cancellation_keyword)
+        self._token_has_keyword = lru_cache(maxsize=4096)(self._token_has_cancellation_keyword)
     
-    def detect(self, page_content: str, dom_structure: Dict[str, Any], 
-               screenshot_path: str, url: str) -> List[Dict[str, Any]]:
+    def _has_cancellation_keyword(self, text_lower: str) -> bool:
         """
-        Detecta patrones de suscripciones difíciles de cancelar en una página.
+        Comprueba si un texto contiene alguna palabra clave de cancelación.
         
         Args:
-            page_content: Contenido HTML de la página
-            dom_structure: Estructura DOM de la página
-            screenshot_path: Ruta a la captura de pantalla de la página
-            url: URL de la página
+            text_lower: Texto en minúsculas
             
         Returns:
-            List[Dict[str, Any]]: Lista de patrones de suscripciones difíciles de cancelar detectados
+            bool: True si contiene al menos una palabra clave
         """
-        detections = []
+        # Un texto que es exactamente una palabra clave (p. ej. un botón "Cancelar")
+        # se resuelve sin recorrerlo
+        if text_lower in self._cancellation_keyword_set:
+            return True
+        if self._cancellation_automaton is not None:
+            return next(self._cancellation_automaton.iter(text_lower), None) is not None
+        return any(keyword in text_lower for keyword in self._cancellation_keywords_lower)
+    
+    def _token_has_cancellation_keyword(self, token: str) -> bool:
+        """
+        Comprueba si un id o una clase contiene alguna palabra clave de cancelación.
         
-        # 1. Buscar frases que indiquen procesos difíciles de cancelación
-        text_matches = self.search_text_patterns(page_content, self.difficult_cancellation_phrases)
+        Se busca como subcadena (p. ej. "btn-cancel" contiene "cancel"), igual
+        que en el texto; se usa a través de la caché self._token_has_keyword.
         
-        for match in text_matches:
-            # Calcular confianza basada en la presencia de palabras clave de cancelación
-            cancellation_keyword_count = sum(1 for word in self.cancellation_keywords if word.lower() in match["context"].lower())
-            confidence = self.calculate_confidence(cancellation_keyword_count + 1, 0.85)
+        Args:
+            token: Id o clase del nodo, sin pasar a minúsculas
             
-            if confidence >= self.confidence_threshold:
-                detections.append({
-                    "pattern_type": "difficult_cancellation",
-                    "evidence_type": "text",
-                    "evidence": match,
-                    "confidence": confidence,
-                    "location": "Texto en página",
-                    "screenshot": screenshot_path
-                })
+        Returns:
+            bool: True si contiene al menos una palabra clave
+        """
+        return self._has_cancellation_keyword(token.lower())
+    
+    def _count_cancellation_keywords(self, text_lower: str, limit: Optional[int] = None) -> int:
+        """
+        Cuenta cuántas palabras clave de cancelación distintas aparecen en un texto.
         
-        # 2. Buscar secciones relacionadas con cancelación y analizar su accesibilidad
-        # Buscar elementos que contengan palabras clave de cancelación
+        Args:
+            text_lower: Texto en minúsculas
+            limit: Si se indica, se deja de contar al llegar a este número
+            
+        Returns:
+            int: Número de palabras clave presentes (como mucho limit)
+        """
+        if self._cancellation_automaton is not None:
+            found = set()
+            for _, keyword in self._cancellation_automaton.iter(text_lower):
+                found.add(keyword)
+                if len(found) == limit:
+                    break
+            return len(found)
+        
+        count = 0
+        for keyword in self._cancellation_keywords_lower:
+            if keyword in text_lower:
+                count += 1
+                if count == limit:
+                    break
+        return count
+    
+    def _scan_dom(self, dom_structure: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+        """
+        Recoge las secciones de cancelación y los formularios del DOM.
+        
+        Usa el DOM aplanado que comparten todos los detectores (ver
+        _get_flat_dom), así que no vuelve a recorrer la estructura. El texto y
+        los campos de entrada de cada formulario se toman de su subárbol.
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]: Secciones de
+            cancelación ({"node", "index", "depth"} más "text", "id" o "class"),
+            formularios ({"node", "index", "text_parts", "input_count"}) y número
+            de secciones con profundidad mayor que 3. Las rutas se obtienen con
+            dom_path al generar las detecciones
+        """
         cancellation_sections = []
+        forms = []
+        deep_section_count = 0
         
-        def search_cancellation_sections(node, path="body", depth=0):
+        flat_dom = self._get_flat_dom(dom_structure)
+        nodes = flat_dom["nodes"]
+        depths = flat_dom["depths"]
+        ends = flat_dom["ends"]
+        texts_lower = self._get_lowered_texts(dom_structure)
+        
+        for index, node in enumerate(nodes):
+            depth = depths[index]
+            section_count = len(cancellation_sections)
+            
             # Verificar si el nodo actual contiene texto relacionado con cancelación
-            if node.get("text"):
-                text = node.get("text", "").lower()
-                if any(keyword.lower() in text for keyword in self.cancellation_keywords):
+            text = texts_lower[index]
+            if text:
+                if self._has_cancellation_keyword(text):
                     cancellation_sections.append({
                         "node": node,
-                        "path": path,
+                        "index": index,
                         "depth": depth,
                         "text": text
                     })
             
             # Verificar atributos como ID o clase
-            if node.get("id") and any(keyword.lower() in node.get("id", "").lower() for keyword in self.cancellation_keywords):
+            if node.get("id") and self._token_has_keyword(node.get("id", "")):
                 cancellation_sections.append({
                     "node": node,
-                    "path": path,
+                    "index": index,
                     "depth": depth,
                     "id": node.get("id")
                 })
             
             if node.get("classes"):
                 for cls in node.get("classes", []):
-                    if any(keyword.lower() in cls.lower() for keyword in self.cancellation_keywords):
+                    if self._token_has_keyword(cls):
                         cancellation_sections.append({
                             "node": node,
-                            "path": path,
+                            "index": index,
                             "depth": depth,
                             "class": cls
                         })
             
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_cancellation_sections(child, child_path, depth + 1)
+            # Todas las secciones de un nodo tienen su profundidad
+            if depth > 3:
+                deep_section_count += len(cancellation_sections) - section_count
+            
+            # Los formularios se identifican igual que con find_elements_by_attributes
+            if node.get("type", "").lower() == "form":
+                # El subárbol del formulario (él incluido) es un tramo contiguo en preorden
+                subtree = nodes[index:ends[index]]
+                forms.append({
+                    "node": node,
+                    "index": index,
+                    "text_parts": [child["text"] for child in subtree if child.get("text")],
+                    "input_count": sum(1 for child in subtree if child.get("type") in ("INPUT", "SELECT", "TEXTAREA"))
+                })
+        
+        return cancellation_sections, forms, deep_section_count
+    
+    def detect(self, page_content: str, dom_structure: Dict[str, Any], 
+               screenshot_path: str, url: str) -> List[Dict[str, Any]]:
+        """
+        Detecta patrones de suscripciones difíciles de cancelar en una página.
+        
+        Args:
+            page_content: Contenido HTML de la página
+            dom_structure: Estructura DOM de la página
+            screenshot_path: Ruta a la captura de pantalla de la página
+            url: URL de la página
+            
+        Returns:
+            List[Dict[str, Any]]: Lista de patrones de suscripciones difíciles de cancelar detectados
+        """
+        detections = []
+        
+        # 1. Buscar frases que indiquen procesos difíciles de cancelación
+        text_matches = self.search_text_patterns(page_content, self._compiled_phrases,
+                                                 combined_pattern=self._combined_phrases)
+        
+        for match in text_matches:
+            # Calcular confianza basada en la presencia de palabras clave de cancelación
+            cancellation_keyword_count = self._count_cancellation_keywords(match["context"].lower(),
+                                                                           limit=self._text_keyword_limit)
+            confidence = self._text_confidences[cancellation_keyword_count]
+            
+            if confidence >= self.confidence_threshold:
+                detections.append({
+                    "pattern_type": "difficult_cancellation",
+                    "evidence_type": "text",
+                    "evidence": match,
+                    "confidence": confidence,
+                    "location": "Texto en página",
+                    "screenshot": screenshot_path
+                })
         
-        # Iniciar búsqueda desde la raíz
-        search_cancellation_sections(dom_structure)
+        # 2. Buscar secciones relacionadas con cancelación y analizar su accesibilidad
+        # Una sola pasada por el DOM aplanado recoge las secciones de cancelación y
+        # los formularios (se reutiliza si esta estructura ya se analizó)
+        cancellation_sections, forms, deep_section_count = self._get_dom_analysis(dom_structure, self._scan_dom)
+        flat_dom = self._get_flat_dom(dom_structure)
         
         # Analizar secciones de cancelación encontradas
         if cancellation_sections:
-            # Verificar si las secciones de cancelación están muy anidadas (difíciles de encontrar)
-            deep_sections = [section for section in cancellation_sections if section["depth"] > 3]
-            
-            if deep_sections and len(deep_sections) / len(cancellation_sections) > 0.5:
-                confidence = self.calculate_confidence(len(deep_sections), 0.75)
+            # Verificar si las secciones de cancelación están muy anidadas (difíciles de encontrar).
+            # Las secciones profundas se cuentan durante el recorrido; la lista solo
+            # se construye si la detección se va a informar
+            if deep_section_count and deep_section_count / len(cancellation_sections) > 0.5:
+                confidence = self.calculate_confidence(deep_section_count, 0.75)
                 
                 if confidence >= self.confidence_threshold:
+                    deep_sections = [section for section in cancellation_sections if section["depth"] > 3]
                     detections.append({
                         "pattern_type": "difficult_cancellation",
                         "evidence_type": "deep_navigation",
                         "evidence": {
                             "sections": [
                                 {
-                                    "path": section["path"],
+                                    "path": dom_path(flat_dom, section["index"]),
                                     "depth": section["depth"],
                                     "text": section.get("text", "N/A")
                                 } 
@@ -162,34 +290,34 @@ class DifficultCancellationDetector(DarkPatternDetector):
                         "screenshot": screenshot_path
                     })
             
-            # Buscar enlaces o botones de cancelación
-            cancellation_links = []
-            for section in cancellation_sections:
-                if "node" in section and "children" in section["node"]:
-                    # Buscar enlaces o botones en los hijos
-                    for child in section["node"].get("children", []):
-                        if child.get("type") in ["A", "BUTTON"] and child.get("text"):
-                            text = child.get("text", "").lower()
-                            if any(keyword.lower() in text for keyword in self.cancellation_keywords):
-                                cancellation_links.append({
-                                    "text": text,
-                                    "path": section["path"],
-                                    "type": child.get("type")
-                                })
+            # La detección de falta de enlaces solo depende del número de secciones:
+            # si no llega al umbral, no hace falta buscar los enlaces
+            confidence = self.calculate_confidence(len(cancellation_sections), 0.8)
             
-            # Si no hay enlaces o botones de cancelación en secciones que hablan de cancelación,
-            # puede ser indicio de que es difícil cancelar
-            if cancellation_sections and not cancellation_links:
-                confidence = self.calculate_confidence(len(cancellation_sections), 0.8)
+            if confidence >= self.confidence_threshold:
+                # Buscar enlaces o botones de cancelación; basta con encontrar uno
+                has_cancellation_link = False
+                for section in cancellation_sections:
+                    if "node" in section and "children" in section["node"]:
+                        # Buscar enlaces o botones en los hijos
+                        for child in section["node"].get("children", []):
+                            if child.get("type") in ["A", "BUTTON"] and child.get("text"):
+                                if self._has_cancellation_keyword(child.get("text", "").lower()):
+                                    has_cancellation_link = True
+                                    break
+                    if has_cancellation_link:
+                        break
                 
-                if confidence >= self.confidence_threshold:
+                # Si no hay enlaces o botones de cancelación en secciones que hablan de cancelación,
+                # puede ser indicio de que es difícil cancelar
+                if not has_cancellation_link:
                     detections.append({
                         "pattern_type": "difficult_cancellation",
                         "evidence_type": "no_cancellation_links",
                         "evidence": {
                             "sections": [
                                 {
-                                    "path": section["path"],
+                                    "path": dom_path(flat_dom, section["index"]),
                                     "text": section.get("text", "N/A")
                                 } 
                                 for section in cancellation_sections
@@ -202,54 +330,32 @@ class DifficultCancellationDetector(DarkPatternDetector):
         
         # 3. Buscar formularios complejos relacionados con cancelación
         # Buscar formularios que contengan palabras clave de cancelación
-        forms = self.find_elements_by_attributes(dom_structure, {"type": "FORM"})
-        
         for form in forms:
-            form_text = ""
-            
-            # Extraer todo el texto del formulario
-            def extract_form_text(node):
-                nonlocal form_text
-                if node.get("text"):
-                    form_text += " " + node.get("text", "")
-                
-                if "children" in node:
-                    for child in node["children"]:
-                        extract_form_text(child)
+            # Si el formulario de cancelación tiene muchos campos, puede ser indicio de dificultad.
+            # El número de campos y la confianza se comprueban antes de unir el texto
+            if form["input_count"] <= 3:
+                continue
+            confidence = self.calculate_confidence(form["input_count"], 0.8)
+            if confidence < self.confidence_threshold:
+                continue
             
-            extract_form_text(form["node"])
+            # Todo el texto del formulario (el suyo y el de sus descendientes)
+            form_text = " " + " ".join(form["text_parts"]) if form["text_parts"] else ""
             
             # Verificar si el formulario está relacionado con cancelación
-            if any(keyword.lower() in form_text.lower() for keyword in self.cancellation_keywords):
-                # Contar campos de entrada en el formulario
-                input_fields = []
-                
-                def count_input_fields(node):
-                    if node.get("type") in ["INPUT", "SELECT", "TEXTAREA"]:
-                        input_fields.append(node)
-                    
-                    if "children" in node:
-                        for child in node["children"]:
-                            count_input_fields(child)
-                
-                count_input_fields(form["node"])
-                
-                # Si el formulario de cancelación tiene muchos campos, puede ser indicio de dificultad
-                if len(input_fields) > 3:
-                    confidence = self.calculate_confidence(len(input_fields), 0.8)
-                    
-                    if confidence >= self.confidence_threshold:
-                        detections.append({
-                            "pattern_type": "difficult_cancellation",
-                            "evidence_type": "complex_form",
-                            "evidence": {
-                                "form_path": form["path"],
-                                "form_text": form_text,
-                                "input_count": len(input_fields)
-                            },
-                            "confidence": confidence,
-                            "location": f"Formulario complejo en {form['path']}",
-                            "screenshot": screenshot_path
-                        })
+            if self._has_cancellation_keyword(form_text.lower()):
+                form_path = dom_path(flat_dom, form["index"])
+                detections.append({
+                    "pattern_type": "difficult_cancellation",
+                    "evidence_type": "complex_form",
+                    "evidence": {
+                        "form_path": form_path,
+                        "form_text": form_text,
+                        "input_count": form["input_count"]
+                    },
+                    "confidence": confidence,
+                    "location": f"Formulario complejo en {form_path}",
+                    "screenshot": screenshot_path
+                })
         
         return self.format_detection_result(detections)["detections"]
@@ -4,11 +4,25 @@ Identifica contadores, temporizadores o indicadores de escasez que generan presi
 """
 
 import re
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Any, List, Optional, Tuple
 import os
 from pathlib import Path
 
-from .base_detector import DarkPatternDetector
+from .base_detector import DarkPatternDetector, dom_path
+
+# Unidades de tiempo de los patrones de contador. Cada alternativa prueba
+# primero la forma más larga (p. ej. "horas" antes que "hora"), para que la
+# coincidencia incluya la palabra completa
+_TIME_UNITS_ES = r"(horas?|hrs?|minutos?|mins?|segundos?|segs?)"
+_TIME_UNITS_EN = r"(hours?|hrs?|minutes?|mins?|seconds?|secs?)"
+
+# Formatos de hora como HH:MM:SS o MM:SS en el texto de un nodo
+_TIME_RE = re.compile(r'\d+:\d+(:\d+)?')
+
+# Textos como "X disponibles" o "X sold" en el texto de un nodo
+_SCARCITY_TEXT_RE = re.compile(r'\d+\s*(disponible|available|left|remaining|sold)', re.IGNORECASE)
 
 
 class FalseUrgencyDetector(DarkPatternDetector):
@@ -40,18 +54,18 @@ class FalseUrgencyDetector(DarkPatternDetector):
         # Patrones de texto que indican contadores o temporizadores
         self.countdown_patterns = [
             # Español
-            r"(\d+)\s*(hora|horas|hr|hrs|minuto|minutos|min|mins|segundo|segundos|seg|segs)\s*(restante|restantes)",
-            r"termina\s*en\s*(\d+)\s*(hora|horas|hr|hrs|minuto|minutos|min|mins|segundo|segundos|seg|segs)",
-            r"finaliza\s*en\s*(\d+)\s*(hora|horas|hr|hrs|minuto|minutos|min|mins|segundo|segundos|seg|segs)",
-            r"acaba\s*en\s*(\d+)\s*(hora|horas|hr|hrs|minuto|minutos|min|mins|segundo|segundos|seg|segs)",
-            r"solo\s*(\d+)\s*(hora|horas|hr|hrs|minuto|minutos|min|mins|segundo|segundos|seg|segs)\s*más",
+            rf"(\d+)\s*{_TIME_UNITS_ES}\s*(restantes?)",
+            rf"termina\s*en\s*(\d+)\s*{_TIME_UNITS_ES}",
+            rf"finaliza\s*en\s*(\d+)\s*{_TIME_UNITS_ES}",
+            rf"acaba\s*en\s*(\d+)\s*{_TIME_UNITS_ES}",
+            rf"solo\s*(\d+)\s*{_TIME_UNITS_ES}\s*más",
             r"(\d+):(\d+):(\d+)",  # Formato HH:MM:SS
             r"(\d+):(\d+)",  # Formato MM:SS
             # Inglés
-            r"(\d+)\s*(hour|hours|hr|hrs|minute|minutes|min|mins|second|seconds|sec|secs)\s*(remaining|left)",
-            r"ends\s*in\s*(\d+)\s*(hour|hours|hr|hrs|minute|minutes|min|mins|second|seconds|sec|secs)",
-            r"finishes\s*in\s*(\d+)\s*(hour|hours|hr|hrs|minute|minutes|min|mins|second|seconds|sec|secs)",
-            r"only\s*(\d+)\s*(hour|hours|hr|hrs|minute|minutes|min|mins|second|seconds|sec|secs)\s*more"
+            rf"(\d+)\s*{_TIME_UNITS_EN}\s*(remaining|left)",
+            rf"ends\s*in\s*(\d+)\s*{_TIME_UNITS_EN}",
+            rf"finishes\s*in\s*(\d+)\s*{_TIME_UNITS_EN}",
+            rf"only\s*(\d+)\s*{_TIME_UNITS_EN}\s*more"
         ]
         
         # Patrones de texto que indican escasez
@@ -69,6 +83,174 @@ class FalseUrgencyDetector(DarkPatternDetector):
             r"(high|in)\s*demand",
             r"(most|best)\s*(popular|selling)"
         ]
+        
+        # Palabras clave para identificar contadores en clases e IDs
+        self.countdown_keywords = [
+            "countdown", "timer", "clock", "counter", "remaining", "urgency",
+            "contador", "temporizador", "reloj", "restante", "urgencia"
+        ]
+        
+        # Palabras clave para identificar indicadores de escasez en clases e IDs
+        self.scarcity_keywords = [
+            "stock", "inventory", "availability", "remaining", "left", "quantity",
+            "popular", "trending", "demand", "hot", "selling", "sold",
+            "existencia", "inventario", "disponibilidad", "restante", "cantidad",
+            "popular", "tendencia", "demanda", "vendido"
+        ]
+        
+        # Patrones precompilados (se usan en cada página y se comparten entre instancias)
+        self._compiled_countdown_patterns, self._combined_countdown_pattern = self.compile_patterns(self.countdown_patterns)
+        self._compiled_scarcity_patterns, self._combined_scarcity_pattern = self.compile_patterns(self.scarcity_patterns)
+        
+        # Palabras clave de urgencia ya en minúsculas y autómata Aho-Corasick con
+        # ellas: una sola pasada por texto encuentra todas las que aparecen
+        self._urgency_keywords_lower = tuple(keyword.lower() for keyword in self.urgency_keywords)
+        self._urgency_automaton = self.keyword_automaton(self._urgency_keywords_lower)
+        
+        # Alternancias con las palabras clave de clases e IDs: una búsqueda
+        # descarta los nombres que no contienen ninguna antes de revisarlas una a una
+        self._countdown_keyword_re = self.combine_keywords(self.countdown_keywords)
+        self._scarcity_keyword_re = self.combine_keywords(self.scarcity_keywords)
+        
+        # Los mismos IDs y clases se repiten por toda la página: las palabras
+        # clave que contiene cada nombre se cuentan una sola vez
+        # (ver _count_name_keywords)
+        self._name_keyword_counts = lru_cache(maxsize=4096)(self._count_name_keywords)
+        
+        # Confianzas precalculadas. Una coincidencia de texto cuenta como una
+        # evidencia más que las palabras clave de su contexto, así que a partir
+        # de CONFIDENCE_SATURATION_COUNT - 1 palabras clave la confianza ya no
+        # cambia; la de un elemento se indexa por su número de evidencias
+        self._text_keyword_limit = self.CONFIDENCE_SATURATION_COUNT - 1
+        self._text_confidences = tuple(
+            self.calculate_confidence(keyword_count + 1, 0.8)
+            for keyword_count in range(self._text_keyword_limit + 1)
+        )
+        self._element_confidences = tuple(
+            self.calculate_confidence(evidence_count, 0.85)
+            for evidence_count in range(self.CONFIDENCE_SATURATION_COUNT + 1)
+        )
+    
+    def _count_urgency_keywords(self, text: str, keywords: Optional[Tuple[str, ...]] = None,
+                                limit: Optional[int] = None) -> int:
+        """
+        Cuenta cuántas palabras clave de urgencia distintas aparecen en un texto.
+        
+        Args:
+            text: Texto donde buscar
+            keywords: Palabras clave en minúsculas que pueden aparecer en el texto
+                      (por defecto, todas). Solo se usa sin el autómata
+            limit: Si se indica, se deja de contar al llegar a este número
+            
+        Returns:
+            int: Número de palabras clave de urgencia presentes (como mucho limit)
+        """
+        text_lower = text.lower()
+        if self._urgency_automaton is not None:
+            found = set()
+            for _, keyword in self._urgency_automaton.iter(text_lower):
+                found.add(keyword)
+                if len(found) == limit:
+                    break
+            return len(found)
+        
+        if keywords is None:
+            keywords = self._urgency_keywords_lower
+        count = 0
+        for keyword in keywords:
+            if keyword in text_lower:
+                count += 1
+                if count == limit:
+                    break
+        return count
+    
+    def _count_name_keywords(self, name: str) -> Tuple[int, int]:
+        """
+        Cuenta las palabras clave de contador y de escasez que contiene un ID o una clase.
+        
+        Se buscan como subcadenas (p. ej. "countdown-box" contiene "countdown"),
+        no como palabras sueltas; se usa a través de la caché self._name_keyword_counts.
+        
+        Args:
+            name: ID o clase del nodo, sin pasar a minúsculas
+            
+        Returns:
+            Tuple[int, int]: Número de palabras clave de contador y número de
+            palabras clave de escasez contenidas (las repetidas en la lista cuentan
+            una vez por aparición en ella)
+        """
+        name_lower = name.lower()
+        countdown_count = 0
+        if self._countdown_keyword_re.search(name_lower):
+            countdown_count = sum(1 for keyword in self.countdown_keywords if keyword in name_lower)
+        scarcity_count = 0
+        if self._scarcity_keyword_re.search(name_lower):
+            scarcity_count = sum(1 for keyword in self.scarcity_keywords if keyword in name_lower)
+        return countdown_count, scarcity_count
+    
+    def _scan_dom(self, flat_dom: Dict[str, List[Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Busca en un solo recorrido los contadores y los indicadores de escasez.
+        
+        Args:
+            flat_dom: DOM aplanado de la página (ver flatten_dom)
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]: Elementos que parecen
+            contadores y elementos que parecen indicadores de escasez, cada uno con
+            su índice en el DOM aplanado y sus indicios
+        """
+        countdown_elements = []
+        scarcity_elements = []
+        
+        for index, node in enumerate(flat_dom["nodes"]):
+            # Verificar si el nodo tiene clases o IDs que sugieren que es un contador
+            # o un indicador de escasez (un indicio por cada palabra clave contenida)
+            countdown_indicators = []
+            scarcity_indicators = []
+            
+            # Verificar ID
+            node_id = node.get("id")
+            if node_id:
+                countdown_count, scarcity_count = self._name_keyword_counts(node_id)
+                if countdown_count:
+                    countdown_indicators.extend([f"id: {node_id}"] * countdown_count)
+                if scarcity_count:
+                    scarcity_indicators.extend([f"id: {node_id}"] * scarcity_count)
+            
+            # Verificar clases
+            classes = node.get("classes")
+            if classes:
+                for cls in classes:
+                    countdown_count, scarcity_count = self._name_keyword_counts(cls)
+                    if countdown_count:
+                        countdown_indicators.extend([f"class: {cls}"] * countdown_count)
+                    if scarcity_count:
+                        scarcity_indicators.extend([f"class: {cls}"] * scarcity_count)
+            
+            text = node.get("text")
+            if text:
+                # Buscar formatos de tiempo como HH:MM:SS o MM:SS
+                if _TIME_RE.search(text):
+                    countdown_indicators.append(f"text: {text}")
+                
+                # Buscar patrones como "X disponibles" o "X% vendido"
+                if _SCARCITY_TEXT_RE.search(text):
+                    scarcity_indicators.append(f"text: {text}")
+            
+            # Si parece un contador o un indicador de escasez, añadirlo a su lista
+            if countdown_indicators:
+                countdown_elements.append({
+                    "index": index,
+                    "indicators": countdown_indicators
+                })
+            if scarcity_indicators:
+                scarcity_elements.append({
+                    "index": index,
+                    "indicators": scarcity_indicators
+                })
+        
+        return countdown_elements, scarcity_elements
     
     def detect(self, page_content: str, dom_structure: Dict[str, Any], 
                screenshot_path: str, url: str) -> List[Dict[str, Any]]:
@@ -86,13 +268,31 @@ class FalseUrgencyDetector(DarkPatternDetector):
         """
         detections = []
         
-        # 1. Buscar contadores o temporizadores en el texto
-        countdown_matches = self.search_text_patterns(page_content, self.countdown_patterns)
+        # La página se pasa a minúsculas una sola vez para las dos búsquedas de patrones
+        page_lower = page_content.lower()
+        countdown_matches = self.search_text_patterns(page_content, self._compiled_countdown_patterns,
+                                                      combined_pattern=self._combined_countdown_pattern,
+                                                      text_lower=page_lower)
+        scarcity_matches = self.search_text_patterns(page_content, self._compiled_scarcity_patterns,
+                                                     combined_pattern=self._combined_scarcity_pattern,
+                                                     text_lower=page_lower)
+        
+        # Las palabras clave de urgencia que no están en la página no pueden estar
+        # en el contexto de ninguna coincidencia. Sin el autómata, si los contextos
+        # suman más texto que la página, compensa descartarlas antes con una sola
+        # comprobación sobre la página cada una
+        page_keywords = None
+        if self._urgency_automaton is None:
+            context_length = sum(len(match["context"]) for match in chain(countdown_matches, scarcity_matches))
+            if context_length > len(page_lower):
+                page_keywords = tuple(keyword for keyword in self._urgency_keywords_lower if keyword in page_lower)
         
+        # 1. Buscar contadores o temporizadores en el texto
         for match in countdown_matches:
             # Calcular confianza basada en la presencia de palabras clave de urgencia
-            urgency_keyword_count = sum(1 for word in self.urgency_keywords if word.lower() in match["context"].lower())
-            confidence = self.calculate_confidence(urgency_keyword_count + 1, 0.8)
+            urgency_keyword_count = self._count_urgency_keywords(match["context"], page_keywords,
+                                                                 limit=self._text_keyword_limit)
+            confidence = self._text_confidences[urgency_keyword_count]
             
             if confidence >= self.confidence_threshold:
                 detections.append({
@@ -105,12 +305,11 @@ class FalseUrgencyDetector(DarkPatternDetector):
                 })
         
         # 2. Buscar indicadores de escasez en el texto
-        scarcity_matches = self.search_text_patterns(page_content, self.scarcity_patterns)
-        
         for match in scarcity_matches:
             # Calcular confianza basada en la presencia de palabras clave de urgencia
-            urgency_keyword_count = sum(1 for word in self.urgency_keywords if word.lower() in match["context"].lower())
-            confidence = self.calculate_confidence(urgency_keyword_count + 1, 0.8)
+            urgency_keyword_count = self._count_urgency_keywords(match["context"], page_keywords,
+                                                                 limit=self._text_keyword_limit)
+            confidence = self._text_confidences[urgency_keyword_count]
             
             if confidence >= self.confidence_threshold:
                 detections.append({
@@ -123,186 +322,77 @@ class FalseUrgencyDetector(DarkPatternDetector):
                 })
         
         # 3. Buscar elementos visuales que puedan ser contadores o indicadores de escasez
-        # Buscar elementos con clases o IDs que sugieran contadores
-        countdown_elements = []
-        
-        def search_countdown_elements(node, path="body"):
-            # Verificar si el nodo tiene clases o IDs que sugieren que es un contador
-            is_countdown = False
-            countdown_indicators = []
-            
-            # Palabras clave para identificar contadores en clases e IDs
-            countdown_keywords = [
-                "countdown", "timer", "clock", "counter", "remaining", "urgency",
-                "contador", "temporizador", "reloj", "restante", "urgencia"
-            ]
-            
-            # Verificar ID
-            if node.get("id"):
-                for keyword in countdown_keywords:
-                    if keyword.lower() in node.get("id", "").lower():
-                        is_countdown = True
-                        countdown_indicators.append(f"id: {node.get('id')}")
-            
-            # Verificar clases
-            if node.get("classes"):
-                for cls in node.get("classes", []):
-                    for keyword in countdown_keywords:
-                        if keyword.lower() in cls.lower():
-                            is_countdown = True
-                            countdown_indicators.append(f"class: {cls}")
-            
-            # Verificar texto que parece un contador
-            if node.get("text"):
-                text = node.get("text", "")
-                # Buscar formatos de tiempo como HH:MM:SS o MM:SS
-                if re.search(r'\d+:\d+(:\d+)?', text):
-                    is_countdown = True
-                    countdown_indicators.append(f"text: {text}")
-            
-            # Si parece un contador, añadirlo a la lista
-            if is_countdown:
-                countdown_elements.append({
-                    "node": node,
-                    "path": path,
-                    "indicators": countdown_indicators
-                })
-            
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_countdown_elements(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz
-        search_countdown_elements(dom_structure)
+        # Un solo recorrido del DOM aplanado (en preorden, sin recursión) busca a la
+        # vez los contadores y los indicadores de escasez; el subárbol del nodo i
+        # es nodes[i:ends[i]]
+        flat_dom = self._get_flat_dom(dom_structure)
+        nodes = flat_dom["nodes"]
+        ends = flat_dom["ends"]
+        countdown_elements, scarcity_elements = self._scan_dom(flat_dom)
         
         # Analizar elementos de contador encontrados
         for element in countdown_elements:
-            # Extraer texto del elemento
-            element_text = ""
-            
-            def extract_element_text(node):
-                nonlocal element_text
-                if node.get("text"):
-                    element_text += " " + node.get("text", "")
-                
-                if "children" in node:
-                    for child in node["children"]:
-                        extract_element_text(child)
+            # Extraer texto del elemento (cada texto precedido de un espacio)
+            element_text = "".join(
+                " " + node["text"] for node in nodes[element["index"]:ends[element["index"]]] if node.get("text")
+            )
             
-            extract_element_text(element["node"])
-            
-            # Verificar si el texto contiene palabras clave de urgencia
-            urgency_keyword_count = sum(1 for word in self.urgency_keywords if word.lower() in element_text.lower())
+            # Verificar si el texto contiene palabras clave de urgencia (solo hasta
+            # que la confianza deja de crecer)
+            evidence_count = min(len(element["indicators"]), self.CONFIDENCE_SATURATION_COUNT)
+            if evidence_count < self.CONFIDENCE_SATURATION_COUNT:
+                evidence_count += self._count_urgency_keywords(
+                    element_text, limit=self.CONFIDENCE_SATURATION_COUNT - evidence_count
+                )
             
             # Calcular confianza
-            confidence = self.calculate_confidence(len(element["indicators"]) + urgency_keyword_count, 0.85)
+            confidence = self._element_confidences[evidence_count]
             
             if confidence >= self.confidence_threshold:
+                path = dom_path(flat_dom, element["index"])
                 detections.append({
                     "pattern_type": "false_urgency",
                     "evidence_type": "countdown_element",
                     "evidence": {
-                        "path": element["path"],
+                        "path": path,
                         "indicators": element["indicators"],
                         "text": element_text
                     },
                     "confidence": confidence,
-                    "location": f"Contador en {element['path']}",
+                    "location": f"Contador en {path}",
                     "screenshot": screenshot_path
                 })
         
-        # 4. Buscar elementos visuales que puedan ser indicadores de escasez
-        # Buscar elementos con clases o IDs que sugieran indicadores de escasez
-        scarcity_elements = []
-        
-        def search_scarcity_elements(node, path="body"):
-            # Verificar si el nodo tiene clases o IDs que sugieren que es un indicador de escasez
-            is_scarcity = False
-            scarcity_indicators = []
-            
-            # Palabras clave para identificar indicadores de escasez en clases e IDs
-            scarcity_keywords = [
-                "stock", "inventory", "availability", "remaining", "left", "quantity",
-                "popular", "trending", "demand", "hot", "selling", "sold",
-                "existencia", "inventario", "disponibilidad", "restante", "cantidad",
-                "popular", "tendencia", "demanda", "vendido"
-            ]
-            
-            # Verificar ID
-            if node.get("id"):
-                for keyword in scarcity_keywords:
-                    if keyword.lower() in node.get("id", "").lower():
-                        is_scarcity = True
-                        scarcity_indicators.append(f"id: {node.get('id')}")
-            
-            # Verificar clases
-            if node.get("classes"):
-                for cls in node.get("classes", []):
-                    for keyword in scarcity_keywords:
-                        if keyword.lower() in cls.lower():
-                            is_scarcity = True
-                            scarcity_indicators.append(f"class: {cls}")
-            
-            # Verificar texto que parece un indicador de escasez
-            if node.get("text"):
-                text = node.get("text", "")
-                # Buscar patrones como "X disponibles" o "X% vendido"
-                if re.search(r'\d+\s*(disponible|available|left|remaining|sold)', text, re.IGNORECASE):
-                    is_scarcity = True
-                    scarcity_indicators.append(f"text: {text}")
-            
-            # Si parece un indicador de escasez, añadirlo a la lista
-            if is_scarcity:
-                scarcity_elements.append({
-                    "node": node,
-                    "path": path,
-                    "indicators": scarcity_indicators
-                })
-            
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_scarcity_elements(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz
-        search_scarcity_elements(dom_structure)
-        
-        # Analizar elementos de escasez encontrados
+        # 4. Analizar los elementos visuales que puedan ser indicadores de escasez
         for element in scarcity_elements:
-            # Extraer texto del elemento
-            element_text = ""
-            
-            def extract_element_text(node):
-                nonlocal element_text
-                if node.get("text"):
-                    element_text += " " + node.get("text", "")
-                
-                if "children" in node:
-                    for child in node["children"]:
-                        extract_element_text(child)
-            
-            extract_element_text(element["node"])
+            # Extraer texto del elemento (cada texto precedido de un espacio)
+            element_text = "".join(
+                " " + node["text"] for node in nodes[element["index"]:ends[element["index"]]] if node.get("text")
+            )
             
-            # Verificar si el texto contiene palabras clave de urgencia
-            urgency_keyword_count = sum(1 for word in self.urgency_keywords if word.lower() in element_text.lower())
+            # Verificar si el texto contiene palabras clave de urgencia (solo hasta
+            # que la confianza deja de crecer)
+            evidence_count = min(len(element["indicators"]), self.CONFIDENCE_SATURATION_COUNT)
+            if evidence_count < self.CONFIDENCE_SATURATION_COUNT:
+                evidence_count += self._count_urgency_keywords(
+                    element_text, limit=self.CONFIDENCE_SATURATION_COUNT - evidence_count
+                )
             
             # Calcular confianza
-            confidence = self.calculate_confidence(len(element["indicators"]) + urgency_keyword_count, 0.85)
+            confidence = self._element_confidences[evidence_count]
             
             if confidence >= self.confidence_threshold:
+                path = dom_path(flat_dom, element["index"])
                 detections.append({
                     "pattern_type": "false_urgency",
                     "evidence_type": "scarcity_element",
                     "evidence": {
-                        "path": element["path"],
+                        "path": path,
                         "indicators": element["indicators"],
                         "text": element_text
                     },
                     "confidence": confidence,
-                    "location": f"Indicador de escasez en {element['path']}",
+                    "location": f"Indicador de escasez en {path}",
                     "screenshot": screenshot_path
                 })
         
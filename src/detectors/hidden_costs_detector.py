@@ -4,16 +4,29 @@ Identifica costos adicionales que se revelan tarde en el proceso de compra.
 """
 
 import re
-from typing import Dict, Any, List, Optional
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple
 import os
 from pathlib import Path
 
-from .base_detector import DarkPatternDetector
+from .base_detector import DarkPatternDetector, dom_path
+
+# Precios con símbolo de moneda delante o detrás (€, $, etc.)
+_PRICE_RE = re.compile(r'(\d+[.,]\d+|\d+)\s*[€$£¥]|[€$£¥]\s*(\d+[.,]\d+|\d+)')
+
+# Símbolos de moneda: un texto sin ninguno no puede contener un precio, y
+# buscarlos es mucho más rápido que probar _PRICE_RE en cada posición
+_PRICE_GLYPH_RE = re.compile(r'[€$£¥]')
 
 
 class HiddenCostsDetector(DarkPatternDetector):
     """Detector de patrones de cargos ocultos."""
     
+    # Bits de "flags" de cada elemento de precio, que se calculan una sola vez
+    # al recorrer el DOM y se combinan con OR para toda la página
+    _FLAG_PRICE = 1         # contiene un precio con símbolo de moneda
+    _FLAG_COST_KEYWORD = 2  # contiene alguna palabra clave de costos
+    
     def __init__(self):
         """Inicializa el detector de cargos ocultos."""
         super().__init__(
@@ -63,6 +76,113 @@ class HiddenCostsDetector(DarkPatternDetector):
             r"(not\s+including|excludes)\s+(VAT|tax|taxes)",
             r"(fee|charge|surcharge)\s+for\s+(transaction|processing|payment)"
         ]
+        
+        # Patrones precompilados (se usan en cada página y en cada elemento de precio,
+        # y se comparten entre instancias)
+        self._compiled_hidden_cost_patterns, self._combined_hidden_cost_pattern = self.compile_patterns(self.hidden_cost_patterns)
+        
+        # Palabras clave de costos ya en minúsculas y autómata Aho-Corasick con
+        # ellas: una sola pasada por texto encuentra todas las que aparecen
+        self._cost_keywords_lower = tuple(keyword.lower() for keyword in self.cost_keywords)
+        self._cost_automaton = self.keyword_automaton(self._cost_keywords_lower)
+        
+        # Palabras clave que identifican secciones de checkout o carrito
+        self.checkout_keywords = ["checkout", "carrito", "cesta", "pago", "compra", "finalizar", "proceder", "cart", "basket", "payment", "purchase", "proceed"]
+        
+        # Alternancias con las palabras clave: una sola búsqueda indica si un
+        # texto contiene alguna, en lugar de una comprobación por palabra
+        self._cost_keyword_re = self.combine_keywords(self.cost_keywords)
+        self._checkout_keyword_re = self.combine_keywords(self.checkout_keywords)
+        
+        # Confianzas precalculadas, indexadas por el número de evidencias (a
+        # partir de CONFIDENCE_SATURATION_COUNT la confianza ya no cambia)
+        evidence_counts = range(self.CONFIDENCE_SATURATION_COUNT + 1)
+        self._text_confidences = tuple(self.calculate_confidence(count, 0.8) for count in evidence_counts)
+        self._price_confidences = tuple(self.calculate_confidence(count, 0.85) for count in evidence_counts)
+        self._checkout_confidences = tuple(self.calculate_confidence(count, 0.9) for count in evidence_counts)
+    
+    def _find_cost_keywords(self, text_lower: str) -> List[str]:
+        """
+        Obtiene las palabras clave de costos contenidas en un texto.
+        
+        Args:
+            text_lower: Texto donde buscar, en minúsculas
+            
+        Returns:
+            List[str]: Palabras clave encontradas, en el orden de cost_keywords
+            (las palabras repetidas en la lista aparecen repetidas)
+        """
+        if self._cost_automaton is not None:
+            hits = {keyword for _, keyword in self._cost_automaton.iter(text_lower)}
+            return [keyword for keyword, keyword_lower in zip(self.cost_keywords, self._cost_keywords_lower) if keyword_lower in hits]
+        return [keyword for keyword, keyword_lower in zip(self.cost_keywords, self._cost_keywords_lower) if keyword_lower in text_lower]
+    
+    def _scan_dom(self, dom_structure: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+        """
+        Busca en un solo recorrido los elementos de precio y las secciones de checkout.
+        
+        Recorre el DOM aplanado común a todos los detectores y usa el texto en
+        minúsculas de cada nodo que guarda junto a él (ver _get_lowered_texts).
+        
+        Args:
+            dom_structure: Estructura DOM de la página
+            
+        Returns:
+            Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]: Elementos con
+            texto relacionado con precios o costos (índice, texto en minúsculas,
+            bits _FLAG_* y palabras clave de costos que contiene), secciones de
+            checkout (índice; una sección aparece una vez por cada texto, ID o
+            clase que la identifica) y OR de los bits de todos los elementos de
+            precio. Las rutas se obtienen con dom_path al generar las detecciones
+        """
+        flat_dom = self._get_flat_dom(dom_structure)
+        texts_lower = self._get_lowered_texts(dom_structure)
+        price_elements = []
+        checkout_sections = []
+        page_flags = 0
+        
+        for index, node in enumerate(flat_dom["nodes"]):
+            # Verificar si el nodo actual contiene texto relacionado con precios
+            text = texts_lower[index]
+            if text:
+                # Buscar patrones de precio (€, $, etc.) y palabras clave de costos
+                flags = 0
+                if _PRICE_GLYPH_RE.search(text) and _PRICE_RE.search(text):
+                    flags |= self._FLAG_PRICE
+                if self._cost_keyword_re.search(text):
+                    flags |= self._FLAG_COST_KEYWORD
+                
+                # Las palabras clave de cada elemento se obtienen aquí una sola vez,
+                # aunque el elemento esté dentro de varias secciones de checkout
+                if flags:
+                    price_elements.append({
+                        "index": index,
+                        "text": text,
+                        "flags": flags,
+                        "keywords": self._find_cost_keywords(text) if flags & self._FLAG_COST_KEYWORD else []
+                    })
+                    page_flags |= flags
+                
+                # Verificar si contiene texto relacionado con checkout
+                if self._checkout_keyword_re.search(text):
+                    checkout_sections.append({
+                        "index": index
+                    })
+            
+            # Verificar atributos como ID o clase
+            if node.get("id") and self._checkout_keyword_re.search(node.get("id", "").lower()):
+                checkout_sections.append({
+                    "index": index
+                })
+            
+            if node.get("classes"):
+                for cls in node.get("classes", []):
+                    if self._checkout_keyword_re.search(cls.lower()):
+                        checkout_sections.append({
+                            "index": index
+                        })
+        
+        return price_elements, checkout_sections, page_flags
     
     def detect(self, page_content: str, dom_structure: Dict[str, Any], 
                screenshot_path: str, url: str) -> List[Dict[str, Any]]:
@@ -81,12 +201,13 @@ class HiddenCostsDetector(DarkPatternDetector):
         detections = []
         
         # 1. Buscar patrones de texto que indiquen cargos ocultos
-        text_matches = self.search_text_patterns(page_content, self.hidden_cost_patterns)
+        text_matches = self.search_text_patterns(page_content, self._compiled_hidden_cost_patterns,
+                                                 combined_pattern=self._combined_hidden_cost_pattern)
         
         for match in text_matches:
             # Calcular confianza basada en la presencia de palabras clave de costos
-            cost_keyword_count = sum(1 for word in self.cost_keywords if word.lower() in match["context"].lower())
-            confidence = self.calculate_confidence(cost_keyword_count + 1, 0.8)
+            cost_keyword_count = len(self._find_cost_keywords(match["context"].lower()))
+            confidence = self._text_confidences[min(cost_keyword_count + 1, self.CONFIDENCE_SATURATION_COUNT)]
             
             if confidence >= self.confidence_threshold:
                 detections.append({
@@ -99,165 +220,83 @@ class HiddenCostsDetector(DarkPatternDetector):
                 })
         
         # 2. Buscar elementos que puedan contener información sobre cargos
-        # Buscar elementos con texto relacionado con precios o costos
-        price_elements = []
-        
-        def search_price_nodes(node, path="body"):
-            # Verificar si el nodo actual contiene texto relacionado con precios
-            if node.get("text"):
-                text = node.get("text", "").lower()
-                
-                # Buscar patrones de precio (€, $, etc.)
-                price_pattern = r'(\d+[.,]\d+|\d+)\s*[€$£¥]|[€$£¥]\s*(\d+[.,]\d+|\d+)'
-                if re.search(price_pattern, text):
-                    price_elements.append({
-                        "node": node,
-                        "path": path,
-                        "text": text
-                    })
-                
-                # Buscar palabras clave de costos
-                elif any(keyword.lower() in text for keyword in self.cost_keywords):
-                    price_elements.append({
-                        "node": node,
-                        "path": path,
-                        "text": text
-                    })
-            
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_price_nodes(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz
-        search_price_nodes(dom_structure)
+        # Un solo recorrido del DOM aplanado (en preorden, sin recursión) busca a la
+        # vez los elementos de precio y las secciones de checkout; el subárbol del
+        # nodo i es nodes[i:ends[i]]
+        flat_dom = self._get_flat_dom(dom_structure)
+        ends = flat_dom["ends"]
+        price_elements, checkout_sections, page_flags = self._scan_dom(dom_structure)
         
         # Analizar elementos de precio encontrados
         for element in price_elements:
             text = element["text"]
             
             # Verificar si el texto contiene indicios de cargos ocultos
-            pattern_matches = any(re.search(pattern, text, re.IGNORECASE) for pattern in self.hidden_cost_patterns)
+            pattern_matches = self._combined_hidden_cost_pattern.search(text) is not None
             
             # Verificar si el texto contiene palabras clave de costos
-            cost_keyword_matches = [kw for kw in self.cost_keywords if kw.lower() in text.lower()]
+            cost_keyword_matches = element["keywords"]
             
             if pattern_matches or len(cost_keyword_matches) >= 2:
-                confidence = self.calculate_confidence(
-                    len(cost_keyword_matches) + (2 if pattern_matches else 0), 
-                    0.85
-                )
+                confidence = self._price_confidences[
+                    min(len(cost_keyword_matches) + (2 if pattern_matches else 0), self.CONFIDENCE_SATURATION_COUNT)
+                ]
                 
                 if confidence >= self.confidence_threshold:
+                    path = dom_path(flat_dom, element["index"])
                     detections.append({
                         "pattern_type": "hidden_costs",
                         "evidence_type": "price_element",
                         "evidence": {
                             "text": text,
-                            "path": element["path"],
+                            "path": path,
                             "keywords": cost_keyword_matches
                         },
                         "confidence": confidence,
-                        "location": f"Elemento de precio en {element['path']}",
+                        "location": f"Elemento de precio en {path}",
                         "screenshot": screenshot_path
                     })
         
-        # 3. Buscar elementos que aparezcan en secciones finales de checkout o carrito
-        # Buscar elementos que contengan palabras clave de checkout
-        checkout_keywords = ["checkout", "carrito", "cesta", "pago", "compra", "finalizar", "proceder", "cart", "basket", "payment", "purchase", "proceed"]
-        
-        checkout_sections = []
-        
-        def search_checkout_sections(node, path="body"):
-            # Verificar si el nodo actual contiene texto relacionado con checkout
-            if node.get("text"):
-                text = node.get("text", "").lower()
-                if any(keyword.lower() in text for keyword in checkout_keywords):
-                    checkout_sections.append({
-                        "node": node,
-                        "path": path
-                    })
-            
-            # Verificar atributos como ID o clase
-            if node.get("id") and any(keyword.lower() in node.get("id", "").lower() for keyword in checkout_keywords):
-                checkout_sections.append({
-                    "node": node,
-                    "path": path
-                })
-            
-            if node.get("classes"):
-                for cls in node.get("classes", []):
-                    if any(keyword.lower() in cls.lower() for keyword in checkout_keywords):
-                        checkout_sections.append({
-                            "node": node,
-                            "path": path
-                        })
-            
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_checkout_sections(child, child_path)
+        # 3. Analizar las secciones finales de checkout o carrito
+        # Una sección solo da una detección si alguno de sus elementos de precio
+        # contiene palabras clave de costos: si no las tiene ninguno de la página,
+        # no hace falta revisar las secciones
+        if not page_flags & self._FLAG_COST_KEYWORD:
+            checkout_sections = []
         
-        # Iniciar búsqueda desde la raíz
-        search_checkout_sections(dom_structure)
+        # El subárbol de una sección es un tramo contiguo del DOM aplanado, así que
+        # sus elementos de precio son un tramo de price_elements (ordenada por índice)
+        price_indexes = [element["index"] for element in price_elements]
         
-        # Analizar secciones de checkout encontradas
         for section in checkout_sections:
             # Buscar elementos de precio dentro de la sección de checkout
-            section_prices = []
-            
-            def search_section_prices(node, path):
-                if node.get("text"):
-                    text = node.get("text", "").lower()
-                    
-                    # Buscar patrones de precio (€, $, etc.)
-                    price_pattern = r'(\d+[.,]\d+|\d+)\s*[€$£¥]|[€$£¥]\s*(\d+[.,]\d+|\d+)'
-                    if re.search(price_pattern, text):
-                        section_prices.append({
-                            "text": text,
-                            "path": path
-                        })
-                    
-                    # Buscar palabras clave de costos
-                    elif any(keyword.lower() in text for keyword in self.cost_keywords):
-                        section_prices.append({
-                            "text": text,
-                            "path": path
-                        })
-                
-                # Buscar en nodos hijos
-                if "children" in node:
-                    for i, child in enumerate(node["children"]):
-                        child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                        search_section_prices(child, child_path)
-            
-            # Buscar precios en la sección de checkout
-            search_section_prices(section["node"], section["path"])
+            section_prices = price_elements[
+                bisect_left(price_indexes, section["index"]):bisect_left(price_indexes, ends[section["index"]])
+            ]
             
             # Si hay múltiples elementos de precio en la sección de checkout, puede ser indicio de cargos ocultos
             if len(section_prices) >= 2:
                 # Verificar si alguno contiene palabras clave de costos adicionales
                 additional_costs = [
                     price for price in section_prices 
-                    if any(kw.lower() in price["text"].lower() for kw in self.cost_keywords)
+                    if price["flags"] & self._FLAG_COST_KEYWORD
                 ]
                 
                 if additional_costs:
-                    confidence = self.calculate_confidence(len(additional_costs), 0.9)
+                    confidence = self._checkout_confidences[min(len(additional_costs), self.CONFIDENCE_SATURATION_COUNT)]
                     
                     if confidence >= self.confidence_threshold:
+                        section_path = dom_path(flat_dom, section["index"])
                         detections.append({
                             "pattern_type": "hidden_costs",
                             "evidence_type": "checkout_costs",
                             "evidence": {
-                                "section_path": section["path"],
+                                "section_path": section_path,
                                 "price_elements": [price["text"] for price in section_prices],
                                 "additional_costs": [cost["text"] for cost in additional_costs]
                             },
                             "confidence": confidence,
-                            "location": f"Sección de checkout en {section['path']}",
+                            "location": f"Sección de checkout en {section_path}",
                             "screenshot": screenshot_path
                         })
         
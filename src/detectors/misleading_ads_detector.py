@@ -8,7 +8,7 @@ from typing import Dict, Any, List, Optional
 import os
 from pathlib import Path
 
-from .base_detector import DarkPatternDetector
+from .base_detector import DarkPatternDetector, dom_path
 
 
 class MisleadingAdsDetector(DarkPatternDetector):
@@ -63,11 +63,17 @@ class MisleadingAdsDetector(DarkPatternDetector):
         """
         detections = []
         
+        # Los tres análisis recorren el DOM aplanado que comparten los detectores
+        # (en preorden, sin recursión); el subárbol del nodo i es nodes[i:ends[i]]
+        flat_dom = self._get_flat_dom(dom_structure)
+        nodes = flat_dom["nodes"]
+        ends = flat_dom["ends"]
+        
         # 1. Buscar elementos que parezcan anuncios pero no estén claramente etiquetados
         # Buscar elementos con atributos que sugieren que son anuncios
         potential_ads = []
         
-        def search_potential_ads(node, path="body"):
+        for index, node in enumerate(nodes):
             # Verificar si el nodo tiene clases o IDs que sugieren que es un anuncio
             is_potential_ad = False
             ad_indicators = []
@@ -115,34 +121,22 @@ class MisleadingAdsDetector(DarkPatternDetector):
             if is_potential_ad:
                 potential_ads.append({
                     "node": node,
-                    "path": path,
-                    "indicators": ad_indicators
+                    "indicators": ad_indicators,
+                    "index": index
                 })
-            
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_potential_ads(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz
-        search_potential_ads(dom_structure)
         
         # Analizar anuncios potenciales
         for ad in potential_ads:
-            # Extraer texto del anuncio
-            ad_text = ""
+            # La confianza solo depende de los indicadores: si no llega al umbral,
+            # no hace falta comprobar el texto
+            confidence = self.calculate_confidence(len(ad["indicators"]), 0.8)
+            if confidence < self.confidence_threshold:
+                continue
             
-            def extract_ad_text(node):
-                nonlocal ad_text
-                if node.get("text"):
-                    ad_text += " " + node.get("text", "")
-                
-                if "children" in node:
-                    for child in node["children"]:
-                        extract_ad_text(child)
-            
-            extract_ad_text(ad["node"])
+            # Extraer texto del anuncio: su subárbol es un tramo contiguo del DOM aplanado
+            # (las partes se unen al final, sin concatenar en cada nodo)
+            text_parts = [node["text"] for node in nodes[ad["index"]:ends[ad["index"]]] if node.get("text")]
+            ad_text = " " + " ".join(text_parts) if text_parts else ""
             
             # Verificar si el anuncio está claramente etiquetado
             is_labeled = False
@@ -153,27 +147,25 @@ class MisleadingAdsDetector(DarkPatternDetector):
             
             # Si no está claramente etiquetado, puede ser engañoso
             if not is_labeled:
-                confidence = self.calculate_confidence(len(ad["indicators"]), 0.8)
-                
-                if confidence >= self.confidence_threshold:
-                    detections.append({
-                        "pattern_type": "misleading_ads",
-                        "evidence_type": "unlabeled_ad",
-                        "evidence": {
-                            "path": ad["path"],
-                            "indicators": ad["indicators"],
-                            "text": ad_text
-                        },
-                        "confidence": confidence,
-                        "location": f"Anuncio no etiquetado en {ad['path']}",
-                        "screenshot": screenshot_path
-                    })
+                path = dom_path(flat_dom, ad["index"])
+                detections.append({
+                    "pattern_type": "misleading_ads",
+                    "evidence_type": "unlabeled_ad",
+                    "evidence": {
+                        "path": path,
+                        "indicators": ad["indicators"],
+                        "text": ad_text
+                    },
+                    "confidence": confidence,
+                    "location": f"Anuncio no etiquetado en {path}",
+                    "screenshot": screenshot_path
+                })
         
         # 2. Buscar elementos que parezcan contenido orgánico pero sean anuncios
         # Buscar elementos que contengan palabras clave de anuncios en atributos ocultos
         native_ads = []
         
-        def search_native_ads(node, path="body"):
+        for index, node in enumerate(nodes):
             # Verificar si el nodo parece contenido orgánico pero tiene indicadores ocultos de anuncio
             is_content_like = node.get("type") in ["ARTICLE", "SECTION", "DIV"] and node.get("text")
             has_hidden_ad_indicators = False
@@ -197,34 +189,22 @@ class MisleadingAdsDetector(DarkPatternDetector):
             if is_content_like and has_hidden_ad_indicators:
                 native_ads.append({
                     "node": node,
-                    "path": path,
-                    "indicators": hidden_indicators
+                    "indicators": hidden_indicators,
+                    "index": index
                 })
-            
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_native_ads(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz
-        search_native_ads(dom_structure)
         
         # Analizar anuncios nativos
         for ad in native_ads:
-            # Extraer texto del anuncio
-            ad_text = ""
-            
-            def extract_ad_text(node):
-                nonlocal ad_text
-                if node.get("text"):
-                    ad_text += " " + node.get("text", "")
-                
-                if "children" in node:
-                    for child in node["children"]:
-                        extract_ad_text(child)
+            # La confianza solo depende de los indicadores: si no llega al umbral,
+            # no hace falta comprobar el texto
+            confidence = self.calculate_confidence(len(ad["indicators"]), 0.85)
+            if confidence < self.confidence_threshold:
+                continue
             
-            extract_ad_text(ad["node"])
+            # Extraer texto del anuncio: su subárbol es un tramo contiguo del DOM aplanado
+            # (las partes se unen al final, sin concatenar en cada nodo)
+            text_parts = [node["text"] for node in nodes[ad["index"]:ends[ad["index"]]] if node.get("text")]
+            ad_text = " " + " ".join(text_parts) if text_parts else ""
             
             # Verificar si el anuncio está claramente etiquetado en el texto visible
             is_labeled = False
@@ -235,27 +215,25 @@ class MisleadingAdsDetector(DarkPatternDetector):
             
             # Si no está claramente etiquetado, es un anuncio nativo engañoso
             if not is_labeled:
-                confidence = self.calculate_confidence(len(ad["indicators"]), 0.85)
-                
-                if confidence >= self.confidence_threshold:
-                    detections.append({
-                        "pattern_type": "misleading_ads",
-                        "evidence_type": "native_ad",
-                        "evidence": {
-                            "path": ad["path"],
-                            "indicators": ad["indicators"],
-                            "text": ad_text
-                        },
-                        "confidence": confidence,
-                        "location": f"Anuncio nativo en {ad['path']}",
-                        "screenshot": screenshot_path
-                    })
+                path = dom_path(flat_dom, ad["index"])
+                detections.append({
+                    "pattern_type": "misleading_ads",
+                    "evidence_type": "native_ad",
+                    "evidence": {
+                        "path": path,
+                        "indicators": ad["indicators"],
+                        "text": ad_text
+                    },
+                    "confidence": confidence,
+                    "location": f"Anuncio nativo en {path}",
+                    "screenshot": screenshot_path
+                })
         
         # 3. Buscar botones o enlaces que parezcan funcionalidades del sitio pero sean anuncios
         # Buscar elementos que parezcan botones o enlaces de navegación
         fake_ui_elements = []
         
-        def search_fake_ui_elements(node, path="body"):
+        for index, node in enumerate(nodes):
             # Verificar si el nodo parece un botón o enlace de navegación
             is_ui_element = node.get("type") in ["BUTTON", "A"] or (
                 node.get("type") == "DIV" and 
@@ -289,22 +267,19 @@ class MisleadingAdsDetector(DarkPatternDetector):
                 if ad_indicators:
                     fake_ui_elements.append({
                         "node": node,
-                        "path": path,
                         "indicators": ad_indicators,
-                        "text": node.get("text", "")
+                        "text": node.get("text", ""),
+                        "index": index
                     })
-            
-            # Buscar en nodos hijos
-            if "children" in node:
-                for i, child in enumerate(node["children"]):
-                    child_path = f"{path} > {child.get('type', 'unknown')}[{i}]"
-                    search_fake_ui_elements(child, child_path)
-        
-        # Iniciar búsqueda desde la raíz
-        search_fake_ui_elements(dom_structure)
         
         # Analizar elementos de UI falsos
         for element in fake_ui_elements:
+            # La confianza solo depende de los indicadores: si no llega al umbral,
+            # no hace falta comprobar el texto
+            confidence = self.calculate_confidence(len(element["indicators"]), 0.9)
+            if confidence < self.confidence_threshold:
+                continue
+            
             # Verificar si el elemento está claramente etiquetado como anuncio
             is_labeled = False
             for keyword in self.ad_keywords:
@@ -314,20 +289,18 @@ class MisleadingAdsDetector(DarkPatternDetector):
             
             # Si no está claramente etiquetado, es un elemento de UI engañoso
             if not is_labeled:
-                confidence = self.calculate_confidence(len(element["indicators"]), 0.9)
-                
-                if confidence >= self.confidence_threshold:
-                    detections.append({
-                        "pattern_type": "misleading_ads",
-                        "evidence_type": "fake_ui",
-                        "evidence": {
-                            "path": element["path"],
-                            "indicators": element["indicators"],
-                            "text": element["text"]
-                        },
-                        "confidence": confidence,
-                        "location": f"Elemento de UI engañoso en {element['path']}",
-                        "screenshot": screenshot_path
-                    })
+                path = dom_path(flat_dom, element["index"])
+                detections.append({
+                    "pattern_type": "misleading_ads",
+                    "evidence_type": "fake_ui",
+                    "evidence": {
+                        "path": path,
+                        "indicators": element["indicators"],
+                        "text": element["text"]
+                    },
+                    "confidence": confidence,
+                    "location": f"Elemento de UI engañoso en {path}",
+                    "screenshot": screenshot_path
+                })
         
         return self.format_detection_result(detections)["detections"]
@@ -9,6 +9,7 @@ import json
 import uuid
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 import sys
@@ -18,7 +19,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.utils.url_loader import URLLoader, URLQueue
-from src.crawlers.web_crawler import DarkPatternCrawler
+from src.crawlers.web_crawler import DarkPatternCrawler, BrowserPool
 from src.detectors.base_detector import DarkPatternDetector
 from src.detectors.confirmshaming_detector import ConfirmshamingDetector
 from src.detectors.preselection_detector import PreselectionDetector
@@ -104,45 +105,55 @@ class AnalysisTask:
             # Inicializar generador de informes
             report_generator = ReportGenerator(str(REPORTS_FOLDER))
             
-            # Analizar cada URL
-            for i, url in enumerate(self.urls):
-                try:
-                    # Actualizar progreso
-                    self.progress = (i / self.total_urls) * 100
-                    
-                    # Analizar URL
-                    result = self._analyze_url(url, detectors)
-                    
-                    # Generar informe
-                    if result["success"]:
-                        report = report_generator.generate_report(
-                            url=url,
-                            detections=result["detections"],
-                            screenshots=result["screenshots"],
-                            metadata={"title": result["title"]}
-                        )
+            # Un único navegador para todas las URLs de la tarea
+            pool = BrowserPool(headless=True, max_workers=1)
+            
+            # Hilos para ejecutar los detectores de cada página a la vez
+            executor = ThreadPoolExecutor(max_workers=min(len(detectors), os.cpu_count() or 1))
+            
+            # Analizar cada URL (el navegador y los hilos se liberan aunque algo falle)
+            try:
+                for i, url in enumerate(self.urls):
+                    try:
+                        # Actualizar progreso
+                        self.progress = (i / self.total_urls) * 100
                         
-                        # Guardar informe en diferentes formatos
-                        json_path = report_generator.save_report_json(report)
-                        csv_path = report_generator.save_report_csv(report)
-                        html_path = report_generator.generate_html_report(report)
+                        # Analizar URL
+                        result = self._analyze_url(url, detectors, pool, executor)
                         
-                        self.reports[url] = {
-                            "json": json_path,
-                            "csv": csv_path,
-                            "html": html_path
-                        }
+                        # Generar informe
+                        if result["success"]:
+                            report = report_generator.generate_report(
+                                url=url,
+                                detections=result["detections"],
+                                screenshots=result["screenshots"],
+                                metadata={"title": result["title"]}
+                            )
+                            
+                            # Guardar informe en diferentes formatos
+                            json_path = report_generator.save_report_json(report)
+                            csv_path = report_generator.save_report_csv(report)
+                            html_path = report_generator.generate_html_report(report)
+                            
+                            self.reports[url] = {
+                                "json": json_path,
+                                "csv": csv_path,
+                                "html": html_path
+                            }
+                        
+                        # Guardar resultado
+                        self.results[url] = result
                     
-                    # Guardar resultado
-                    self.results[url] = result
-                
-                except Exception as e:
-                    # Registrar error para esta URL
-                    self.results[url] = {
-                        "url": url,
-                        "success": False,
-                        "error": str(e)
-                    }
+                    except Exception as e:
+                        # Registrar error para esta URL
+                        self.results[url] = {
+                            "url": url,
+                            "success": False,
+                            "error": str(e)
+                        }
+            finally:
+                pool.shutdown()
+                executor.shutdown()
             
             # Completar tarea
             self.status = "completed"
@@ -155,40 +166,49 @@ class AnalysisTask:
             self.error = str(e)
             self.end_time = datetime.now()
     
-    def _analyze_url(self, url: str, detectors: List[DarkPatternDetector]) -> Dict[str, Any]:
+    def _analyze_url(self, url: str, detectors: List[DarkPatternDetector],
+                     pool: Optional[BrowserPool] = None,
+                     executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
         """
         Analiza una URL en busca de patrones oscuros.
         
         Args:
             url: URL a analizar
             detectors: Lista de detectores a utilizar
+            pool: Pool de navegador reutilizado entre URLs
+            executor: Hilos en los que ejecutar los detectores; sin él se
+                      ejecutan uno tras otro
             
         Returns:
             Dict[str, Any]: Resultado del análisis
         """
         # Inicializar crawler
-        with DarkPatternCrawler(headless=True, screenshots_dir=str(SCREENSHOTS_FOLDER)) as crawler:
+        with DarkPatternCrawler(headless=True, screenshots_dir=str(SCREENSHOTS_FOLDER), pool=pool) as crawler:
             # Navegar a la URL
             result = crawler.analyze_page(url)
             
             if not result["success"]:
                 return result
             
-            # Obtener contenido de la página
-            page_content = crawler.get_page_content()
-            dom_structure = crawler.get_dom_structure()
-            
-            # Detectar patrones oscuros
-            all_detections = []
+            # Obtener contenido de la página (ya extraído por analyze_page)
+            cached_page = crawler.get_cached_page(url)
+            page_content = cached_page["page_content"]
+            dom_structure = cached_page["dom_structure"]
             
-            for detector in detectors:
-                detections = detector.detect(
+            # Detectar patrones oscuros. Los detectores solo leen la página, así que
+            # pueden ejecutarse a la vez; los resultados se recogen en su orden
+            def run_detector(detector: DarkPatternDetector) -> List[Dict[str, Any]]:
+                return detector.detect_cached(
                     page_content=page_content,
                     dom_structure=dom_structure,
                     screenshot_path=result["screenshots"]["full"],
                     url=url
                 )
-                
+            
+            all_detections = []
+            
+            detector_results = executor.map(run_detector, detectors) if executor is not None else map(run_detector, detectors)
+            for detections in detector_results:
                 all_detections.extend(detections)
             
             # Añadir detecciones al resultado
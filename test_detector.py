@@ -60,8 +60,8 @@ def analyze_url(url, detectors, report_generator, screenshots_dir, verbose=True)
                 print(f"Navegación exitosa")
                 print(f"Título de la página: {result.get('title', 'Sin título')}")
             
-            # Obtener contenido y estructura DOM
-            page_content = crawler.get_page_content()
+            # Obtener contenido y estructura DOM (ya extraídos por analyze_page)
+            page_content = crawler.get_cached_page(url)["page_content"]
             dom_structure = result.get('dom_structure', {})
             
             # Ejecutar detectores
@@ -74,7 +74,7 @@ def analyze_url(url, detectors, report_generator, screenshots_dir, verbose=True)
                 if verbose:
                     print(f"Ejecutando detector: {detector.name}")
                 
-                detections = detector.detect(
+                detections = detector.detect_cached(
                     page_content=page_content,
                     dom_structure=dom_structure,
                     screenshot_path=result["screenshots"]["full"],
@@ -0,0 +1,188 @@
+"""
+Página de ejemplo (HTML y estructura DOM) para probar los detectores.
+"""
+
+from typing import Dict, Any
+
+
+PAGE_CONTENT = """<html><body>
+<header id="main-header" class="site-header">
+  <div class="promo banner sponsored">Oferta especial patrocinado: descuento exclusivo</div>
+</header>
+<div id="countdown-timer" class="urgency countdown">Termina en 02:15:30 - date prisa, oferta por tiempo limitado</div>
+<div class="stock-remaining">Solo quedan 3 disponibles, alta demanda, últimas unidades</div>
+<section id="checkout" class="cart checkout">
+  <p>Subtotal 49,99 €</p>
+  <p>Cargo de servicio 2,50 € adicional</p>
+  <p>Gastos de envío 4,99 € más IVA</p>
+  <p>Seguro obligatorio 3 € (tarifa extra)</p>
+  <span>Impuestos no incluido</span>
+  <button class="btn primary">Pagar ahora</button>
+</section>
+<form id="newsletter-form" action="/subscribe">
+  <label>Acepto recibir ofertas y promociones de terceros</label>
+  <input type="checkbox" name="newsletter" checked="checked">
+  <input type="radio" name="plan" value="premium" checked="checked">
+  <input type="radio" name="plan" value="basic">
+  <select name="insurance"><option selected="selected">Seguro premium</option></select>
+  <input type="text" name="name"><input type="text" name="email"><input type="text" name="phone">
+  <input type="text" name="address"><input type="text" name="city">
+  <button class="btn primary submit">Suscribir</button>
+  <button class="btn link">No gracias, no quiero ahorrar</button>
+  <a class="cancel" href="#">No, prefiero pagar más</a>
+</form>
+<div id="account-cancel" class="cancel-subscription">
+  <p>Para cancelar llame al 900 000 000. Cancelación por teléfono únicamente.</p>
+  <p>Penalización por cancelación de 30 € y período de permanencia de 12 meses.</p>
+  <a href="/help" class="small">cancelar suscripción</a>
+</div>
+<div class="dialog">
+  <button>Aceptar</button><button>Continuar</button><button>Cancelar</button><button>Volver</button>
+</div>
+<div class="modal">
+  <button class="primary cancel">Aceptar o cancelar</button>
+  <button class="btn">No gracias, prefiero perder esta oferta: riesgo de error</button>
+</div>
+<div id="banner-top" class="promo-box partner-box commercial">Gana un premio hoy
+  <a href="https://ads.example.com/click">Haz clic aquí</a>
+</div>
+<div class="story-sponsored card-promo" data-kind="sponsored">Diez trucos para viajar barato</div>
+<div class="basket">Resumen
+  <div id="payment-summary"><p>Envío 5 € y tasa de gestión</p><p>Total 60 €</p></div>
+  <p>Cargo adicional 1 € por procesamiento</p>
+</div>
+<div class="countdown-clock urgency-timer">Últimas horas: quedan pocos, date prisa, oferta especial, solo hoy, corre 00:59</div>
+<form id="login-form">
+  <div class="row"><input type="checkbox" id="remember"><label for="remember">Recordarme</label>
+    <input type="email" placeholder="Correo"><button class="btn">Continuar</button></div>
+</form>
+<form id="unsubscribe" action="/baja">Solicitud de baja de la cuenta
+  <input name="motivo"><input name="dni"><input name="telefono"><textarea name="comentario"></textarea>
+  <select name="confirmacion"></select>
+</form>
+<aside class="recommended-content"><a href="https://ads.example.com/click">Contenido recomendado</a></aside>
+<footer><p>Prefiero perderme ofertas. I prefer to pay full price.</p></footer>
+</body></html>"""
+
+
+def _node(node_type: str, text: str = None, node_id: str = None, classes=None,
+          attributes=None, children=None) -> Dict[str, Any]:
+    """Crea un nodo con la forma de build_dom_tree (solo las claves con valor)."""
+    node = {"type": node_type}
+    if node_id:
+        node["id"] = node_id
+    if classes:
+        node["classes"] = list(classes)
+    if text:
+        node["text"] = text
+    if attributes:
+        node["attributes"] = dict(attributes)
+    if children:
+        node["children"] = list(children)
+    return node
+
+
+def build_page_dom() -> Dict[str, Any]:
+    """
+    Construye la estructura DOM de PAGE_CONTENT.
+
+    Returns:
+        Dict[str, Any]: Nodo raíz (<body>), nuevo en cada llamada
+    """
+    checkout = [
+        _node("P", "Subtotal 49,99 €"),
+        _node("P", "Cargo de servicio 2,50 € adicional"),
+        _node("P", "Gastos de envío 4,99 € más IVA"),
+        _node("P", "Seguro obligatorio 3 € (tarifa extra)"),
+        _node("SPAN", "Impuestos no incluido"),
+        _node("BUTTON", "Pagar ahora", classes=["btn", "primary"])
+    ]
+    form = [
+        _node("LABEL", "Acepto recibir ofertas y promociones de terceros"),
+        _node("INPUT", attributes={"type": "checkbox", "name": "newsletter", "checked": "checked"}),
+        _node("INPUT", attributes={"type": "radio", "name": "plan", "value": "premium", "checked": "checked"}),
+        _node("INPUT", attributes={"type": "radio", "name": "plan", "value": "basic"}),
+        _node("SELECT", "Seguro premium", attributes={"name": "insurance"}, children=[
+            _node("OPTION", "Seguro premium", attributes={"selected": "selected"})
+        ]),
+        _node("INPUT", attributes={"type": "text", "name": "name"}),
+        _node("INPUT", attributes={"type": "text", "name": "email"}),
+        _node("INPUT", attributes={"type": "text", "name": "phone"}),
+        _node("INPUT", attributes={"type": "text", "name": "address"}),
+        _node("INPUT", attributes={"type": "text", "name": "city"}),
+        _node("BUTTON", "Suscribir", classes=["btn", "primary", "submit"]),
+        _node("BUTTON", "No gracias, no quiero ahorrar", classes=["btn", "link"]),
+        _node("A", "No, prefiero pagar más", classes=["cancel"], attributes={"href": "#"})
+    ]
+    cancellation = [
+        _node("P", "Para cancelar llame al 900 000 000. Cancelación por teléfono únicamente."),
+        _node("P", "Penalización por cancelación de 30 € y período de permanencia de 12 meses."),
+        _node("A", "cancelar suscripción", classes=["small"], attributes={"href": "/help"})
+    ]
+    body = [
+        _node("HEADER", "Oferta especial patrocinado: descuento exclusivo", node_id="main-header",
+              classes=["site-header"], children=[
+                  _node("DIV", "Oferta especial patrocinado: descuento exclusivo",
+                        classes=["promo", "banner", "sponsored"])
+              ]),
+        _node("DIV", "Termina en 02:15:30 - date prisa, oferta por tiempo limitado",
+              node_id="countdown-timer", classes=["urgency", "countdown"]),
+        _node("DIV", "Solo quedan 3 disponibles, alta demanda, últimas unidades",
+              classes=["stock-remaining"]),
+        _node("SECTION", "Subtotal 49,99 € Cargo de servicio 2,50 € adicional Gastos de envío 4,99 €",
+              node_id="checkout", classes=["cart", "checkout"], children=checkout),
+        _node("FORM", "Acepto recibir ofertas y promociones de terceros Seguro premium Suscribir",
+              node_id="newsletter-form", attributes={"action": "/subscribe"}, children=form),
+        _node("DIV", "Para cancelar llame al 900 000 000. Cancelación por teléfono únicamente.",
+              node_id="account-cancel", classes=["cancel-subscription"], children=cancellation),
+        _node("DIV", "AceptarContinuarCancelarVolver", classes=["dialog"], children=[
+            _node("BUTTON", "Aceptar"),
+            _node("BUTTON", "Continuar"),
+            _node("BUTTON", "Cancelar"),
+            _node("BUTTON", "Volver")
+        ]),
+        _node("DIV", "Aceptar o cancelar No gracias, prefiero perder esta oferta: riesgo de error",
+              classes=["modal"], children=[
+                  _node("BUTTON", "Aceptar o cancelar", classes=["primary", "cancel"]),
+                  _node("BUTTON", "No gracias, prefiero perder esta oferta: riesgo de error", classes=["btn"])
+              ]),
+        _node("DIV", "Gana un premio hoy Haz clic aquí", node_id="banner-top",
+              classes=["promo-box", "partner-box", "commercial"], children=[
+                  _node("A", "Haz clic aquí", attributes={"href": "https://ads.example.com/click"})
+              ]),
+        _node("DIV", "Diez trucos para viajar barato", classes=["story-sponsored", "card-promo"],
+              attributes={"data-kind": "sponsored"}),
+        _node("DIV", "Resumen Envío 5 € y tasa de gestión Total 60 € Cargo adicional 1 € por procesamiento",
+              classes=["basket"], children=[
+                  _node("DIV", "Envío 5 € y tasa de gestiónTotal 60 €", node_id="payment-summary", children=[
+                      _node("P", "Envío 5 € y tasa de gestión"),
+                      _node("P", "Total 60 €")
+                  ]),
+                  _node("P", "Cargo adicional 1 € por procesamiento")
+              ]),
+        _node("DIV", "Últimas horas: quedan pocos, date prisa, oferta especial, solo hoy, corre 00:59",
+              classes=["countdown-clock", "urgency-timer"]),
+        _node("FORM", "Recordarme Continuar", node_id="login-form", children=[
+            _node("DIV", "Recordarme Continuar", classes=["row"], children=[
+                _node("INPUT", attributes={"type": "checkbox", "id": "remember"}),
+                _node("LABEL", "Recordarme", attributes={"for": "remember"}),
+                _node("INPUT", attributes={"type": "email", "placeholder": "Correo"}),
+                _node("BUTTON", "Continuar", classes=["btn"])
+            ])
+        ]),
+        _node("FORM", "Solicitud de baja de la cuenta", node_id="unsubscribe",
+              attributes={"action": "/baja"}, children=[
+                  _node("INPUT", attributes={"name": "motivo"}),
+                  _node("INPUT", attributes={"name": "dni"}),
+                  _node("INPUT", attributes={"name": "telefono"}),
+                  _node("TEXTAREA", attributes={"name": "comentario"}),
+                  _node("SELECT", attributes={"name": "confirmacion"})
+              ]),
+        _node("ASIDE", "Contenido recomendado", classes=["recommended-content"], children=[
+            _node("A", "Contenido recomendado", attributes={"href": "https://ads.example.com/click"})
+        ]),
+        _node("FOOTER", "Prefiero perderme ofertas. I prefer to pay full price.", children=[
+            _node("P", "Prefiero perderme ofertas. I prefer to pay full price.")
+        ])
+    ]
+    return _node("BODY", children=body)
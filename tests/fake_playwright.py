@@ -0,0 +1,90 @@
+"""
+Módulos falsos de Playwright para probar el crawler sin navegador.
+"""
+
+import sys
+import types
+import importlib.util
+from contextlib import contextmanager
+from unittest import mock
+
+
+# Reproduce la captura de pila de playwright==1.40.0: SyncBase._sync guarda
+# inspect.stack() y traceback.extract_stack() en la tarea, y _connection usa
+# inspect.stack() como valor por defecto al leerla
+_SYNC_BASE_SOURCE = '''
+import inspect
+import traceback
+import types
+
+
+class SyncBase:
+    def _sync(self, coro):
+        task = types.SimpleNamespace()
+        setattr(task, "__pw_stack__", inspect.stack())
+        setattr(task, "__pw_stack_trace__", traceback.extract_stack())
+        return task
+'''
+
+_CONNECTION_SOURCE = '''
+import inspect
+
+
+def wrap_api_call(task):
+    return getattr(task, "__pw_stack__", inspect.stack())
+'''
+
+
+def _module(name: str, source: str = "") -> types.ModuleType:
+    """Crea un módulo con el código indicado."""
+    module = types.ModuleType(name)
+    exec(source, module.__dict__)
+    return module
+
+
+def install() -> None:
+    """Registra un paquete playwright falso si el real no está instalado."""
+    if "playwright" in sys.modules or importlib.util.find_spec("playwright") is not None:
+        return
+
+    playwright = _module("playwright")
+    playwright.__path__ = []
+    sync_api = _module("playwright.sync_api")
+    sync_api.sync_playwright = mock.MagicMock(name="sync_playwright")
+    for name in ("Page", "Browser", "BrowserContext", "ElementHandle"):
+        setattr(sync_api, name, type(name, (), {}))
+    playwright.sync_api = sync_api
+    async_api = _module("playwright.async_api")
+    async_api.async_playwright = mock.MagicMock(name="async_playwright")
+    async_api.Page = type("Page", (), {})
+    playwright.async_api = async_api
+
+    sys.modules["playwright"] = playwright
+    sys.modules["playwright.sync_api"] = sync_api
+    sys.modules["playwright.async_api"] = async_api
+
+
+@contextmanager
+def fake_impl_modules():
+    """
+    Sustituye playwright._impl por módulos que capturan la pila como la 1.40.
+
+    Yields:
+        types.ModuleType: Paquete _impl falso, con _connection y _sync_base
+    """
+    impl = _module("playwright._impl")
+    impl.__path__ = []
+    impl._connection = _module("playwright._impl._connection", _CONNECTION_SOURCE)
+    impl._sync_base = _module("playwright._impl._sync_base", _SYNC_BASE_SOURCE)
+
+    names = ("playwright._impl", "playwright._impl._connection", "playwright._impl._sync_base")
+    saved = {name: sys.modules.get(name) for name in names}
+    sys.modules.update(zip(names, (impl, impl._connection, impl._sync_base)))
+    try:
+        yield impl
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
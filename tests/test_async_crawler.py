@@ -0,0 +1,158 @@
+"""
+Script para probar el crawler asíncrono con un Playwright simulado.
+"""
+
+import os
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import fake_playwright
+
+fake_playwright.install()
+
+from src.crawlers import async_web_crawler
+from src.crawlers.async_web_crawler import AsyncDarkPatternCrawler
+from src.crawlers.web_crawler import FITS_IN_VIEWPORT_JS
+
+
+def _mock_page(url_delays: dict, failing_urls: set) -> mock.MagicMock:
+    """
+    Crea una página simulada.
+
+    goto() tarda lo indicado en url_delays para que las páginas terminen en
+    otro orden que el de entrada, y title() lanza una excepción para las URLs
+    de failing_urls.
+    """
+    page = mock.MagicMock(name="page")
+    state = {}
+
+    async def goto(url, **kwargs):
+        state["url"] = url
+        await asyncio.sleep(url_delays.get(url, 0))
+        return mock.MagicMock(ok=True)
+
+    async def title():
+        if state["url"] in failing_urls:
+            raise RuntimeError(f"Fallo al leer {state['url']}")
+        return f"Título de {state['url']}"
+
+    async def evaluate(script, *args):
+        # La página no cabe en la ventana (se toma la captura completa) y no hay DOM
+        return False if script == FITS_IN_VIEWPORT_JS else None
+
+    page.goto = mock.AsyncMock(side_effect=goto)
+    page.title = mock.AsyncMock(side_effect=title)
+    page.evaluate = mock.AsyncMock(side_effect=evaluate)
+    page.content = mock.AsyncMock(return_value="<html><body></body></html>")
+    page.wait_for_load_state = mock.AsyncMock()
+    page.screenshot = mock.AsyncMock()
+    return page
+
+
+def _patched_playwright(url_delays: dict = None, failing_urls: set = None):
+    """Sustituye async_playwright por un navegador que crea una página simulada por contexto."""
+    pages = []
+
+    async def new_context(**options):
+        page = _mock_page(url_delays or {}, failing_urls or set())
+        pages.append(page)
+        context = mock.MagicMock(name="context")
+        context.new_page = mock.AsyncMock(return_value=page)
+        context.route = mock.AsyncMock()
+        context.cookies = mock.AsyncMock(return_value=[])
+        context.close = mock.AsyncMock()
+        return context
+
+    browser = mock.MagicMock(name="browser")
+    browser.new_context = mock.AsyncMock(side_effect=new_context)
+    browser.close = mock.AsyncMock()
+    playwright = mock.MagicMock(name="playwright")
+    playwright.chromium.launch = mock.AsyncMock(return_value=browser)
+    playwright.stop = mock.AsyncMock()
+    starter = mock.MagicMock(start=mock.AsyncMock(return_value=playwright))
+
+    patches = mock.patch.multiple(
+        async_web_crawler,
+        async_playwright=mock.MagicMock(return_value=starter),
+        disable_playwright_stack_capture=mock.MagicMock()
+    )
+    return patches, pages
+
+
+async def _analyze(urls, screenshots_dir, max_concurrency=10, **options):
+    """Analiza las URLs con el crawler asíncrono y un Playwright simulado."""
+    patches, pages = _patched_playwright(**options)
+    with patches:
+        async with AsyncDarkPatternCrawler(screenshots_dir=screenshots_dir,
+                                           max_concurrency=max_concurrency) as crawler:
+            results = await crawler.analyze_pages(urls)
+    return results, pages
+
+
+def test_results_keep_url_order():
+    """Comprueba que los resultados siguen el orden de las URLs aunque terminen en otro orden."""
+    print("=== Prueba de AsyncDarkPatternCrawler.analyze_pages ===")
+    urls = ["https://a.example.com/", "https://b.example.com/", "https://c.example.com/"]
+    delays = {urls[0]: 0.05, urls[1]: 0.02, urls[2]: 0}
+    with tempfile.TemporaryDirectory() as screenshots_dir:
+        results, pages = asyncio.run(_analyze(urls, screenshots_dir, url_delays=delays))
+
+    assert [result["url"] for result in results] == urls
+    assert all(result["success"] for result in results)
+    assert [result["title"] for result in results] == [f"Título de {url}" for url in urls]
+    assert len(pages) == 3
+    print("Resultados en el orden de entrada")
+
+
+def test_exception_becomes_failed_result():
+    """Comprueba que una excepción en una página se convierte en un resultado fallido."""
+    urls = ["https://a.example.com/", "https://b.example.com/"]
+    with tempfile.TemporaryDirectory() as screenshots_dir:
+        results, _ = asyncio.run(_analyze(urls, screenshots_dir, failing_urls={urls[0]}))
+
+    assert results[0] == {
+        "url": urls[0],
+        "success": False,
+        "error": f"Fallo al leer {urls[0]}"
+    }
+    assert results[1]["success"] and results[1]["url"] == urls[1]
+
+
+def test_same_host_urls_get_distinct_screenshots():
+    """Comprueba que dos URLs del mismo dominio analizadas a la vez no comparten capturas."""
+    urls = ["https://shop.example.com/a", "https://shop.example.com/b"]
+    with tempfile.TemporaryDirectory() as screenshots_dir:
+        results, pages = asyncio.run(_analyze(urls, screenshots_dir, max_concurrency=2))
+        # La misma URL produce siempre el mismo nombre
+        results_again, _ = asyncio.run(_analyze(urls[:1], screenshots_dir, max_concurrency=2))
+
+    written = [call.kwargs["path"] for page in pages for call in page.screenshot.call_args_list]
+    assert len(written) == 4 and len(set(written)) == 4, f"Capturas repetidas: {written}"
+
+    first, second = (result["screenshots"] for result in results)
+    assert set(first.values()).isdisjoint(second.values()), "Dos páginas comparten captura"
+    for screenshots in (first, second):
+        assert os.path.basename(screenshots["initial"]).startswith("initial_shop_example_com_")
+        assert os.path.basename(screenshots["full"]).startswith("full_shop_example_com_")
+    assert os.path.basename(results_again[0]["screenshots"]["initial"]) == os.path.basename(first["initial"])
+
+
+def main():
+    try:
+        test_results_keep_url_order()
+        test_exception_becomes_failed_result()
+        test_same_host_urls_get_distinct_screenshots()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Script para probar las utilidades comunes de los detectores.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.detectors.base_detector import DarkPatternDetector, dom_path, flatten_dom
+from src.detectors.confirmshaming_detector import ConfirmshamingDetector
+
+
+class _PatternDetector(DarkPatternDetector):
+    """Detector mínimo para usar los métodos de la clase base."""
+    
+    def __init__(self):
+        super().__init__("Prueba", "Detector de prueba")
+    
+    def detect(self, page_content: str, dom_structure: Dict[str, Any],
+               screenshot_path: str, url: str) -> List[Dict[str, Any]]:
+        return []
+
+
+# Alternativas que se solapan: varias coinciden en la misma posición o dentro
+# de la coincidencia de otra
+OVERLAPPING_PATTERNS = [
+    r"no\s+gracias",
+    r"gracias",
+    r"no\s+(thanks|thank\s+you)",
+    r"thank",
+    r"(?:sólo|solo)\s+hoy",
+    r"hoy"
+]
+
+MIXED_CASE_TEXTS = [
+    "No Gracias, prefiero pagar más. NO THANKS! no thank you. Sólo HOY, solo hoy.",
+    "GRACIAS por nada. Thank You. nO   gRaCiAs",
+    "Texto sin ninguna de las frases buscadas",
+    "İstanbul: no gracias. ÉLITE solo Hoy"  # la minúscula de İ cambia la longitud
+]
+
+
+def test_search_text_patterns_shortcuts():
+    """Comprueba que la alternancia y el texto en minúsculas no cambian el resultado."""
+    detector = _PatternDetector()
+    compiled, combined = detector.compile_patterns(OVERLAPPING_PATTERNS)
+    
+    print("=== Prueba de search_text_patterns ===")
+    for text in MIXED_CASE_TEXTS:
+        expected = detector.search_text_patterns(text, OVERLAPPING_PATTERNS)
+        variants = {
+            "compilados": detector.search_text_patterns(text, list(compiled)),
+            "combined_pattern": detector.search_text_patterns(text, list(compiled),
+                                                              combined_pattern=combined),
+            "text_lower": detector.search_text_patterns(text, list(compiled),
+                                                        text_lower=text.lower()),
+            "ambos": detector.search_text_patterns(text, list(compiled),
+                                                   combined_pattern=combined,
+                                                   text_lower=text.lower())
+        }
+        print(f"Texto: {text!r} - Coincidencias: {len(expected)}")
+        for name, result in variants.items():
+            assert result == expected, f"Resultado distinto con {name} para {text!r}"
+
+
+def test_min_match_length():
+    """Comprueba la longitud mínima de coincidencia calculada a partir de los patrones."""
+    print("=== Prueba de min_match_length ===")
+    assert DarkPatternDetector.min_match_length(OVERLAPPING_PATTERNS) == 3  # "hoy"
+    assert DarkPatternDetector.min_match_length([r"no\s+gracias", r"(sólo|solo)\s+hoy"]) == 8
+    assert DarkPatternDetector.min_match_length([r"no\s*gracias", r"a?"]) == 0
+    
+    # ConfirmshamingDetector descarta textos más cortos: debe seguir a sus patrones
+    detector = ConfirmshamingDetector()
+    assert detector._min_pattern_length == 10  # "nonoquiero"
+    for pattern in detector.text_patterns:
+        width = DarkPatternDetector.min_match_length([pattern])
+        assert detector._min_pattern_length <= width, f"{pattern!r} puede coincidir con {width} caracteres"
+    
+    # Un patrón más corto rebaja el mínimo
+    assert DarkPatternDetector.min_match_length(detector.text_patterns + [r"no\s*ya"]) == 4
+    print(f"Longitud mínima de confirmshaming: {detector._min_pattern_length}")
+
+
+class _CountingDetector(DarkPatternDetector):
+    """Detector que cuenta sus ejecuciones y devuelve una detección por página."""
+    
+    def __init__(self):
+        super().__init__("Prueba", "Detector de prueba")
+        self.calls = 0
+    
+    def detect(self, page_content: str, dom_structure: Dict[str, Any],
+               screenshot_path: str, url: str) -> List[Dict[str, Any]]:
+        self.calls += 1
+        confidence = 0.8
+        if confidence < self.confidence_threshold:
+            return []
+        return [{
+            "pattern_type": "prueba",
+            "evidence_type": "text",
+            "evidence": {"match": page_content[:10], "keywords": ["uno"]},
+            "confidence": confidence,
+            "location": "Texto en página",
+            "screenshot": screenshot_path
+        }]
+
+
+def test_detect_cached():
+    """Comprueba la clave de la caché de resultados y que sus copias son independientes."""
+    detector = _CountingDetector()
+    page = "<html><body>Mismo contenido</body></html>"
+    
+    print("=== Prueba de detect_cached ===")
+    first = detector.detect_cached(page, {}, "primera.png", "https://a.example.com")
+    second = detector.detect_cached(page, {}, "segunda.png", "https://b.example.com")
+    assert detector.calls == 1, "El mismo HTML debería reutilizar el resultado"
+    
+    # La captura es la de cada llamada, no la de la página que llenó la caché
+    assert first[0]["screenshot"] == "primera.png"
+    assert second[0]["screenshot"] == "segunda.png"
+    
+    # Modificar una detección devuelta (también su evidencia) no altera la caché
+    second[0]["evidence"]["keywords"].append("dos")
+    second[0]["evidence"]["match"] = "modificado"
+    second[0]["confidence"] = 0.1
+    third = detector.detect_cached(page, {}, "tercera.png", "https://c.example.com")
+    assert detector.calls == 1
+    assert third[0]["evidence"] == {"match": page[:10], "keywords": ["uno"]}, "La evidencia en caché cambió"
+    assert third[0]["confidence"] == 0.8
+    
+    # Otro umbral de confianza no puede reutilizar el resultado anterior
+    detector.confidence_threshold = 0.9
+    assert detector.detect_cached(page, {}, "cuarta.png", "https://d.example.com") == []
+    assert detector.calls == 2, "Cambiar el umbral debería ejecutar otra vez el detector"
+    
+    # Ni tampoco un análisis sin estructura DOM
+    detector.detect_cached(page, None, "quinta.png", "https://e.example.com")
+    assert detector.calls == 3, "Sin DOM debería ejecutarse otra vez el detector"
+    print(f"Ejecuciones del detector: {detector.calls}")
+
+
+def _walk_dom(node: Dict[str, Any], path: str, depth: int, result: Dict[str, List[Any]]) -> None:
+    """Recorre el DOM de forma recursiva, como referencia para flatten_dom."""
+    index = len(result["nodes"])
+    result["nodes"].append(node)
+    result["paths"].append(path)
+    result["depths"].append(depth)
+    result["ends"].append(None)
+    
+    for i, child in enumerate(node.get("children") or []):
+        if isinstance(child, dict):
+            _walk_dom(child, f"{path} > {child.get('type', 'unknown')}[{i}]", depth + 1, result)
+    
+    result["ends"][index] = len(result["nodes"])
+
+
+def test_flatten_dom():
+    """Compara flatten_dom con un recorrido recursivo del mismo DOM."""
+    dom = {
+        "type": "body",
+        "children": [
+            {"type": "div", "children": [
+                {"type": "p", "text": "Uno"},
+                "texto suelto",
+                {"type": "span", "children": [{"type": "a"}, {"type": "b"}]}
+            ]},
+            {"type": "section", "children": []},
+            {"children": [{"type": "button"}]},
+            {"type": "footer", "children": [
+                {"type": "ul", "children": [{"type": "li"}, {"type": "li"}, {"type": "li"}]}
+            ]}
+        ]
+    }
+    
+    expected = {"nodes": [], "paths": [], "depths": [], "ends": []}
+    _walk_dom(dom, "body", 0, expected)
+    flat = flatten_dom(dom)
+    
+    print("=== Prueba de flatten_dom ===")
+    print(f"Nodos: {len(flat['nodes'])}")
+    assert [id(node) for node in flat["nodes"]] == [id(node) for node in expected["nodes"]], \
+        "Los nodos no están en preorden"
+    assert flat["path_cache"] == {}, "flatten_dom no debería formar rutas"
+    # Las rutas de los nodos más profundos primero, y luego las de sus antecesores
+    # (ya guardadas en la caché)
+    order = sorted(range(len(flat["nodes"])), key=lambda i: -flat["depths"][i])
+    paths = {i: dom_path(flat, i) for i in order}
+    assert [paths[i] for i in range(len(order))] == expected["paths"], "Las rutas no coinciden"
+    assert flat["depths"] == expected["depths"], "Las profundidades no coinciden"
+    assert flat["ends"] == expected["ends"], "Los finales de subárbol no coinciden"
+    
+    empty = flatten_dom(None)
+    assert empty["nodes"] == [] and empty["ends"] == [], "Sin DOM no debería haber nodos"
+
+
+def main():
+    try:
+        test_search_text_patterns_shortcuts()
+        test_min_match_length()
+        test_flatten_dom()
+        test_detect_cached()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Script para probar el reparto de contextos del BrowserPool con un navegador simulado.
+"""
+
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import fake_playwright
+
+fake_playwright.install()
+
+from src.crawlers import web_crawler
+from src.crawlers.web_crawler import BrowserPool
+
+
+def _mock_browser() -> mock.MagicMock:
+    """Crea un navegador simulado cuyo new_context() devuelve un contexto distinto cada vez."""
+    browser = mock.MagicMock(name="browser")
+    browser.new_context.side_effect = lambda **options: mock.MagicMock(name="context")
+    browser.is_connected.return_value = True
+    return browser
+
+
+def _patched_launch(browser: mock.MagicMock):
+    """Sustituye el arranque de Playwright y el lanzamiento del navegador."""
+    playwright = mock.MagicMock(name="playwright")
+    patches = mock.patch.multiple(
+        web_crawler,
+        sync_playwright=mock.MagicMock(return_value=mock.MagicMock(start=mock.MagicMock(return_value=playwright))),
+        launch_or_connect=mock.MagicMock(return_value=browser),
+        disable_playwright_stack_capture=mock.MagicMock()
+    )
+    return patches, playwright
+
+
+def test_acquire_launches_once():
+    """Comprueba que el navegador se lanza una vez y se precalientan max_workers contextos."""
+    print("=== Prueba de BrowserPool.acquire ===")
+    browser = _mock_browser()
+    patches, _ = _patched_launch(browser)
+    with patches:
+        pool = BrowserPool(max_workers=2, connect_url="ws://localhost:3000")
+        first = pool.acquire()
+        second = pool.acquire()
+
+        web_crawler.launch_or_connect.assert_called_once_with(
+            web_crawler.sync_playwright.return_value.start.return_value, True, "ws://localhost:3000")
+        assert browser.new_context.call_count == 2, "Se esperaban 2 contextos precalentados"
+        assert first is not second
+        assert pool._contexts.empty()
+
+        # Con la cola vacía se crea un contexto nuevo en el momento
+        third = pool.acquire()
+        assert third not in (first, second)
+        assert browser.new_context.call_count == 3
+        web_crawler.launch_or_connect.assert_called_once()
+        browser.new_context.assert_called_with(**pool.context_options)
+    print("Navegador lanzado una sola vez")
+
+
+def test_release_replaces_context():
+    """Comprueba que release() cierra el contexto usado y repone uno nuevo."""
+    print("=== Prueba de BrowserPool.release ===")
+    browser = _mock_browser()
+    patches, _ = _patched_launch(browser)
+    with patches:
+        pool = BrowserPool(max_workers=1)
+        context = pool.acquire()
+        pool.release(context)
+
+        context.clear_cookies.assert_called_once_with()
+        context.close.assert_called_once_with()
+        replacement = pool.acquire()
+        assert replacement is not context, "El contexto usado no debe volver al pool"
+        assert browser.new_context.call_count == 2
+
+        # Si la cola ya está llena el contexto se cierra sin reponerlo
+        extra = pool.acquire()
+        pool.release(replacement)
+        pool.release(extra)
+        extra.close.assert_called_once_with()
+        assert pool._contexts.qsize() == 1
+        assert browser.new_context.call_count == 4
+
+        # Un error al cerrar no impide reponer el contexto
+        broken = pool.acquire()
+        broken.close.side_effect = RuntimeError("contexto ya cerrado")
+        pool.release(broken)
+        assert pool._contexts.qsize() == 1
+    print("Contextos repuestos")
+
+
+def test_release_with_disconnected_browser():
+    """Comprueba que no se crean contextos si el navegador se ha desconectado."""
+    browser = _mock_browser()
+    patches, _ = _patched_launch(browser)
+    with patches:
+        pool = BrowserPool(max_workers=1)
+        context = pool.acquire()
+        browser.is_connected.return_value = False
+        pool.release(context)
+
+        context.close.assert_called_once_with()
+        assert pool._contexts.empty()
+        assert browser.new_context.call_count == 1
+
+
+def test_shutdown_closes_everything():
+    """Comprueba que shutdown() cierra los contextos en cola, el navegador y Playwright."""
+    browser = _mock_browser()
+    patches, playwright = _patched_launch(browser)
+    with patches:
+        with BrowserPool(max_workers=3) as pool:
+            in_use = pool.acquire()
+            queued = list(pool._contexts.queue)
+        assert len(queued) == 2
+        for context in queued:
+            context.close.assert_called_once_with()
+        in_use.close.assert_not_called()
+        browser.close.assert_called_once_with()
+        playwright.stop.assert_called_once_with()
+        assert pool.browser is None and pool.playwright is None
+
+        # Cerrar un pool que no llegó a lanzar el navegador no hace nada
+        BrowserPool().shutdown()
+
+
+def main():
+    try:
+        test_acquire_launches_once()
+        test_release_replaces_context()
+        test_release_with_disconnected_browser()
+        test_shutdown_closes_everything()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Script para probar los detectores sobre una página fija y la caché del DOM aplanado.
+"""
+
+import sys
+import copy
+import json
+from pathlib import Path
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from src.detectors.base_detector import DarkPatternDetector, flatten_dom
+from src.detectors.confirmshaming_detector import ConfirmshamingDetector
+from src.detectors.preselection_detector import PreselectionDetector
+from src.detectors.hidden_costs_detector import HiddenCostsDetector
+from src.detectors.difficult_cancellation_detector import DifficultCancellationDetector
+from src.detectors.misleading_ads_detector import MisleadingAdsDetector
+from src.detectors.false_urgency_detector import FalseUrgencyDetector
+from src.detectors.confusing_interface_detector import ConfusingInterfaceDetector
+from dom_fixtures import PAGE_CONTENT, build_page_dom
+
+
+# Resultados de referencia de cada detector sobre dom_fixtures, generados con
+# la versión anterior a las optimizaciones del DOM aplanado
+BASELINE_PATH = Path(__file__).parent / "data" / "detectors_baseline.json"
+
+DETECTORS = [
+    ConfirmshamingDetector,
+    PreselectionDetector,
+    HiddenCostsDetector,
+    DifficultCancellationDetector,
+    MisleadingAdsDetector,
+    FalseUrgencyDetector,
+    ConfusingInterfaceDetector
+]
+
+
+def _clear_dom_cache():
+    """Vacía la caché compartida del DOM aplanado."""
+    with DarkPatternDetector._dom_cache_lock:
+        DarkPatternDetector._dom_cache.clear()
+
+
+def test_dom_cache_reuses_same_object():
+    """Comprueba que la misma estructura DOM se aplana una sola vez."""
+    print("=== Prueba de la caché del DOM aplanado ===")
+    _clear_dom_cache()
+    detector = HiddenCostsDetector()
+    dom = build_page_dom()
+    flat_dom = detector._get_flat_dom(dom)
+    assert FalseUrgencyDetector()._get_flat_dom(dom) is flat_dom, "Se volvió a aplanar la misma estructura"
+    assert len(flat_dom["nodes"]) == len(flatten_dom(dom)["nodes"])
+    _clear_dom_cache()
+    print("DOM aplanado reutilizado")
+
+
+def test_dom_cache_rejects_reused_id():
+    """Comprueba que una entrada con el mismo id() pero otro objeto no se reutiliza."""
+    _clear_dom_cache()
+    detector = HiddenCostsDetector()
+    dom = build_page_dom()
+    stale = {"type": "BODY", "children": [{"type": "P", "text": "página anterior"}]}
+
+    # Simula que Python reutilizó el id de una estructura ya liberada
+    stale_entry = (stale, flatten_dom(stale), {"análisis": "obsoleto"})
+    with DarkPatternDetector._dom_cache_lock:
+        DarkPatternDetector._dom_cache[id(dom)] = stale_entry
+
+    entry = detector._get_dom_entry(dom)
+    assert entry is not stale_entry, "Se devolvió la entrada de otra estructura"
+    assert entry[0] is dom
+    assert entry[1]["nodes"][0] is dom
+    assert entry[2] == {}
+    assert DarkPatternDetector._dom_cache[id(dom)] is entry
+    analysis = detector._get_dom_analysis(dom, lambda structure: len(flatten_dom(structure)["nodes"]))
+    assert analysis == len(entry[1]["nodes"])
+    _clear_dom_cache()
+
+
+def test_dom_cache_size_limit():
+    """Comprueba que la caché no guarda más de DOM_CACHE_SIZE estructuras."""
+    _clear_dom_cache()
+    detector = HiddenCostsDetector()
+    doms = [build_page_dom() for _ in range(DarkPatternDetector.DOM_CACHE_SIZE + 2)]
+    for dom in doms:
+        detector._get_flat_dom(dom)
+    cache = DarkPatternDetector._dom_cache
+    assert len(cache) == DarkPatternDetector.DOM_CACHE_SIZE
+    assert [entry[0] for entry in cache.values()] == doms[2:], "No se descartaron las más antiguas"
+    _clear_dom_cache()
+
+
+def _run_detectors(confidence_threshold=None):
+    """Ejecuta cada detector sobre la página de ejemplo y devuelve sus resultados en JSON."""
+    results = {}
+    for detector_class in DETECTORS:
+        detector = detector_class()
+        if confidence_threshold is not None:
+            detector.confidence_threshold = confidence_threshold
+        detections = detector.detect(PAGE_CONTENT, build_page_dom(), "shot.png", "https://example.com")
+        results[detector_class.__name__] = json.loads(json.dumps(detections, ensure_ascii=False, default=str))
+    return results
+
+
+def test_detectors_match_baseline():
+    """Comprueba que cada detector devuelve lo mismo que la versión de referencia."""
+    print("=== Prueba de los detectores sobre la página de ejemplo ===")
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    for threshold, expected in (("default", baseline["default"]), ("0", baseline["0"])):
+        _clear_dom_cache()
+        results = _run_detectors(None if threshold == "default" else float(threshold))
+        for name, detections in expected.items():
+            assert results[name] == detections, f"{name} (umbral {threshold}) no coincide con la referencia"
+            print(f"{name} (umbral {threshold}): {len(detections)} detecciones")
+    _clear_dom_cache()
+
+
+def _mutate(value):
+    """Modifica en el sitio todos los diccionarios y listas de una detección."""
+    if isinstance(value, dict):
+        for item in list(value.values()):
+            _mutate(item)
+        value["modificado"] = True
+    elif isinstance(value, list):
+        for item in value:
+            _mutate(item)
+        value.append("modificado")
+
+
+def test_detections_do_not_share_cached_state():
+    """Comprueba que modificar las detecciones no altera las siguientes llamadas sobre el mismo DOM."""
+    _clear_dom_cache()
+    dom = build_page_dom()
+    for detector_class in DETECTORS:
+        detector = detector_class()
+        detector.confidence_threshold = 0
+        first = detector.detect(PAGE_CONTENT, dom, "shot.png", "https://example.com")
+        expected = copy.deepcopy(first)
+
+        # Los botones de un grupo aparecen en varias detecciones: cada una debe tener su copia
+        evidences = [id(button) for detection in first
+                     for key in ("buttons", "primary_buttons", "secondary_buttons")
+                     for button in detection["evidence"].get(key, [])]
+        assert len(evidences) == len(set(evidences)), f"{detector_class.__name__} comparte evidencias"
+
+        _mutate(first)
+        second = detector.detect(PAGE_CONTENT, dom, "shot.png", "https://example.com")
+        assert second == expected, f"{detector_class.__name__} devolvió una detección modificada"
+    assert dom == build_page_dom(), "Las detecciones comparten listas con el DOM"
+    _clear_dom_cache()
+
+
+def test_baseline_covers_flat_dom_paths():
+    """Comprueba que la referencia incluye los casos que dependen del DOM aplanado."""
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)["0"]
+
+    checkout = {d["location"] for d in baseline["HiddenCostsDetector"] if d["evidence_type"] == "checkout_costs"}
+    assert "Sección de checkout en body > SECTION[3]" in checkout
+    assert "Sección de checkout en body > DIV[10] > DIV[0]" in checkout, "Falta la sección de checkout anidada"
+
+    counters = [d for d in baseline["FalseUrgencyDetector"] if d["evidence_type"] == "countdown_element"]
+    saturated = [d for d in counters if len(d["evidence"]["indicators"]) >= 5]
+    assert saturated and all(d["confidence"] == counters[0]["confidence"] for d in saturated), \
+        "Falta un contador con la confianza saturada"
+
+    confusing = {d["location"] for d in baseline["ConfusingInterfaceDetector"]}
+    assert "Elemento de interfaz confuso en body > FORM[12] > DIV[0] > INPUT[2]" in confusing, \
+        "Falta el subárbol del formulario"
+
+
+def main():
+    try:
+        test_dom_cache_reuses_same_object()
+        test_dom_cache_rejects_reused_id()
+        test_dom_cache_size_limit()
+        test_detectors_match_baseline()
+        test_detections_do_not_share_cached_state()
+        test_baseline_covers_flat_dom_paths()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
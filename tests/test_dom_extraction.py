@@ -0,0 +1,137 @@
+"""
+Script para probar la reconstrucción del DOM a partir del formato plano de EXTRACT_DOM_JS.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, Any
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import fake_playwright
+
+fake_playwright.install()
+
+from src.crawlers.web_crawler import build_dom_tree
+from dom_fixtures import build_page_dom
+
+
+def encode_dom(root: Dict[str, Any], max_depth: int = 3) -> Dict[str, Any]:
+    """
+    Codifica un árbol DOM en el formato plano que devuelve EXTRACT_DOM_JS.
+
+    Sigue el mismo orden que el TreeWalker del script (preorden), interna las
+    cadenas y marca como truncados los nodos por debajo de max_depth sin
+    visitar sus hijos.
+    """
+    strings, string_index = [], {}
+
+    def intern(value: str) -> int:
+        if value not in string_index:
+            string_index[value] = len(strings)
+            strings.append(value)
+        return string_index[value]
+
+    dom = {"strings": strings, "tag": [], "parent": [], "truncated": [], "idIdx": [],
+           "classIdx": [], "textIdx": [], "attrOffset": [0], "attrs": []}
+
+    def visit(node: Dict[str, Any], parent: int, depth: int) -> None:
+        index = len(dom["tag"])
+        truncated = depth > max_depth
+        dom["tag"].append(intern(node["type"]))
+        dom["parent"].append(parent)
+        dom["truncated"].append(1 if truncated else 0)
+        if truncated:
+            dom["idIdx"].append(-1)
+            dom["classIdx"].append(-1)
+            dom["textIdx"].append(-1)
+        else:
+            dom["idIdx"].append(intern(node["id"]) if node.get("id") else -1)
+            classes = " ".join(node.get("classes", []))
+            dom["classIdx"].append(intern(classes) if classes else -1)
+            dom["textIdx"].append(intern(node["text"]) if node.get("text") else -1)
+            for name, value in node.get("attributes", {}).items():
+                dom["attrs"].extend((intern(name), intern(value)))
+        dom["attrOffset"].append(len(dom["attrs"]))
+        if not truncated:
+            for child in node.get("children", []):
+                visit(child, index, depth + 1)
+
+    visit(root, -1, 0)
+    return dom
+
+
+def test_flat_format():
+    """Comprueba build_dom_tree con una estructura plana escrita a mano."""
+    print("=== Prueba de build_dom_tree ===")
+    flat_dom = {
+        "strings": ["BODY", "DIV", "promo  banner", "Oferta", "main", "A", "href", "/compra",
+                    "data-kind", "ad", "SPAN"],
+        #          BODY DIV  A   SPAN (truncado)
+        "tag":       [0, 1, 5, 10],
+        "parent":    [-1, 0, 1, 2],
+        "truncated": [0, 0, 0, 1],
+        "idIdx":     [-1, 4, -1, -1],
+        "classIdx":  [-1, 2, -1, -1],
+        "textIdx":   [-1, 3, 3, -1],
+        "attrOffset": [0, 0, 2, 6, 6],
+        "attrs":     [8, 9, 6, 7, 8, 9]
+    }
+    expected = {
+        "type": "BODY",
+        "children": [{
+            "type": "DIV",
+            "id": "main",
+            "classes": ["promo", "banner"],
+            "text": "Oferta",
+            "attributes": {"data-kind": "ad"},
+            "children": [{
+                "type": "A",
+                "text": "Oferta",
+                "attributes": {"href": "/compra", "data-kind": "ad"},
+                "children": [{"type": "SPAN", "truncated": True}]
+            }]
+        }]
+    }
+    assert build_dom_tree(flat_dom) == expected, build_dom_tree(flat_dom)
+    print("Estructura reconstruida correctamente")
+
+
+def test_round_trip():
+    """Comprueba que codificar y reconstruir el DOM de ejemplo devuelve el mismo árbol."""
+    dom = build_page_dom()
+    flat_dom = encode_dom(dom)
+    assert len(flat_dom["strings"]) == len(set(flat_dom["strings"])), "Cadenas internadas repetidas"
+    assert build_dom_tree(flat_dom) == dom
+
+
+def test_truncated_nodes():
+    """Comprueba que los nodos por debajo de la profundidad máxima solo conservan su tipo."""
+    leaf = {"type": "SPAN", "text": "profundo", "children": [{"type": "B", "text": "oculto"}]}
+    dom = {"type": "BODY", "children": [{"type": "DIV", "children": [{"type": "P", "children": [leaf]}]}]}
+    tree = build_dom_tree(encode_dom(dom, max_depth=2))
+    assert tree["children"][0]["children"][0]["children"] == [{"type": "SPAN", "truncated": True}]
+
+
+def test_empty_dom():
+    """Comprueba que sin DOM se devuelve un diccionario vacío."""
+    assert build_dom_tree(None) == {}
+    assert build_dom_tree({}) == {}
+    assert build_dom_tree({"strings": [], "tag": []}) == {}
+
+
+def main():
+    try:
+        test_flat_format()
+        test_round_trip()
+        test_truncated_nodes()
+        test_empty_dom()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Script para probar el guardado diferido de evidencias del crawler.
+"""
+
+import os
+import sys
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import fake_playwright
+
+fake_playwright.install()
+
+from src.crawlers import web_crawler
+from src.crawlers.web_crawler import DarkPatternCrawler
+
+
+def _crawler(base_dir: str, **kwargs) -> DarkPatternCrawler:
+    """Crea un crawler sin navegador, como si ya hubiera navegado a una URL."""
+    crawler = DarkPatternCrawler(screenshots_dir=os.path.join(base_dir, 'screenshots'), **kwargs)
+    crawler.current_url = "https://www.example.com/"
+    crawler._domain_slug = web_crawler.domain_slug(crawler.current_url)
+    return crawler
+
+
+def _fixed_datetime():
+    """Sustituye datetime en el módulo del crawler para que now() no cambie."""
+    fixed = mock.MagicMock(wraps=datetime)
+    fixed.now.return_value = datetime(2024, 1, 2, 3, 4, 5)
+    return mock.patch.object(web_crawler, "datetime", fixed)
+
+
+def test_evidence_written_on_flush():
+    """Comprueba que la ruta devuelta solo existe tras flush_evidence()."""
+    print("=== Prueba de save_evidence + flush_evidence ===")
+    with tempfile.TemporaryDirectory() as base_dir:
+        crawler = _crawler(base_dir)
+        path = crawler.save_evidence("test_evidence", {"clave": "valor"}, "Evidencia de prueba")
+        assert not os.path.exists(path), "La evidencia no debería escribirse antes de flush_evidence()"
+
+        written = crawler.flush_evidence()
+        assert written == [path], f"Rutas escritas inesperadas: {written}"
+        assert os.path.exists(path), "flush_evidence() no escribió la evidencia"
+        with open(path, encoding='utf-8') as f:
+            evidence = json.load(f)
+        assert evidence["type"] == "test_evidence"
+        assert evidence["url"] == "https://www.example.com/"
+        assert evidence["data"] == {"clave": "valor"}
+        print(f"Evidencia escrita en {path}")
+
+
+def test_same_path_keeps_last_payload():
+    """Comprueba que varias evidencias con la misma ruta dejan la última."""
+    with tempfile.TemporaryDirectory() as base_dir, _fixed_datetime():
+        crawler = _crawler(base_dir)
+        first = crawler.save_evidence("test_evidence", {"orden": 1})
+        second = crawler.save_evidence("test_evidence", {"orden": 2})
+        assert first == second, "Ambas evidencias deberían compartir ruta"
+
+        assert crawler.flush_evidence() == [second]
+        with open(second, encoding='utf-8') as f:
+            assert json.load(f)["data"] == {"orden": 2}, "No quedó la última evidencia"
+
+        # Lo ya escrito no se vuelve a escribir
+        assert crawler.flush_evidence() == []
+
+
+def test_ndjson_appends_every_evidence():
+    """Comprueba que con "ndjson" cada evidencia es una línea del registro."""
+    with tempfile.TemporaryDirectory() as base_dir, _fixed_datetime():
+        crawler = _crawler(base_dir, evidence_format="ndjson")
+        paths = {crawler.save_evidence("test_evidence", {"orden": i}) for i in range(3)}
+        assert paths == {crawler.evidence_log_path}
+        assert not os.path.exists(crawler.evidence_log_path)
+
+        crawler.flush_evidence()
+        with open(crawler.evidence_log_path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["data"]["orden"] for line in lines] == [0, 1, 2]
+
+
+def main():
+    try:
+        test_evidence_written_on_flush()
+        test_same_path_keeps_last_payload()
+        test_ndjson_appends_every_evidence()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Script para probar que Hyperscan y pyahocorasick no cambian los resultados.
+
+Ambas dependencias son opcionales: cada prueba se omite si la suya no está
+instalada, y compara el resultado con el que se obtiene sin ella.
+"""
+
+import sys
+import copy
+import random
+from contextlib import contextmanager, ExitStack
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+from src.detectors import base_detector, confusing_interface_detector
+from src.detectors.base_detector import DarkPatternDetector
+from src.detectors.confirmshaming_detector import ConfirmshamingDetector
+from src.detectors.hidden_costs_detector import HiddenCostsDetector
+from src.detectors.difficult_cancellation_detector import DifficultCancellationDetector
+from src.detectors.false_urgency_detector import FalseUrgencyDetector
+from dom_fixtures import PAGE_CONTENT, build_page_dom
+from test_base_detector import _PatternDetector, OVERLAPPING_PATTERNS, MIXED_CASE_TEXTS
+from test_detectors import DETECTORS
+
+
+# Fragmentos con los que se generan textos aleatorios: frases que buscan los
+# detectores, con mayúsculas, acentos y caracteres cuya minúscula cambia de longitud
+FRAGMENTS = [
+    "No gracias", "no, gracias, no quiero ahorrar", "prefiero pagar más", "NO THANKS",
+    "Solo quedan 3", "date prisa", "oferta por tiempo limitado", "02:15:30", "últimas unidades",
+    "cargo de servicio", "gastos de envío", "más IVA", "tarifa extra", "impuestos no incluidos",
+    "para cancelar llame", "cancelación por teléfono", "penalización por cancelación",
+    "minimum period", "cancel by phone", "İstanbul", "ÉLITE", "ß", "texto neutro", "\n", "  "
+]
+
+# Texto con un surrogate suelto: no tiene codificación UTF-8 válida para Hyperscan
+SURROGATE_TEXT = "No gracias \ud800 prefiero pagar más, solo hoy"
+
+
+def _random_texts(count: int, seed: int = 0):
+    """Genera textos aleatorios a partir de FRAGMENTS, con mayúsculas al azar."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        parts = rng.choices(FRAGMENTS, k=rng.randint(1, 8))
+        text = " ".join(part.upper() if rng.random() < 0.2 else part for part in parts)
+        texts.append(text)
+    return texts
+
+
+def _random_dom(rng: random.Random):
+    """Construye una variante aleatoria del DOM de ejemplo cambiando textos y orden de hijos."""
+    dom = build_page_dom()
+    stack = [dom]
+    while stack:
+        node = stack.pop()
+        if node.get("text") and rng.random() < 0.5:
+            node["text"] = " ".join(rng.choices(FRAGMENTS, k=rng.randint(1, 5)))
+        children = node.get("children", [])
+        rng.shuffle(children)
+        stack.extend(children)
+    return dom
+
+
+def _text_pattern_lists():
+    """Listas de patrones de texto de los detectores, más las de test_base_detector."""
+    urgency = FalseUrgencyDetector()
+    return [
+        OVERLAPPING_PATTERNS,
+        ConfirmshamingDetector().text_patterns,
+        HiddenCostsDetector().hidden_cost_patterns,
+        DifficultCancellationDetector().difficult_cancellation_phrases,
+        urgency.countdown_patterns,
+        urgency.scarcity_patterns
+    ]
+
+
+@contextmanager
+def _without(hyperscan: bool = False, ahocorasick: bool = False):
+    """Desactiva Hyperscan y/o pyahocorasick mientras dura el bloque."""
+    with ExitStack() as stack:
+        if hyperscan:
+            stack.enter_context(mock.patch.object(base_detector, "hyperscan", None))
+        if ahocorasick:
+            stack.enter_context(mock.patch.object(base_detector, "ahocorasick", None))
+            stack.enter_context(mock.patch.object(confusing_interface_detector, "ahocorasick", None))
+        # Los autómatas se guardan por lista de palabras; sin vaciar la caché
+        # los detectores creados aquí recibirían el construido con pyahocorasick
+        base_detector._keyword_automaton.cache_clear()
+        stack.callback(base_detector._keyword_automaton.cache_clear)
+        yield
+
+
+def _run_detectors(dom, confidence_threshold: float = 0):
+    """Ejecuta todos los detectores sobre una copia del DOM."""
+    with DarkPatternDetector._dom_cache_lock:
+        DarkPatternDetector._dom_cache.clear()
+    results = {}
+    for detector_class in DETECTORS:
+        detector = detector_class()
+        detector.confidence_threshold = confidence_threshold
+        results[detector_class.__name__] = detector.detect(PAGE_CONTENT, copy.deepcopy(dom),
+                                                           "shot.png", "https://example.com")
+    return results
+
+
+def test_hyperscan_prefilter_matches_re():
+    """Comprueba que search_text_patterns da lo mismo con y sin el prefiltro de Hyperscan."""
+    pytest.importorskip("hyperscan")
+    print("=== Prueba del prefiltro de Hyperscan ===")
+    detector = _PatternDetector()
+    texts = MIXED_CASE_TEXTS + [PAGE_CONTENT, SURROGATE_TEXT] + _random_texts(150)
+
+    # El prefiltro solo se usa con listas escritas en minúsculas (no con "IVA"),
+    # y nunca sobre texto sin UTF-8 válido
+    compiled_lists = [detector.compile_patterns(patterns) for patterns in _text_pattern_lists()]
+    prefiltered = [
+        compiled for compiled, _ in compiled_lists
+        if base_detector._matching_pattern_indexes(list(compiled), "no gracias") is not None
+    ]
+    assert len(prefiltered) >= 2 and prefiltered[0] == compiled_lists[0][0], "No se usó el prefiltro"
+    for compiled in prefiltered:
+        assert base_detector._matching_pattern_indexes(list(compiled), SURROGATE_TEXT.lower()) is None
+
+    for compiled, combined in compiled_lists:
+        for text in texts:
+            with _without(hyperscan=True):
+                expected = detector.search_text_patterns(text, list(compiled), combined_pattern=combined)
+            assert detector.search_text_patterns(text, list(compiled)) == expected, text
+            assert detector.search_text_patterns(text, list(compiled), combined_pattern=combined,
+                                                 text_lower=text.lower()) == expected, text
+    print(f"{len(texts)} textos con {len(compiled_lists)} listas de patrones")
+
+
+def test_hyperscan_detectors_match_re():
+    """Comprueba que los detectores dan lo mismo con y sin Hyperscan en DOM aleatorios."""
+    pytest.importorskip("hyperscan")
+    rng = random.Random(1)
+    for dom in [build_page_dom()] + [_random_dom(rng) for _ in range(30)]:
+        with _without(hyperscan=True):
+            expected = _run_detectors(dom)
+        assert _run_detectors(dom) == expected
+
+
+def test_keyword_automaton_matches_substrings():
+    """Comprueba que el autómata encuentra las mismas palabras que una búsqueda de subcadenas."""
+    pytest.importorskip("ahocorasick")
+    print("=== Prueba de keyword_automaton ===")
+    keywords = ["cancelar", "cancelación", "baja", "suscripción", "cuenta", "cancel", "unsubscribe"]
+    automaton = DarkPatternDetector.keyword_automaton(keywords)
+    assert automaton is not None
+    assert DarkPatternDetector.keyword_automaton(keywords) is automaton, "El autómata no se reutiliza"
+
+    for text in _random_texts(150, seed=2) + [PAGE_CONTENT, "solicitar la baja de la cuenta"]:
+        lowered = text.lower()
+        found = {keyword for _, keyword in automaton.iter(lowered)}
+        assert found == {keyword for keyword in keywords if keyword in lowered}, text
+
+    with _without(ahocorasick=True):
+        assert DarkPatternDetector.keyword_automaton(keywords) is None
+
+
+def test_ahocorasick_detectors_match_fallback():
+    """Comprueba que los detectores dan lo mismo con y sin pyahocorasick."""
+    pytest.importorskip("ahocorasick")
+    rng = random.Random(3)
+    for dom in [build_page_dom()] + [_random_dom(rng) for _ in range(30)]:
+        with _without(ahocorasick=True):
+            expected = _run_detectors(dom)
+        assert _run_detectors(dom) == expected
+
+
+def main():
+    tests = [
+        test_hyperscan_prefilter_matches_re,
+        test_hyperscan_detectors_match_re,
+        test_keyword_automaton_matches_substrings,
+        test_ahocorasick_detectors_match_fallback
+    ]
+    try:
+        for test in tests:
+            try:
+                test()
+            except pytest.skip.Exception as e:
+                print(f"Omitida {test.__name__}: {e}")
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
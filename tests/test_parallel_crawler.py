@@ -0,0 +1,134 @@
+"""
+Script para probar el análisis de URLs en varios procesos con un crawler simulado.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import fake_playwright
+
+fake_playwright.install()
+
+from src.crawlers import parallel_crawler
+from src.crawlers.web_crawler import CALL_PAGE_HELPER_JS, FITS_IN_VIEWPORT_JS
+
+
+class _InlinePool:
+    """Sustituto de multiprocessing.Pool que ejecuta las tareas en este proceso."""
+
+    def __init__(self, processes, initializer=None, initargs=()):
+        initializer(*initargs)
+
+    def imap_unordered(self, func, iterable):
+        return map(func, iterable)
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def _mock_page() -> mock.MagicMock:
+    """Crea una página simulada que no cabe en la ventana y no tiene DOM."""
+    page = mock.MagicMock(name="page")
+    page.goto.return_value = mock.MagicMock(ok=True)
+    page.title.return_value = "Título"
+    page.content.return_value = "<html><body></body></html>"
+    page.screenshot.return_value = b"captura"
+
+    def evaluate(script, *args):
+        if script == FITS_IN_VIEWPORT_JS:
+            return False
+        if script == CALL_PAGE_HELPER_JS:
+            return {"value": None}
+        return 0
+
+    page.evaluate.side_effect = evaluate
+    return page
+
+
+def _mock_browser_pool() -> mock.MagicMock:
+    """Crea un BrowserPool simulado cuyo acquire() da un contexto con una página nueva."""
+    pool = mock.MagicMock(name="browser_pool")
+
+    def acquire():
+        context = mock.MagicMock(name="context")
+        context.new_page.return_value = _mock_page()
+        context.cookies.return_value = []
+        return context
+
+    pool.acquire.side_effect = acquire
+    return pool
+
+
+def test_analyze_one_adds_page_content():
+    """Comprueba que _analyze_one devuelve el resultado del crawler con el HTML de la página."""
+    print("=== Prueba de parallel_crawler._analyze_one ===")
+    crawler = mock.MagicMock(name="crawler")
+    crawler.analyze_page.return_value = {"url": "https://example.com/", "success": True}
+    crawler.get_cached_page.return_value = {"page_content": "<html></html>"}
+    crawler_class = mock.MagicMock(name="DarkPatternCrawler")
+    crawler_class.return_value.__enter__.return_value = crawler
+
+    with mock.patch.object(parallel_crawler, "DarkPatternCrawler", crawler_class), \
+            mock.patch.object(parallel_crawler, "BrowserPool"):
+        parallel_crawler._init_worker(True, "capturas", 1000, None)
+        result = parallel_crawler._analyze_one("https://example.com/")
+
+    assert result == {"url": "https://example.com/", "success": True, "page_content": "<html></html>"}
+    crawler_class.assert_called_once_with(pool=parallel_crawler._worker_pool, headless=True,
+                                          screenshots_dir="capturas", timeout=1000)
+    crawler.analyze_page.assert_called_once_with("https://example.com/")
+    print("HTML añadido al resultado")
+
+
+def test_analyze_one_maps_exceptions():
+    """Comprueba que un error del crawler se convierte en un resultado fallido."""
+    crawler_class = mock.MagicMock(name="DarkPatternCrawler")
+    crawler_class.return_value.__enter__.side_effect = RuntimeError("navegador caído")
+
+    with mock.patch.object(parallel_crawler, "DarkPatternCrawler", crawler_class):
+        result = parallel_crawler._analyze_one("https://example.com/")
+
+    assert result == {"url": "https://example.com/", "success": False, "error": "navegador caído"}
+
+
+def test_same_host_urls_get_distinct_screenshots():
+    """Comprueba que dos URLs del mismo dominio no comparten capturas entre procesos."""
+    urls = ["https://shop.example.com/a", "https://shop.example.com/b"]
+    with tempfile.TemporaryDirectory() as screenshots_dir, \
+            mock.patch.object(parallel_crawler.multiprocessing, "Pool", _InlinePool), \
+            mock.patch.object(parallel_crawler, "BrowserPool", return_value=_mock_browser_pool()):
+        results = parallel_crawler.analyze_urls_in_processes(urls, processes=2, screenshots_dir=screenshots_dir)
+
+        assert [result["url"] for result in results] == urls
+        assert all(result["success"] for result in results), results
+        first, second = (result["screenshots"] for result in results)
+        assert set(first.values()).isdisjoint(second.values()), "Dos páginas comparten captura"
+        for screenshots in (first, second):
+            assert os.path.basename(screenshots["initial"]).startswith("initial_shop_example_com_")
+            assert os.path.basename(screenshots["full"]).startswith("full_shop_example_com_")
+            assert all(os.path.exists(path) for path in screenshots.values())
+        assert len(os.listdir(screenshots_dir)) == 4
+
+
+def main():
+    try:
+        test_analyze_one_adds_page_content()
+        test_analyze_one_maps_exceptions()
+        test_same_host_urls_get_distinct_screenshots()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
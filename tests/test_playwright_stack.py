@@ -0,0 +1,68 @@
+"""
+Script para probar que Playwright no recorre la pila en cada llamada a su API.
+"""
+
+import os
+import sys
+import inspect
+import traceback
+from pathlib import Path
+from unittest import mock
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+import fake_playwright
+
+fake_playwright.install()
+
+from src.crawlers.web_crawler import disable_playwright_stack_capture
+
+
+def test_sync_does_not_walk_stack():
+    """Comprueba que SyncBase._sync y _connection ya no llaman a inspect.stack()."""
+    print("=== Prueba de disable_playwright_stack_capture ===")
+    with fake_playwright.fake_impl_modules() as impl, \
+            mock.patch.dict(os.environ, {"PW_INSPECT_STACK": "0"}):
+        disable_playwright_stack_capture()
+        # Una segunda llamada no debe envolver otra vez los sustitutos
+        disable_playwright_stack_capture()
+
+        with mock.patch.object(inspect, "stack", side_effect=AssertionError("inspect.stack")) as stack, \
+                mock.patch.object(traceback, "extract_stack",
+                                  side_effect=AssertionError("traceback.extract_stack")) as extract_stack:
+            task = impl._sync_base.SyncBase()._sync(None)
+            impl._connection.wrap_api_call(task)
+            impl._connection.wrap_api_call(object())
+
+        assert not stack.called, "SyncBase._sync recorrió la pila con inspect.stack()"
+        assert not extract_stack.called, "SyncBase._sync recorrió la pila con traceback.extract_stack()"
+        assert task.__pw_stack__ == [] and list(task.__pw_stack_trace__) == []
+        # El resto del módulo sigue disponible a través del sustituto
+        assert impl._sync_base.inspect.isfunction is inspect.isfunction
+        assert impl._sync_base.traceback.format_exc is traceback.format_exc
+    print("Sin recorridos de pila")
+
+
+def test_stack_capture_can_be_kept():
+    """Comprueba que PW_INSPECT_STACK=1 deja a Playwright capturar la pila."""
+    with fake_playwright.fake_impl_modules() as impl, \
+            mock.patch.dict(os.environ, {"PW_INSPECT_STACK": "1"}):
+        disable_playwright_stack_capture()
+        assert impl._sync_base.inspect is inspect
+        assert impl._sync_base.traceback is traceback
+        assert impl._connection.inspect is inspect
+
+
+def main():
+    try:
+        test_sync_does_not_walk_stack()
+        test_stack_capture_can_be_kept()
+        print("✅ Todas las pruebas completadas con éxito!")
+    except Exception as e:
+        print(f"❌ Error en las pruebas: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
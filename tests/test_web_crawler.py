@@ -139,6 +139,9 @@ def test_dark_pattern_crawler(url: str):
                 },
                 description="Esta es una evidencia de prueba"
             )
+            # La evidencia se escribe en disco al vaciar las pendientes
+            crawler.flush_evidence()
+            assert os.path.exists(evidence_path), f"No se escribió la evidencia {evidence_path}"
             print(f"Evidencia guardada en: {evidence_path}")
         else:
             print(f"Error al analizar {url}: {results.get('error')}")